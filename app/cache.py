@@ -0,0 +1,272 @@
+"""
+This module contains the on-disk cache shared by all the sessions of the Streamlit app.
+"""
+
+# Python
+from collections import OrderedDict
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Hashable, Optional
+
+METERS_PER_DEGREE = 111_320  # at the equator
+
+_CACHES: dict[str, "PersistentCache"] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+class PersistentCache:
+    """
+    A key-value cache stored in a SQLite file, bounded by the number of entries.
+
+    The least recently used entries are evicted first, each entry can expire
+    after its own time to live. The values are stored as JSON.
+    A single connection guarded by a lock is shared by the threads of the app.
+    The file can be shared by many processes, so the entries are counted
+    in the write transaction evicting them, not kept by each process.
+    """
+
+    def __init__(self, path: str, max_entries: int):
+        """
+        Opens or creates the cache file.
+
+        Parameters:
+            path (str): Path to the SQLite file, ':memory:' for a temporary cache.
+            max_entries (int): The number of entries kept before evicting.
+        """
+
+        if max_entries <= 0:
+            raise ValueError("The cache should keep at least one entry.")
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+
+        with self._lock, self._connection:
+            if path != ":memory:":
+                self._connection.execute("PRAGMA journal_mode=WAL")
+
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL NOT NULL
+                )
+                """)
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)"
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Returns the cached value, or None if the key is missing or expired.
+        """
+
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """
+        Returns the cached values of the keys which are present and not expired.
+        """
+
+        if not keys:
+            return {}
+
+        now = time.time()
+        placeholders = ", ".join("?" for _ in keys)
+
+        with self._lock, self._connection:
+            rows = self._connection.execute(
+                f"SELECT key, value, expires_at FROM cache WHERE key IN ({placeholders})",
+                keys,
+            ).fetchall()
+
+            found = {}
+            expired = []
+            for key, value, expires_at in rows:
+                if expires_at is not None and expires_at <= now:
+                    expired.append(key)
+                else:
+                    found[key] = json.loads(value)
+
+            if expired:
+                self._connection.executemany(
+                    "DELETE FROM cache WHERE key = ?", [(key,) for key in expired]
+                )
+            if found:
+                self._connection.executemany(
+                    "UPDATE cache SET accessed_at = ? WHERE key = ?",
+                    [(now, key) for key in found],
+                )
+
+        return found
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        Stores the value, it never expires if the time to live in seconds is None.
+        """
+
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, items: dict[str, Any], ttl: Optional[float] = None):
+        """
+        Stores many values with the same time to live in seconds.
+        """
+
+        if not items:
+            return
+
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) "
+                + "VALUES (?, ?, ?, ?)",
+                [
+                    (key, json.dumps(value), expires_at, now)
+                    for key, value in items.items()
+                ],
+            )
+            self._evict_overflow()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._count_entries()
+
+    def clear(self):
+        """Removes all the entries."""
+
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM cache")
+
+    def _count_entries(self) -> int:
+        """Returns the number of the entries of all the processes, the lock is held."""
+
+        return self._connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _evict_overflow(self):
+        """
+        Removes the least recently used entries over the limit,
+        in the write transaction of the insert, the lock is held.
+        """
+
+        overflow = self._count_entries() - self.max_entries
+
+        if overflow > 0:
+            self._connection.execute(
+                """
+                DELETE FROM cache WHERE key IN (
+                    SELECT key FROM cache ORDER BY accessed_at ASC LIMIT ?
+                )
+                """,
+                (overflow,),
+            )
+
+
+class MemoryCache:
+    """
+    A key-value cache in the memory of the process, bounded by the number of entries.
+
+    The least recently used entries are evicted first.
+    """
+
+    def __init__(self, max_entries: int):
+        """
+        Parameters:
+            max_entries (int): The number of entries kept before evicting.
+        """
+
+        if max_entries <= 0:
+            raise ValueError("The cache should keep at least one entry.")
+
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Returns the cached value, or None if the key is missing.
+        """
+
+        with self._lock:
+            if key not in self._entries:
+                return None
+
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def set(self, key: Hashable, value: Any):
+        """
+        Stores the value, evicting the least recently used entry over the limit.
+        """
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def clear(self):
+        """Removes all the entries."""
+
+        with self._lock:
+            self._entries.clear()
+
+
+def open_cache(path: str, max_entries: int) -> PersistentCache:
+    """
+    Returns the process-wide cache stored in the file, opening it only once.
+
+    Parameters:
+        path (str): Path to the SQLite file.
+        max_entries (int): The number of entries kept before evicting.
+
+    Returns:
+        PersistentCache: The shared cache.
+    """
+
+    with _CACHES_LOCK:
+        if path not in _CACHES:
+            _CACHES[path] = PersistentCache(path, max_entries)
+
+        return _CACHES[path]
+
+
+def quantize_coordinates(lat: float, lon: float, cell_meters: float) -> tuple[int, int]:
+    """
+    Snaps the coordinates to a grid of square cells, so nearby points share a key.
+
+    Parameters:
+        lat (float): Latitude of the point.
+        lon (float): Longitude of the point.
+        cell_meters (float): The size of the cell side in meters.
+
+    Returns:
+        tuple: The row and the column of the cell.
+    """
+
+    lat_step = cell_meters / METERS_PER_DEGREE
+    row = round(lat / lat_step)
+
+    # The meridians converge, so the cells are wider in degrees far from the equator
+    cell_lat = math.radians(row * lat_step)
+    lon_step = cell_meters / (METERS_PER_DEGREE * max(math.cos(cell_lat), 1e-6))
+    column = round(lon / lon_step)
+
+    return row, column
@@ -0,0 +1,323 @@
+"""
+This module records the traffic of the app to Earth Engine and Nominatim, and replays it offline.
+
+The requests of both clients go through a `requests.Session`, so a transport adapter
+mounted on their sessions sees every exchange:
+    - in the "record" mode, the requests are sent and the responses are stored
+      with their timings in a cassette, a compressed JSON file,
+    - in the "replay" mode, the responses are served from the cassette without
+      the network, optionally after their recorded latency.
+
+The stages of the app, e.g. `get_map_point_data`, `get_region_data` and `display_map`,
+are then profiled end-to-end on production-shaped traffic, see `benchmarks/bench_replay.py`:
+
+    with use_cassette(path, "replay", latency=1.0) as cassette:
+        connect_replay(cassette)
+        get_map_point_data(lat, lon, periods)
+"""
+
+# Python
+import base64
+from contextlib import contextmanager
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Iterator
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Third party
+import ee
+from google.auth.credentials import AnonymousCredentials
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# App
+from config import CASSETTE
+from roundtrips import install_roundtrip_counter
+from stages.server_connection import get_ee_requests_session
+from stages.data_acquisition.geocoding import get_session
+
+CASSETTE_VERSION = 1
+MODES = ("record", "replay")
+
+# The query parameters left out of the keys, they change between the runs
+VOLATILE_PARAMS = {"key", "access_token"}
+
+
+class CassetteMiss(requests.exceptions.ConnectionError):
+    """No response was recorded for the request."""
+
+
+class Cassette:
+    """The recorded exchanges, keyed by their requests."""
+
+    def __init__(self, project: str = None):
+        """
+        Parameters:
+            project (str): The Earth Engine project of the recording.
+        """
+
+        self.project = project
+        self.exchanges: dict[str, list[dict]] = {}
+        self._replayed: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(exchanges) for exchanges in self.exchanges.values())
+
+    @staticmethod
+    def get_key(method: str, url: str, body: bytes = None) -> str:
+        """
+        Returns the key of the request, its method, its URL and the hash of its body.
+
+        The query parameters are sorted and the volatile ones left out,
+        the headers are left out, they hold the credentials.
+        """
+
+        parts = urlsplit(url)
+        query = sorted(
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if name not in VOLATILE_PARAMS
+        )
+        url = urlunsplit(parts._replace(query=urlencode(query), fragment=""))
+
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        body_hash = hashlib.sha256(body or b"").hexdigest()[:16]
+
+        return f"{method.upper()} {url} {body_hash}"
+
+    def record(self, key: str, response: requests.Response, seconds: float):
+        """Stores the response of the request with its duration."""
+
+        exchange = {
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {
+                name: response.headers[name]
+                for name in CASSETTE["response_headers"]
+                if name in response.headers
+            },
+            "seconds": round(seconds, 6),
+            **encode_body(response.content),
+        }
+
+        with self._lock:
+            self.exchanges.setdefault(key, []).append(exchange)
+
+    def play(self, key: str) -> dict:
+        """
+        Returns the next recorded response of the request,
+        the last one again once all of them were replayed.
+
+        Raises:
+            CassetteMiss: If the request was never recorded.
+        """
+
+        with self._lock:
+            exchanges = self.exchanges.get(key)
+            if not exchanges:
+                raise CassetteMiss(f"No recorded response for: {key}")
+
+            index = self._replayed.get(key, 0)
+            self._replayed[key] = index + 1
+
+            return exchanges[min(index, len(exchanges) - 1)]
+
+    def save(self, path: str):
+        """Writes the cassette as compressed JSON."""
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+        with self._lock:
+            content = {
+                "version": CASSETTE_VERSION,
+                "project": self.project,
+                "exchanges": self.exchanges,
+            }
+
+        with gzip.open(path, "wt", encoding="utf-8") as file:
+            json.dump(content, file, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str) -> "Cassette":
+        """
+        Reads a cassette written by `save`.
+
+        Raises:
+            ValueError: If the cassette was written by another version.
+        """
+
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            content = json.load(file)
+
+        if content.get("version") != CASSETTE_VERSION:
+            raise ValueError(
+                f"The cassette {path} has the version {content.get('version')}, "
+                + f"not {CASSETTE_VERSION}. Record it again."
+            )
+
+        cassette = cls(content["project"])
+        cassette.exchanges = content["exchanges"]
+        return cassette
+
+
+def encode_body(content: bytes) -> dict:
+    """Returns the body as text if it is UTF-8, as base64 otherwise, e.g. a PNG tile."""
+
+    try:
+        return {"text": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(content).decode("ascii")}
+
+
+def decode_body(exchange: dict) -> bytes:
+    """Returns the body encoded by `encode_body`."""
+
+    if "base64" in exchange:
+        return base64.b64decode(exchange["base64"])
+    return exchange["text"].encode("utf-8")
+
+
+class CassetteAdapter(BaseAdapter):
+    """The transport of a session recording its exchanges or replaying them."""
+
+    def __init__(
+        self,
+        cassette: Cassette,
+        mode: str,
+        latency: float = 0.0,
+        adapter: BaseAdapter = None,
+    ):
+        """
+        Parameters:
+            cassette (Cassette): The recorded exchanges.
+            mode (str): "record" or "replay".
+            latency (float): The share of the recorded latency waited before
+                replaying a response, 0 replays at once, 1 like the recording.
+            adapter (BaseAdapter): The transport of the recording, HTTP by default.
+        """
+        super().__init__()
+
+        if mode not in MODES:
+            raise ValueError(f"The mode should be one of {MODES}, not '{mode}'.")
+
+        self.cassette = cassette
+        self.mode = mode
+        self.latency = latency
+        self.adapter = adapter or HTTPAdapter()
+
+    def send(self, request, **kwargs):  # pylint: disable=arguments-differ
+        key = Cassette.get_key(request.method, request.url, request.body)
+
+        if self.mode == "record":
+            start = time.perf_counter()
+            response = self.adapter.send(request, **kwargs)
+            _ = response.content  # the body is part of the round-trip
+            self.cassette.record(key, response, time.perf_counter() - start)
+            return response
+
+        exchange = self.cassette.play(key)
+
+        if self.latency:
+            time.sleep(exchange["seconds"] * self.latency)
+
+        return build_response(request, exchange)
+
+    def close(self):
+        self.adapter.close()
+
+
+def build_response(request: requests.PreparedRequest, exchange: dict):
+    """Returns the recorded response to the request."""
+
+    response = requests.Response()
+    response.status_code = exchange["status"]
+    response.reason = exchange["reason"]
+    response.headers = CaseInsensitiveDict(exchange["headers"])
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = decode_body(exchange)  # pylint: disable=protected-access
+    response.url = request.url
+    response.request = request
+    return response
+
+
+def get_sessions() -> list[requests.Session]:
+    """
+    Returns the sessions of the Earth Engine and the Nominatim clients,
+    the first one is created before the initialization, so it is recorded too.
+    """
+
+    return [get_ee_requests_session(), get_session()]
+
+
+def get_ee_project() -> str:
+    """
+    Returns the project of the initialized Earth Engine client, kept in
+    `ee.data._get_state()` since earthengine-api 1.0, in `ee.data` before.
+    """
+    # pylint: disable=protected-access
+    if hasattr(ee.data, "_get_state"):
+        return ee.data._get_state().cloud_api_user_project
+
+    return ee.data._cloud_api_user_project
+
+
+@contextmanager
+def use_cassette(
+    path: str = None, mode: str = "replay", latency: float = 0.0
+) -> Iterator[Cassette]:
+    """
+    Records the traffic of the clients into the cassette, or replays it.
+
+    The recording is written at the exit, with the Earth Engine project.
+
+    Parameters:
+        path (str): The cassette file, `CASSETTE["path"]` by default.
+        mode (str): "record" or "replay".
+        latency (float): The share of the recorded latency injected by the replay.
+
+    Yields:
+        Cassette: The exchanges recorded or replayed.
+    """
+
+    path = path or CASSETTE["path"]
+    cassette = Cassette() if mode == "record" else Cassette.load(path)
+
+    sessions = get_sessions()
+    mounted = [(session, dict(session.adapters)) for session in sessions]
+
+    for session in sessions:
+        adapter = CassetteAdapter(cassette, mode, latency)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+    try:
+        yield cassette
+    finally:
+        for session, adapters in mounted:
+            session.adapters.clear()
+            session.adapters.update(adapters)
+
+        if mode == "record":
+            cassette.project = get_ee_project()
+            cassette.save(path)
+
+
+def connect_replay(cassette: Cassette):
+    """
+    Initializes Earth Engine on the replayed traffic, without the credentials.
+
+    Parameters:
+        cassette (Cassette): The replayed cassette, holding the project of the recording.
+    """
+
+    ee.Initialize(AnonymousCredentials(), project=cassette.project)
+    install_roundtrip_counter()
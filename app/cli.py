@@ -0,0 +1,36 @@
+"""
+This module contains the command line arguments shared by the scripts of the app.
+"""
+
+# Python
+import argparse
+
+
+def create_parser(doc: str) -> argparse.ArgumentParser:
+    """Returns the parser of a script, described by the first paragraph of its docstring."""
+
+    return argparse.ArgumentParser(description=doc.split("\n\n", maxsplit=1)[0])
+
+
+def create_layers_parser(
+    doc: str, layers: list[str], action: str
+) -> argparse.ArgumentParser:
+    """
+    Returns the parser of a script processing the layers, all of them by default.
+
+    Parameters:
+        doc (str): The docstring of the script.
+        layers (list[str]): The keys of the layers to choose from.
+        action (str): What the script does to the layers, for the help.
+    """
+
+    parser = create_parser(doc)
+    parser.add_argument(
+        "--layers",
+        nargs="+",
+        choices=layers,
+        default=layers,
+        help=f"The layers to {action}, all of them by default.",
+    )
+
+    return parser
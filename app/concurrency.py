@@ -0,0 +1,212 @@
+"""
+This module contains the concurrency tools shared by all the sessions of the Streamlit app.
+"""
+
+# Python
+from concurrent.futures import Future, ThreadPoolExecutor
+import contextvars
+import threading
+import time
+from typing import Any, Callable, Hashable, Optional
+
+# App
+from config import ACQUISITION, GEOCODING, TILE_IDS
+
+# The bounds of the pools, each kind of blocking request waits in its own queue
+MAX_WORKERS = {
+    "acquisition": ACQUISITION["max_workers"],
+    "geocoding": GEOCODING["max_workers"],
+    "tile_ids": TILE_IDS["max_workers"],
+}
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    Runs each task in a copy of the context of its submitter, like `asyncio.to_thread`,
+    so the timing span and the round-trip recorders of a click follow its requests.
+    """
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+_EXECUTORS: dict[str, ContextThreadPoolExecutor] = {}
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def get_executor(name: str = "acquisition") -> ContextThreadPoolExecutor:
+    """
+    Returns the process-wide executor of the pool, by default
+    the one of the blocking Earth Engine requests.
+
+    The number of threads is bounded by `MAX_WORKERS`,
+    the requests over the limit wait in the queue of the executor.
+
+    Parameters:
+        name (str): The pool, a key of `MAX_WORKERS`.
+
+    Returns:
+        ContextThreadPoolExecutor: The shared executor.
+    """
+
+    with _EXECUTOR_LOCK:
+        if name not in _EXECUTORS:
+            _EXECUTORS[name] = ContextThreadPoolExecutor(
+                max_workers=MAX_WORKERS[name],
+                thread_name_prefix=name,
+            )
+
+        return _EXECUTORS[name]
+
+
+class TokenBucket:
+    """
+    Limits the rate of the requests shared by all the threads of the app.
+
+    The tokens are refilled at a constant rate up to the capacity,
+    a caller without a token reserves the next one and waits for it.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        """
+        Parameters:
+            rate (float): The tokens refilled per second.
+            capacity (float): The largest burst of requests.
+        """
+
+        if rate <= 0 or capacity < 1:
+            raise ValueError("The rate should be positive and the capacity at least 1.")
+
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: float = None) -> Optional[float]:
+        """
+        Takes a token, possibly one refilled in the future.
+
+        Parameters:
+            max_wait (float): The longest wait in seconds, no limit by default.
+
+        Returns:
+            float: The seconds to wait before using the token,
+            or None without taking it if the wait is over `max_wait`.
+        """
+
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated_at
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+
+            if max_wait is not None and wait > max_wait:
+                return None
+
+            self._tokens -= 1
+            return wait
+
+    def acquire(self, max_wait: float = None) -> bool:
+        """
+        Blocks the thread until a token is available.
+
+        Parameters:
+            max_wait (float): The longest wait in seconds, no limit by default.
+
+        Returns:
+            bool: Whether a token was taken, False at once over `max_wait`.
+        """
+
+        wait = self.reserve(max_wait)
+
+        if wait is None:
+            return False
+
+        time.sleep(wait)
+        return True
+
+
+class RequestCoalescer:
+    """
+    Shares the result of a running request with the identical requests arriving meanwhile.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def join(self, key: Hashable) -> tuple[Future, bool]:
+        """
+        Joins the request of the key, the first caller has to run it.
+
+        Parameters:
+            key (Hashable): The identifier of the request.
+
+        Returns:
+            tuple: The future of the result and whether the caller has to run the request
+            and to `resolve` the future.
+        """
+
+        with self._lock:
+            future = self._in_flight.get(key)
+
+            if future is not None:
+                return future, False
+
+            future = Future()
+            self._in_flight[key] = future
+            return future, True
+
+    def resolve(
+        self,
+        key: Hashable,
+        future: Future,
+        result: Any = None,
+        exception: Optional[BaseException] = None,
+    ):
+        """
+        Publishes the result of the request to its waiting callers.
+
+        Parameters:
+            key (Hashable): The identifier of the request.
+            future (Future): The future returned by `join`.
+            result (Any): The result of the request.
+            exception (BaseException): The error of the request, if it failed.
+        """
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    def run(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Runs the request once for all the callers of the same key arriving meanwhile.
+
+        Parameters:
+            key (Hashable): The identifier of the request.
+            func (Callable): The request.
+
+        Returns:
+            Any: The result of the request.
+        """
+
+        future, is_leader = self.join(key)
+
+        if not is_leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            self.resolve(key, future, exception=e)
+            raise
+
+        self.resolve(key, future, result)
+        return result
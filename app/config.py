@@ -12,10 +12,163 @@ stages.
 UI_STRINGS = {
     "title": "🗺️🌴 Afforestation Tracker",
     "subtitle": "Click on the map to view data for a specific point 👆",
+    "warming_up": "Loading the map layers...",
+    "hidden_layers": "More layers",
 }
 
 SIZE_SAMPLE_METERS = 100  # google earth engine sample size
 
+# The Earth Engine session shared by all the sessions of the app,
+# the access tokens last an hour
+CONNECTION = {
+    "health_check_seconds": 5 * 60,
+    # Longer than the health check interval, so the token is refreshed before it expires
+    "refresh_margin_seconds": 10 * 60,
+}
+
+# Shared by all the sessions of the app, so many users cannot exhaust the threads
+ACQUISITION = {
+    "max_workers": 8,  # blocking Earth Engine requests running at the same time
+}
+
+# Where the values at the points are sampled:
+# "gee" - Google Earth Engine, "local" - the raster store built by export_rasters.py
+# The "local" values are coarser: a pixel of the store is LOCAL_RASTERS["resolution"]
+# (0.01°, about 1.1 km), while Earth Engine samples the points at the scales
+# of POINT_SAMPLING (10 m for the elevation, SIZE_SAMPLE_METERS for the rest),
+# so the two backends return different values at the same point.
+POINT_DATA_BACKEND = "gee"
+
+# Many points sampled at once, see stages/data_acquisition/batch.py
+BATCH_POINTS = {
+    # Points per request, stays well under the 5000 elements
+    # and the payload limits of a single Earth Engine request
+    "chunk_size": 500,
+    # Requests of a batch running at the same time on the shared executor,
+    # leaves the rest of the workers to the clicks on the map
+    "max_chunks_in_flight": 4,
+}
+
+LOCAL_RASTERS = {
+    "path": "data/rasters",
+    "resolution": 0.01,  # degrees, about 1.1 km
+    "chunk_size": 512,  # pixels of the square chunk side
+}
+
+# On-disk cache of the values sampled at the points,
+# the points are snapped to cells of SIZE_SAMPLE_METERS
+POINT_CACHE = {
+    "path": "cache/point_samples.sqlite3",
+    "max_entries": 500_000,
+    # Seconds before the value is fetched again, None never expires
+    "ttl_seconds": {
+        "elevation": None,  # SRTM is static
+        "slope": None,  # derived from SRTM
+        "soil_organic_carbon": None,  # ISDASOIL is static
+        "world_cover_code": None,  # WorldCover 2020 is static
+        "soil_moisture": 30 * 24 * 60 * 60,  # keyed on the dates of its period
+        "precipitation": 30 * 24 * 60 * 60,  # keyed on the dates of its period
+    },
+}
+
+# The tile URLs of the map layers are reused until they expire,
+# they have to be renewed before the Earth Engine token expires after an hour
+TILE_IDS = {
+    "ttl_seconds": 45 * 60,
+    # The map is shown without the layers not registered in time
+    "timeout": 30,  # seconds
+    # The registrations running at the same time, out of the pool of the data acquisition
+    "max_workers": 4,
+    # The layers hidden at start are registered on Earth Engine only once the user
+    # shows them: with the tile proxy, on the request of their first tile, without it,
+    # once selected under the map, they are left out of the map until then
+    "defer_hidden_layers": True,
+}
+
+# The browsers load the map tiles through a local caching proxy,
+# each tile is fetched from Earth Engine once for all the sessions.
+# It listens on the loopback only, so the browsers on other machines reach it
+# through a reverse proxy of the app server at "public_url", see README.md.
+# Off by default, the settings marked "Needs TILE_PROXY" have no effect without it:
+# the tiles outside ROI_COORDS, TILE_SEEDING, TILE_BACKEND = "local",
+# the "/ready" path of WARMUP and the "/metrics" path of METRICS
+TILE_PROXY = {
+    "enabled": False,
+    "host": "127.0.0.1",
+    "port": 8765,
+    # The URL of the proxy seen by the browsers, "http://<host>:<port>" by default
+    "public_url": None,
+    "cache_path": "cache/tiles",
+    "max_bytes": 2 * 1024**3,  # the least recently used tiles are removed over it
+    "max_age_seconds": 24 * 60 * 60,  # Cache-Control of the tiles in the browsers
+    "timeout": 30,  # seconds
+    "pool_size": 16,  # kept-alive connections to Earth Engine
+    # The tiles outside ROI_COORDS are classified down to this zoom level,
+    # the deeper tiles get the class of their ancestor
+    "roi_max_zoom": 12,
+}
+
+# Needs TILE_PROXY: the seeded tiles are served from the disk cache of the proxy
+TILE_SEEDING = {
+    # The map opens at the zoom level 3, the tiles of all the layers
+    # down to the zoom level 8 take a few hundred MB
+    "min_zoom": 3,
+    "max_zoom": 8,
+    "max_workers": 8,
+    "requests_per_second": 20,  # to Earth Engine, shared by the workers
+    # The completed zoom levels of each layer, the interrupted seeding resumes from it
+    "manifest_path": "cache/tile_seeding.json",
+}
+
+# The caches warmed up by serve.py when the server starts,
+# Needs TILE_PROXY: the readiness is served on "/ready" by the tile proxy
+WARMUP = {
+    # The longest wait of the first sessions for the running warm-up
+    "timeout": 120,  # seconds
+}
+
+# The timing spans of the stages and the requests to the services, see metrics.py,
+# written to the JSON lines. Needs TILE_PROXY: exported on "/metrics" by the tile proxy
+METRICS = {
+    # The upper bounds of the latency histograms
+    "buckets": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),  # seconds
+    # A JSON line per span, rotated like the logs
+    "path": "logs/metrics.jsonl",
+    "max_bytes": 10 * 1024**2,
+    "backup_count": 5,
+}
+
+# The recorded traffic of Earth Engine and Nominatim, replayed offline, see cassette.py
+CASSETTE = {
+    # Compressed JSON, it holds the project of the recording, keep it out of the repository
+    "path": "cache/cassettes/traffic.json.gz",
+    # The response headers kept, the others, e.g. cookies, are dropped
+    "response_headers": ["content-type"],
+}
+
+# Where the map tiles are rendered:
+# "gee" - Google Earth Engine, "local" - the tile proxy, from the raster store
+# built by export_rasters.py, the layers without a local raster stay on Earth Engine.
+# Needs TILE_PROXY: with the proxy disabled, "local" renders on Earth Engine
+TILE_BACKEND = "gee"
+
+GEOCODING = {
+    "url": "https://nominatim.openstreetmap.org/reverse",
+    # Nominatim usage policy requires an identifying User-Agent
+    "user_agent": "Afforestation-Tracker (https://github.com/Luk-kar/Afforestation-Tracker)",
+    "timeout": 10,  # seconds
+    "requests_per_second": 1,  # Nominatim usage policy, shared by all the sessions
+    # Over this wait for the rate limit, the click is answered without the address
+    "max_wait_seconds": 3,
+    "max_workers": 2,  # requests of the async clicks running at the same time
+    "pool_size": 4,  # kept-alive connections
+    "precision": 4,  # decimals of the rounded coordinates of the cache key, about 11 m
+    "memory_entries": 4096,
+    "cache_path": "cache/addresses.sqlite3",
+    "max_entries": 200_000,
+    "ttl_seconds": 30 * 24 * 60 * 60,
+}
+
 ROI_COORDS = [
     [-17.5, 15.0],
     [-17.5, 20.0],
@@ -0,0 +1,76 @@
+"""
+This script evaluates the candidate plots of a CSV file for afforestation.
+
+The input has the "lat" and "lon" columns, the output has the values
+of the layers and the evaluation of each plot, in the input order:
+
+    python app/evaluate_points.py plots.csv plots_evaluated.csv
+"""
+
+# Python
+import csv
+import time
+
+# App
+from cli import create_parser
+from config import ROI
+from stages.server_connection import establish_connection
+from stages.data_acquisition.batch import (
+    get_map_points_data,
+    merge_map_points_data,
+)
+
+
+def read_points(path: str) -> tuple[list[float], list[float]]:
+    """
+    Reads the coordinates of the points from the CSV file.
+
+    Returns:
+        tuple: The latitudes and the longitudes.
+    """
+
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+
+    return [float(row["lat"]) for row in rows], [float(row["lon"]) for row in rows]
+
+
+def write_points_data(path: str, columns: dict):
+    """Writes the columns of the points data to the CSV file."""
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        writer.writerows(zip(*columns.values()))
+
+
+def evaluate_points(input_path: str, output_path: str):
+    """Evaluates the points of the input file, reporting the progress of the chunks."""
+
+    establish_connection()
+
+    lats, lons = read_points(input_path)
+    start = time.perf_counter()
+
+    def report(chunks):
+        done = 0
+        for chunk in chunks:
+            done += len(chunk["index"])
+            print(f"{done}/{len(lats)} points in {time.perf_counter() - start:.1f} s")
+            yield chunk
+
+    columns = merge_map_points_data(
+        report(get_map_points_data(lats, lons, ROI["periods"]))
+    )
+
+    write_points_data(output_path, columns)
+
+
+if __name__ == "__main__":
+
+    parser = create_parser(__doc__)
+    parser.add_argument("input", help="The CSV file with the lat and lon columns.")
+    parser.add_argument("output", help="The CSV file of the evaluated points.")
+    arguments = parser.parse_args()
+
+    evaluate_points(arguments.input, arguments.output)
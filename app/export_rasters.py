@@ -0,0 +1,193 @@
+"""
+This script exports the layers sampled at the points from Google Earth Engine
+to the local raster store, so the points can be sampled offline.
+
+Run it once, and again after changing the periods or the resolution:
+
+    python app/export_rasters.py [--layers elevation slope ...]
+
+Then set `POINT_DATA_BACKEND = "local"` in `config.py`.
+"""
+
+# Python
+import math
+import time
+
+# Third party
+import ee
+import numpy as np
+
+# App
+from cli import create_layers_parser
+from config import ROI, LOCAL_RASTERS
+from stages.server_connection import establish_connection
+from stages.data_acquisition.gee_server import (
+    fetch_total_precipitation_data,
+    fetch_mean_soil_moisture_data,
+    fetch_elevation_data,
+    fetch_soil_organic_carbon_data,
+    fetch_slope_data,
+    fetch_world_cover_data,
+)
+from stages.data_acquisition.local_raster import (
+    LayerSpec,
+    RasterLayer,
+    create_layer,
+    write_chunk,
+)
+from stages.data_acquisition.point import POINT_SAMPLING
+from validation import handle_ee_operations
+
+# The pixel type and the no-data value of each layer in the store
+EXPORT_TYPES = {
+    "elevation": ("float32", -9999),
+    "slope": ("float32", -9999),
+    "soil_moisture": ("float32", -9999),
+    "precipitation": ("float32", -9999),
+    "soil_organic_carbon": ("float32", -9999),
+    "world_cover_code": ("int16", -1),
+}
+
+
+def get_roi_bounds(roi_coords: list) -> list[float]:
+    """
+    Returns the west, south, east and north edges of the region of interest.
+    """
+
+    lons = [coord[0] for coord in roi_coords]
+    lats = [coord[1] for coord in roi_coords]
+
+    return [min(lons), min(lats), max(lons), max(lats)]
+
+
+@handle_ee_operations
+def get_export_images(roi: dict) -> dict[str, ee.Image]:
+    """
+    Builds the images of the layers over the region of interest.
+
+    Parameters:
+        roi (dict): The region of interest coordinates and periods.
+
+    Returns:
+        dict: The images keyed like `POINT_SAMPLING`.
+    """
+    geometry = ee.Geometry.Polygon(roi["roi_coords"])
+    rainy_season = roi["periods"]["soil_moisture"]
+    year = roi["periods"]["precipitation"]
+
+    return {
+        "elevation": fetch_elevation_data(geometry),
+        "slope": fetch_slope_data(geometry),
+        "soil_moisture": fetch_mean_soil_moisture_data(
+            (rainy_season["start_date"], rainy_season["end_date"]), geometry
+        ),
+        "precipitation": fetch_total_precipitation_data(
+            (year["start_date"], year["end_date"]), geometry
+        ),
+        "soil_organic_carbon": fetch_soil_organic_carbon_data(geometry),
+        "world_cover_code": fetch_world_cover_data(geometry),
+    }
+
+
+@handle_ee_operations
+def export_layer(key: str, image: ee.Image, roi: dict):
+    """
+    Exports a layer chunk by chunk, each chunk is a single request to the server.
+
+    Parameters:
+        key (str): The layer key from `POINT_SAMPLING`.
+        image (ee.Image): The image of the layer.
+        roi (dict): The region of interest coordinates and periods.
+    """
+    dtype, no_data = EXPORT_TYPES[key]
+    band = POINT_SAMPLING[key]["band"]
+    period_name = POINT_SAMPLING[key].get("period")
+
+    layer = create_layer(
+        LOCAL_RASTERS["path"],
+        key,
+        LayerSpec(
+            bounds=tuple(get_roi_bounds(roi["roi_coords"])),
+            resolution=LOCAL_RASTERS["resolution"],
+            chunk_size=LOCAL_RASTERS["chunk_size"],
+            dtype=dtype,
+            no_data=no_data,
+            period=roi["periods"][period_name] if period_name else None,
+        ),
+    )
+
+    expression = image.select(band).unmask(no_data)
+    expression = expression.toInt16() if dtype == "int16" else expression.toFloat()
+
+    chunk_rows = math.ceil(layer.height / layer.spec.chunk_size)
+    chunk_cols = math.ceil(layer.width / layer.spec.chunk_size)
+
+    for chunk_row in range(chunk_rows):
+        for chunk_col in range(chunk_cols):
+            pixels = export_chunk(layer, expression, chunk_row, chunk_col)
+            write_chunk(layer, chunk_row, chunk_col, pixels[band])
+
+        print(f"{key}: {chunk_row + 1}/{chunk_rows} rows of chunks")
+
+
+def export_chunk(
+    layer: RasterLayer, expression: ee.Image, chunk_row: int, chunk_col: int
+) -> np.ndarray:
+    """
+    Computes the pixels of a chunk of the layer in a single request to the server.
+
+    Parameters:
+        layer (RasterLayer): The layer created with `create_layer`.
+        expression (ee.Image): The image of the layer, with its no-data value.
+        chunk_row (int): The row of the chunk.
+        chunk_col (int): The column of the chunk.
+
+    Returns:
+        np.ndarray: The structured array of the pixels, smaller at the right
+        and bottom edges of the raster.
+    """
+    west, _, _, north = layer.spec.bounds
+    chunk_size, resolution = layer.spec.chunk_size, layer.spec.resolution
+
+    return ee.data.computePixels(
+        {
+            "expression": expression,
+            "fileFormat": "NUMPY_NDARRAY",
+            "grid": {
+                "dimensions": {
+                    "width": min(chunk_size, layer.width - chunk_col * chunk_size),
+                    "height": min(chunk_size, layer.height - chunk_row * chunk_size),
+                },
+                "affineTransform": {
+                    "scaleX": resolution,
+                    "shearX": 0,
+                    "translateX": west + chunk_col * chunk_size * resolution,
+                    "shearY": 0,
+                    "scaleY": -resolution,
+                    "translateY": north - chunk_row * chunk_size * resolution,
+                },
+                "crsCode": "EPSG:4326",
+            },
+        }
+    )
+
+
+def export_rasters(keys: list[str]):
+    """Exports the layers to the local raster store."""
+
+    establish_connection()
+
+    images = get_export_images(ROI)
+
+    for key in keys:
+        start = time.perf_counter()
+        export_layer(key, images[key], ROI)
+        print(f"{key}: exported in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+
+    parser = create_layers_parser(__doc__, list(POINT_SAMPLING), "export")
+    arguments = parser.parse_args()
+
+    export_rasters(arguments.layers)
@@ -0,0 +1,73 @@
+"""
+This module contains the registry of the map layers shared by all the sessions of the app.
+
+The settings of the layers from `config.MAP_DATA` are frozen once per process,
+so no session can change them for the others. The images of a region are not
+written into the settings, each request gets its own view of the layers instead.
+"""
+
+# Python
+from types import MappingProxyType
+from typing import Any, Mapping
+
+# App
+from config import MAP_DATA
+
+
+def freeze(value: Any) -> Any:
+    """
+    Returns a read-only copy of the settings, the dicts become mapping proxies
+    and the lists become tuples.
+    """
+
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+
+    return value
+
+
+def thaw(value: Any) -> Any:
+    """
+    Returns a mutable copy of the frozen settings, e.g. for the Earth Engine client.
+    """
+
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+
+    return value
+
+
+LAYER_REGISTRY: Mapping[str, Mapping] = freeze(MAP_DATA)
+
+
+def derive_layers(registry: Mapping[str, Mapping], data: dict) -> Mapping:
+    """
+    Derives the read-only view of the layers of one request,
+    the registry itself is left untouched.
+
+    Parameters:
+        registry (Mapping): The settings of the layers, like `LAYER_REGISTRY`.
+        data (dict): The data of the request keyed like the registry, e.g. the ee.Image.
+
+    Returns:
+        Mapping: The layers of the registry, with "data" in the layers from `data`.
+    """
+
+    unknown_keys = set(data) - set(registry)
+    if unknown_keys:
+        raise KeyError(f"Unknown layers: {unknown_keys}")
+
+    return MappingProxyType(
+        {
+            key: (
+                MappingProxyType({**layer, "data": data[key]}) if key in data else layer
+            )
+            for key, layer in registry.items()
+        }
+    )
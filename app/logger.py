@@ -2,8 +2,13 @@
 
 # Python
 import logging
+from logging.handlers import RotatingFileHandler
 import os
 
+# App
+from config import METRICS
+from metrics import METRICS_LOGGER
+
 
 def set_logging_level():
     """Set the logging level for the Streamlit app."""
@@ -19,3 +24,27 @@ def set_logging_level():
         filemode="a",
         format="%(asctime)s - %(message)s",
     )
+
+    set_metrics_logging()
+
+
+def set_metrics_logging():
+    """Write the timing spans to the rotating JSON lines files, see `metrics.py`."""
+
+    logger = logging.getLogger(METRICS_LOGGER)
+    if logger.handlers:
+        return
+
+    os.makedirs(os.path.dirname(METRICS["path"]), exist_ok=True)
+
+    handler = RotatingFileHandler(
+        METRICS["path"],
+        maxBytes=METRICS["max_bytes"],
+        backupCount=METRICS["backup_count"],
+        encoding="utf-8",
+    )
+    handler.setFormatter(logging.Formatter("%(message)s"))
+
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
@@ -0,0 +1,319 @@
+"""
+This module measures where the time of a click goes, shared by all the sessions of the app.
+
+The stages of the app run in timing spans, their durations are recorded in latency
+histograms, and the requests to the services, Earth Engine, Nominatim and the tile server,
+are counted with their response bytes. A span also counts the requests made inside it,
+including those of the spans nested in it.
+
+The metrics are exported:
+    - in the Prometheus text format, on the "/metrics" path of the tile proxy,
+    - as JSON lines, a line per span, in the rotating files set by `logger.py`.
+"""
+
+# Python
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+from typing import Callable, Iterator
+
+# Third party
+import requests
+
+# App
+from config import METRICS
+
+STAGE_DURATION = "app_stage_duration_seconds"
+REQUEST_DURATION = "app_request_duration_seconds"
+REQUESTS = "app_requests_total"
+RESPONSE_BYTES = "app_response_bytes_total"
+STAGE_ERRORS = "app_stage_errors_total"
+EARTH_ENGINE_ROUNDTRIPS = "app_earth_engine_roundtrips_total"
+
+METRIC_HELP = {
+    STAGE_DURATION: ("histogram", "The duration of the stages of the app."),
+    REQUEST_DURATION: ("histogram", "The duration of the requests to the services."),
+    REQUESTS: ("counter", "The requests to the services."),
+    RESPONSE_BYTES: ("counter", "The bytes of the responses of the services."),
+    STAGE_ERRORS: ("counter", "The stages failed with an error."),
+    EARTH_ENGINE_ROUNDTRIPS: (
+        "counter",
+        "The blocking requests to Earth Engine by their call sites.",
+    ),
+}
+
+METRICS_LOGGER = "metrics"
+
+# The records of the open spans, the innermost last
+_OPEN_SPANS: ContextVar = ContextVar("spans", default=())
+# The spans are shared with the tasks they submit to the executors, see `concurrency.py`
+_SPAN_LOCK = threading.Lock()
+
+
+class Histogram:
+    """A latency histogram with the cumulative buckets of Prometheus."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        """
+        Parameters:
+            buckets (tuple[float, ...]): The upper bounds of the buckets in seconds, sorted.
+        """
+
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Records a value in its bucket."""
+
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def get_cumulative_counts(self) -> list[tuple[str, int]]:
+        """Returns the upper bounds of the buckets with the values under them."""
+
+        bounds = [f"{bucket:g}" for bucket in self.buckets] + ["+Inf"]
+        cumulative, total = [], 0
+
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            cumulative.append((bound, total))
+
+        return cumulative
+
+
+class Metrics:
+    """The histograms and the counters, labelled by a stage or a service."""
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self._buckets = buckets
+        self._histograms: dict[tuple[str, str, str], Histogram] = {}
+        self._counters: dict[tuple[str, str, str], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, label: str, value: str, seconds: float):
+        """Records the duration in the histogram of the metric and its label."""
+
+        with self._lock:
+            key = (name, label, value)
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(self._buckets)
+            self._histograms[key].observe(seconds)
+
+    def increment(self, name: str, label: str, value: str, amount: float = 1):
+        """Adds the amount to the counter of the metric and its label."""
+
+        with self._lock:
+            key = (name, label, value)
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def get_counter(self, name: str, label: str, value: str) -> float:
+        """Returns the value of the counter, 0 if it was never incremented."""
+
+        with self._lock:
+            return self._counters.get((name, label, value), 0)
+
+    def get_histogram(self, name: str, label: str, value: str) -> Histogram:
+        """Returns the histogram, None if nothing was recorded."""
+
+        with self._lock:
+            return self._histograms.get((name, label, value))
+
+    def get_prometheus_text(self) -> str:
+        """
+        Returns the metrics in the Prometheus text exposition format.
+
+        Returns:
+            str: The families of the metrics, sorted by their names and labels.
+        """
+
+        lines = []
+
+        with self._lock:
+            families = {}
+            for key in sorted(self._histograms):
+                families.setdefault(key[0], []).append(key)
+            for key in sorted(self._counters):
+                families.setdefault(key[0], []).append(key)
+
+            for name in sorted(families):
+                metric_type, metric_help = METRIC_HELP.get(name, ("untyped", name))
+                lines.append(f"# HELP {name} {metric_help}")
+                lines.append(f"# TYPE {name} {metric_type}")
+
+                for _, label, value in families[name]:
+                    labels = f'{label}="{escape_label(value)}"'
+
+                    if metric_type != "histogram":
+                        counter = self._counters[(name, label, value)]
+                        lines.append(f"{name}{{{labels}}} {counter:g}")
+                        continue
+
+                    histogram = self._histograms[(name, label, value)]
+                    for bound, count in histogram.get_cumulative_counts():
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+        return "\n".join(lines) + "\n"
+
+
+_METRICS = Metrics(METRICS["buckets"])
+
+
+def get_metrics() -> Metrics:
+    """Returns the process-wide metrics."""
+
+    return _METRICS
+
+
+def escape_label(value: str) -> str:
+    """Escapes the value of a Prometheus label."""
+
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+@contextmanager
+def span(stage: str) -> Iterator[dict]:
+    """
+    Times the stage, counting the requests made inside it and its nested spans,
+    on its thread and in the tasks it submits to the executors.
+
+    Parameters:
+        stage (str): The name of the stage, the label of its histogram.
+
+    Yields:
+        dict: The record of the span, written to the JSON lines at its end.
+    """
+
+    record = {
+        "stage": stage,
+        "parent": None,
+        "requests": 0,
+        "bytes": 0,
+        "error": None,
+    }
+    spans = _OPEN_SPANS.get()
+    if spans:
+        record["parent"] = spans[-1]["stage"]
+
+    token = _OPEN_SPANS.set((*spans, record))
+    start = time.perf_counter()
+
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        _METRICS.increment(STAGE_ERRORS, "stage", stage)
+        raise
+    finally:
+        record["seconds"] = round(time.perf_counter() - start, 6)
+        _OPEN_SPANS.reset(token)
+
+        _METRICS.observe(STAGE_DURATION, "stage", stage, record["seconds"])
+        log_span(record)
+
+
+def timed(stage: str = None) -> Callable:
+    """
+    Decorator running the function, or the coroutine function, in a timing span.
+
+    Parameters:
+        stage (str): The name of the stage, the name of the function by default.
+    """
+
+    def decorator(func):
+        name = stage or func.__name__
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record_response(service: str, response_bytes: int, seconds: float = None):
+    """
+    Counts a request to the service, in the process and in every open span.
+
+    Parameters:
+        service (str): The name of the service, the label of its metrics.
+        response_bytes (int): The size of the response body.
+        seconds (float): The duration of the request, if known.
+    """
+
+    _METRICS.increment(REQUESTS, "service", service)
+    _METRICS.increment(RESPONSE_BYTES, "service", service, response_bytes)
+
+    if seconds is not None:
+        _METRICS.observe(REQUEST_DURATION, "service", service, seconds)
+
+    with _SPAN_LOCK:
+        for record in _OPEN_SPANS.get():
+            record["requests"] += 1
+            record["bytes"] += response_bytes
+
+
+def instrument_session(session: requests.Session, service: str) -> requests.Session:
+    """
+    Counts the responses of the session as the requests to the service, only once.
+
+    Returns:
+        requests.Session: The same session.
+    """
+
+    def count_response(response: requests.Response, *args, **kwargs):
+        # pylint: disable=unused-argument
+        record_response(
+            service, get_response_bytes(response), response.elapsed.total_seconds()
+        )
+
+    if getattr(session, "instrumented_service", None) is None:
+        session.instrumented_service = service
+        session.hooks["response"].append(count_response)
+
+    return session
+
+
+def get_response_bytes(response: requests.Response) -> int:
+    """
+    Returns the size of the response body, from its Content-Length header if present,
+    so a streamed body is not loaded to be measured.
+    """
+
+    length = response.headers.get("Content-Length")
+    if length is not None and length.isdigit():
+        return int(length)
+
+    return len(response.content)
+
+
+def log_span(record: dict):
+    """Writes the span as a JSON line, if `logger.set_metrics_logging` was called."""
+
+    logger = logging.getLogger(METRICS_LOGGER)
+
+    if logger.isEnabledFor(logging.INFO):
+        line = {"time": datetime.now(timezone.utc).isoformat(), **record}
+        logger.info(json.dumps(line))
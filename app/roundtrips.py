@@ -0,0 +1,213 @@
+"""
+This module counts the blocking requests of the Earth Engine client, the round-trips.
+
+Each `getInfo`, `getMapId` or other synchronous call waits for a response from
+the server, so the round-trips are the main latency of a click. They are counted
+on the transport of the client, tagged by the call site in the app that made them:
+    - in the `app_earth_engine_roundtrips_total` metric of each call site, see `metrics.py`,
+    - in the `count_roundtrips` recorders open in the context of the request,
+      for the tests and the benchmarks.
+
+The tests fail on a new blocking call in a path with `assert_max_roundtrips`:
+
+    with assert_max_roundtrips(1):
+        get_map_point_data(lat, lon, periods)
+"""
+
+# Python
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import os
+import sys
+import threading
+import time
+from typing import Callable, Iterator
+
+# Third party
+from ee import _cloud_api_utils
+
+# App
+from metrics import EARTH_ENGINE_ROUNDTRIPS, get_metrics
+
+# The call sites are the innermost frames in the repository, out of the dependencies
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXCLUDED_PATHS = ("site-packages", "dist-packages", os.path.abspath(__file__))
+
+
+class RoundTripCounter:
+    """The round-trips to Earth Engine made in its context while it is open."""
+
+    def __init__(self):
+        self.roundtrips: list[dict] = []
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        """The number of the round-trips."""
+
+        with self._lock:
+            return len(self.roundtrips)
+
+    def add(self, roundtrip: dict):
+        """Records a round-trip."""
+
+        with self._lock:
+            self.roundtrips.append(roundtrip)
+
+    def get_call_sites(self) -> Counter:
+        """Returns the number of the round-trips of each call site."""
+
+        with self._lock:
+            return Counter(roundtrip["call_site"] for roundtrip in self.roundtrips)
+
+
+def get_call_site(frame=None) -> str:
+    """
+    Returns the innermost frame of the repository that led to the request.
+
+    Returns:
+        str: "<path>:<line> <function>", the path relative to the repository,
+        or "unknown" for a request made outside of it.
+    """
+
+    frame = frame or sys._getframe(1)  # pylint: disable=protected-access
+
+    while frame is not None:
+        path = frame.f_code.co_filename
+
+        if path.startswith(ROOT_PATH) and not any(
+            excluded in path for excluded in EXCLUDED_PATHS
+        ):
+            relative_path = os.path.relpath(path, ROOT_PATH).replace(os.sep, "/")
+            return f"{relative_path}:{frame.f_lineno} {frame.f_code.co_name}"
+
+        frame = frame.f_back
+
+    return "unknown"
+
+
+def record_roundtrip(method: str, uri: str, seconds: float, call_site: str = None):
+    """
+    Counts a round-trip to Earth Engine.
+
+    Parameters:
+        method (str): The HTTP method of the request.
+        uri (str): The URI of the request, without the query.
+        seconds (float): The duration of the round-trip.
+        call_site (str): The call site, found on the stack of the caller by default.
+    """
+
+    roundtrip = {
+        "call_site": call_site or get_call_site(),
+        "method": method,
+        "uri": uri.split("?")[0],
+        "seconds": seconds,
+    }
+
+    get_metrics().increment(
+        EARTH_ENGINE_ROUNDTRIPS, "call_site", roundtrip["call_site"]
+    )
+
+    for recorder in get_recorders():
+        recorder.add(roundtrip)
+
+
+class CountedRequest:
+    """
+    The request method of the transport of the client, counting its round-trips.
+
+    It holds the open recorders, so they are shared
+    when the module is imported under two names.
+    """
+
+    counts_roundtrips = True
+
+    def __init__(self, request: Callable):
+        functools.update_wrapper(self, request)
+        self.request = request
+        self.recorders: ContextVar = ContextVar("roundtrip_recorders", default=())
+
+    def __get__(self, instance, owner=None):
+        return self if instance is None else functools.partial(self, instance)
+
+    def __call__(self, http, uri, *args, **kwargs):
+        method = kwargs.get("method", args[0] if args else "GET")
+        start = time.perf_counter()
+        try:
+            return self.request(http, uri, *args, **kwargs)
+        finally:
+            record_roundtrip(method, uri, time.perf_counter() - start)
+
+
+def get_counted_request() -> CountedRequest:
+    """Returns the counting request of the transport, installed on the first call."""
+
+    install_roundtrip_counter()
+    return vars(_cloud_api_utils._Http)["request"]  # pylint: disable=protected-access
+
+
+def get_recorders() -> tuple[RoundTripCounter, ...]:
+    """Returns the recorders open in the current context."""
+
+    return get_counted_request().recorders.get()
+
+
+def install_roundtrip_counter():
+    """Counts every request of the Earth Engine client, only once per process."""
+
+    http_class = _cloud_api_utils._Http  # pylint: disable=protected-access
+    request = vars(http_class)["request"]
+
+    if getattr(request, "counts_roundtrips", False):
+        return
+
+    http_class.request = CountedRequest(request)
+
+
+@contextmanager
+def count_roundtrips() -> Iterator[RoundTripCounter]:
+    """
+    Records the round-trips made in the context, on the thread and in the tasks
+    it submits to the executors of the app, see `concurrency.py`. The background
+    threads, e.g. the health probe or the warm-up, are left out.
+
+    Yields:
+        RoundTripCounter: The round-trips made until the exit.
+    """
+
+    recorder = RoundTripCounter()
+    recorders = get_counted_request().recorders
+    token = recorders.set((*recorders.get(), recorder))
+
+    try:
+        yield recorder
+    finally:
+        recorders.reset(token)
+
+
+@contextmanager
+def assert_max_roundtrips(limit: int) -> Iterator[RoundTripCounter]:
+    """
+    Fails if the code inside makes more round-trips than the limit.
+
+    Parameters:
+        limit (int): The budget of the round-trips.
+
+    Raises:
+        AssertionError: Listing the round-trips by their call sites.
+    """
+
+    with count_roundtrips() as recorder:
+        yield recorder
+
+    if recorder.count > limit:
+        call_sites = "\n".join(
+            f"    {count} x {call_site}"
+            for call_site, count in recorder.get_call_sites().most_common()
+        )
+        raise AssertionError(
+            f"{recorder.count} Earth Engine round-trips, over the budget of {limit}:\n"
+            f"{call_sites}"
+        )
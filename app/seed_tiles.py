@@ -0,0 +1,115 @@
+"""
+This script seeds the disk cache of the tile proxy with the tiles of the map layers
+over the region of interest, so the first users after a deploy or a cache wipe
+do not wait for the tiles of Google Earth Engine.
+
+Run it after a deploy or overnight, again after an interruption to resume:
+
+    python app/seed_tiles.py [--layers elevation slope ...] [--min-zoom 3] [--max-zoom 8]
+
+The running app picks up the seeded tiles, see `TILE_SEEDING` in `config.py`.
+They are served by the tile proxy, so it has to be enabled, see `TILE_PROXY`.
+"""
+
+# Python
+import time
+
+# App
+from cli import create_layers_parser
+from config import MAP_DATA, ROI, TILE_PROXY, TILE_SEEDING
+from layers import LAYER_REGISTRY
+from stages.server_connection import establish_connection
+from stages.data_acquisition.region import get_region_data
+from stages.tiles.roi_quadtree import RoiQuadtree
+from stages.tiles.seeding import TileSeeder
+from stages.tiles.tile_cache import TileCache
+from stages.tiles.tile_ids import get_map_vis_params, get_tile_layer
+
+
+def report_zoom(key: str, stats: dict):
+    """Prints the statistics of the seeded zoom level."""
+
+    if stats["resumed"]:
+        print(f"{key} z{stats['zoom']}: completed before, skipped")
+        return
+
+    seconds = max(stats["seconds"], 1e-9)
+
+    print(
+        f"{key} z{stats['zoom']}: {stats['tiles']} tiles, "
+        f"{stats['fetched']} fetched, {stats['cached']} cached, {stats['failed']} failed, "
+        f"{stats['bytes'] / 1024**2:.1f} MB written, "
+        f"{stats['fetched'] / seconds:.1f} tiles/s"
+    )
+
+
+def seed_tiles(keys: list[str], min_zoom: int, max_zoom: int):
+    """Seeds the tiles of the layers, reporting the progress of each zoom level."""
+
+    establish_connection()
+
+    maps = get_region_data(ROI, LAYER_REGISTRY)["maps"]
+
+    seeder = TileSeeder(
+        TileCache(TILE_PROXY["cache_path"], TILE_PROXY["max_bytes"]),
+        RoiQuadtree(ROI["roi_coords"], TILE_PROXY["roi_max_zoom"]),
+    )
+
+    start = time.perf_counter()
+    fetched = written = failed = 0
+
+    try:
+        for key in keys:
+            image = maps[key]["data"]
+            vis_params = get_map_vis_params(maps[key]["vis_params"])
+
+            for stats in seeder.seed_layer(
+                key,
+                lambda image=image, vis_params=vis_params: get_tile_layer(
+                    image, vis_params
+                ),
+                min_zoom,
+                max_zoom,
+            ):
+                report_zoom(key, stats)
+
+                fetched += stats["fetched"]
+                written += stats["bytes"]
+                failed += stats["failed"]
+    finally:
+        seeder.close()
+
+    seconds = time.perf_counter() - start
+
+    print(
+        f"Seeded {fetched} tiles, {written / 1024**2:.1f} MB written "
+        f"in {seconds:.0f} s, {fetched / max(seconds, 1e-9):.1f} tiles/s"
+    )
+    if failed:
+        print(f"{failed} tiles failed, run the seeding again to retry them")
+
+
+if __name__ == "__main__":
+
+    parser = create_layers_parser(__doc__, list(MAP_DATA), "seed")
+    parser.add_argument(
+        "--min-zoom",
+        type=int,
+        default=TILE_SEEDING["min_zoom"],
+        help="The first zoom level.",
+    )
+    parser.add_argument(
+        "--max-zoom",
+        type=int,
+        default=TILE_SEEDING["max_zoom"],
+        help="The last zoom level.",
+    )
+    arguments = parser.parse_args()
+
+    if not TILE_PROXY["enabled"]:
+        print(
+            "The seeded tiles are served by the tile proxy, which is disabled, "
+            'set TILE_PROXY["enabled"] to True for the app to use them.'
+        )
+
+    seed_tiles(arguments.layers, arguments.min_zoom, arguments.max_zoom)
@@ -0,0 +1,34 @@
+"""
+This script starts the Streamlit app with the warm-up of its caches,
+so the first session after the start finds the app ready:
+
+    python app/serve.py [--server.port 8501 ...]
+
+The options are passed to `streamlit run`. The readiness of the app is served
+by the tile proxy on "/ready", if it is enabled, see `warmup.py`.
+"""
+
+# Python
+import os
+import sys
+
+# Third party
+from streamlit.web import cli as streamlit_cli
+
+# App
+from stages.tiles.proxy import warn_about_disabled_proxy
+from warmup import start_warmup
+
+if __name__ == "__main__":
+
+    warn_about_disabled_proxy(serves_readiness=True)
+
+    # The script of the app runs in this process, it shares the warmed-up caches
+    start_warmup()
+
+    app_path = os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "streamlit_app.py"
+    )
+    sys.argv = ["streamlit", "run", app_path, *sys.argv[1:]]
+
+    sys.exit(streamlit_cli.main())
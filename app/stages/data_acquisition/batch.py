@@ -0,0 +1,282 @@
+"""
+This module contains functions to retrieve data for many points at once,
+like the candidate plots of a planner.
+
+The points are split into chunks, each chunk is sampled in a single request
+to the server with a feature collection, and the chunks are streamed back
+as they complete. The data is columnar, with the same no-data values and
+afforestation evaluation as a single point from `point.py`.
+The addresses are not included, the Nominatim usage policy allows one request a second.
+"""
+
+# Python
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Iterator, Sequence
+
+# Third party
+import ee
+import numpy as np
+
+# App
+from concurrency import get_executor
+from config import BATCH_POINTS, POINT_DATA_BACKEND
+from stages.data_acquisition.point import (
+    POINT_SAMPLING,
+    fetch_point_layers,
+    open_local_layer,
+)
+from stages.data_categorization import evaluate_afforestation_candidates
+from validation import handle_ee_operations, validate_coordinates
+
+
+def get_map_points_data(
+    lats: Sequence[float],
+    lons: Sequence[float],
+    periods: dict,
+    chunk_size: int = None,
+) -> Iterator[dict]:
+    """
+    Retrieves the data for many points, yielding the chunks as they complete.
+
+    Parameters:
+        lats (list): Latitudes of the points.
+        lons (list): Longitudes of the points.
+        periods (dict): The date range for the soil moisture and precipitation data
+        chunk_size (int): Points per request, `BATCH_POINTS["chunk_size"]` by default.
+
+    Yields:
+        dict: The columns of a chunk, see `compose_map_points_data`.
+        The "index" column holds the positions of the points in the input.
+    """
+    lats = [float(lat) for lat in lats]
+    lons = [float(lon) for lon in lons]
+
+    if len(lats) != len(lons):
+        raise ValueError("The latitudes and longitudes should have the same length.")
+
+    for lat, lon in zip(lats, lons):
+        validate_coordinates(lat, lon)
+
+    chunk_size = chunk_size or BATCH_POINTS["chunk_size"]
+    starts = iter(range(0, len(lats), chunk_size))
+
+    executor = get_executor()
+    pending = set()
+
+    try:
+        while True:
+            while len(pending) < BATCH_POINTS["max_chunks_in_flight"]:
+                start = next(starts, None)
+                if start is None:
+                    break
+
+                end = start + chunk_size
+                pending.add(
+                    executor.submit(
+                        get_points_chunk_data,
+                        start,
+                        lats[start:end],
+                        lons[start:end],
+                        periods,
+                    )
+                )
+
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                yield future.result()
+
+    finally:
+        # The consumer stopped early or a chunk failed
+        for future in pending:
+            future.cancel()
+
+
+def merge_map_points_data(chunks: Iterator[dict]) -> dict:
+    """
+    Merges the chunks of `get_map_points_data` into columns in the input order.
+
+    Parameters:
+        chunks (iterator): The chunks of the points data.
+
+    Returns:
+        dict: The columns of all the points.
+    """
+    columns = {}
+
+    # The chunks hold consecutive points
+    for chunk in sorted(chunks, key=lambda chunk: chunk["index"][0]):
+        for column, values in chunk.items():
+            columns.setdefault(column, []).extend(values)
+
+    return columns
+
+
+def get_points_chunk_data(
+    start: int, lats: list[float], lons: list[float], periods: dict
+) -> dict:
+    """
+    Retrieves the data for a chunk of the points.
+
+    Parameters:
+        start (int): The position of the first point of the chunk in the input.
+        lats (list): Latitudes of the points.
+        lons (list): Longitudes of the points.
+        periods (dict): The date range for the soil moisture and precipitation data
+
+    Returns:
+        dict: The columns of the chunk.
+    """
+
+    if POINT_DATA_BACKEND == "local":
+        layers = sample_local_points_layers(lats, lons, periods)
+    else:
+        layers = sample_points_layers(lats, lons, periods)
+
+    return compose_map_points_data(start, lats, lons, layers)
+
+
+@handle_ee_operations
+def sample_points_layers(lats: list[float], lons: list[float], periods: dict) -> dict:
+    """
+    Samples the values of all the layers at many points in a single request to the server.
+
+    The layers sharing a reducer and a scale are stacked into one multi-band image,
+    each stack reduces the regions of the feature collection of the points in turn.
+
+    Parameters:
+        lats (list): Latitudes of the points.
+        lons (list): Longitudes of the points.
+        periods (dict): The date range for the soil moisture and precipitation data
+
+    Returns:
+        dict: The column of values of each layer keyed like `POINT_SAMPLING`.
+    """
+    coordinates = [[lon, lat] for lat, lon in zip(lats, lons)]
+
+    features = ee.FeatureCollection(
+        [
+            ee.Feature(ee.Geometry.Point(point), {"index": index})
+            for index, point in enumerate(coordinates)
+        ]
+    )
+    layers = fetch_point_layers(ee.Geometry.MultiPoint(coordinates), periods)
+
+    groups: dict[str, list[str]] = {}
+    for key in layers:
+        sampling = POINT_SAMPLING[key]
+        group = f"{sampling['reducer']}_{sampling['scale']}"
+        groups.setdefault(group, []).append(key)
+
+    for keys in groups.values():
+        sampling = POINT_SAMPLING[keys[0]]
+        reducer = getattr(ee.Reducer, sampling["reducer"])()
+
+        if len(keys) == 1:
+            # A single band would be named after the reducer output
+            reducer = reducer.setOutputs([sampling["band"]])
+
+        features = ee.Image.cat(*[layers[key] for key in keys]).reduceRegions(
+            collection=features,
+            reducer=reducer,
+            scale=sampling["scale"],
+        )
+
+    bands = [POINT_SAMPLING[key]["band"] for key in layers]
+    samples = features.select(["index", *bands], None, False).getInfo()
+
+    return read_points_samples(samples, len(coordinates))
+
+
+def read_points_samples(samples: dict, count: int) -> dict:
+    """
+    Reads the columns of values from the sampled feature collection.
+
+    Parameters:
+        samples (dict): The feature collection returned by the server.
+        count (int): The number of points.
+
+    Returns:
+        dict: The column of values of each layer keyed like `POINT_SAMPLING`,
+        the missing values are replaced with the no-data value of the layer.
+    """
+
+    values = {
+        key: [sampling["no_data"]] * count for key, sampling in POINT_SAMPLING.items()
+    }
+
+    for feature in samples["features"]:
+        properties = feature["properties"]
+        index = properties["index"]
+
+        for key, sampling in POINT_SAMPLING.items():
+            value = properties.get(sampling["band"])
+
+            if value is not None:
+                values[key][index] = value
+
+    return values
+
+
+def sample_local_points_layers(
+    lats: list[float], lons: list[float], periods: dict
+) -> dict:
+    """
+    Reads the values of all the layers at many points from the local raster store.
+
+    Parameters:
+        lats (list): Latitudes of the points.
+        lons (list): Longitudes of the points.
+        periods (dict): The date range for the soil moisture and precipitation data
+
+    Returns:
+        dict: The column of values of each layer keyed like `POINT_SAMPLING`.
+    """
+
+    values = {}
+    for key, sampling in POINT_SAMPLING.items():
+        layer = open_local_layer(key, periods)
+        column = layer.sample(lats, lons)
+
+        values[key] = [
+            sampling["no_data"] if value == layer.spec.no_data else value
+            for value in column.tolist()
+        ]
+
+    return values
+
+
+def compose_map_points_data(
+    start: int, lats: list[float], lons: list[float], layers: dict
+) -> dict:
+    """
+    Combines the columns of the layers values with the afforestation evaluation.
+
+    Parameters:
+        start (int): The position of the first point in the input.
+        lats (list): Latitudes of the points.
+        lons (list): Longitudes of the points.
+        layers (dict): The column of values of each layer keyed like `POINT_SAMPLING`.
+
+    Returns:
+        dict: The columns "index", "lat", "lon", the layers keys
+        and "afforestation_validation".
+    """
+    data = {
+        "index": list(range(start, start + len(lats))),
+        "lat": list(lats),
+        "lon": list(lons),
+        **layers,
+    }
+
+    data["afforestation_validation"] = evaluate_afforestation_candidates(
+        np.asarray(data["slope"], dtype=np.float64),
+        np.asarray(data["precipitation"], dtype=np.float64),
+        np.asarray(data["soil_moisture"], dtype=np.float64),
+        np.asarray(data["world_cover_code"], dtype=np.int64),
+    ).tolist()
+
+    return data
@@ -136,12 +136,9 @@ def fetch_slope_data(geometry: ee.Geometry) -> ee.Image:
     """
     elevation = ee.Image(GEE_MAP_COLLECTIONS["elevation"])
 
-    # Check if geometry is a point and handle accordingly
-    # Expand the region slightly around the point for reliable slope calculation
-    if geometry.type().getInfo() == "Point":
-        buffer_distance = SIZE_SAMPLE_METERS
-        geometry = geometry.buffer(buffer_distance)
-
+    # NOTE: A point geometry has to be expanded by the caller
+    # (see `buffer_point_geometry`), the slope needs neighbouring pixels.
+    # Checking the geometry type here would cost a blocking server round-trip.
     slope = ee.Terrain.slope(elevation.clip(geometry))
     return slope.rename("slope")
 
@@ -185,3 +182,17 @@ def fetch_world_cover_data(geometry: ee.Geometry) -> ee.Image:
     )
 
     return world_cover.rename("world_cover")
+
+
+def buffer_point_geometry(point: ee.Geometry) -> ee.Geometry:
+    """
+    Expands a point slightly, so the terrain calculations have neighbouring pixels.
+
+    Parameters:
+        point (ee.Geometry): The point geometry.
+
+    Returns:
+        ee.Geometry: The point buffered by the sample size.
+    """
+
+    return point.buffer(SIZE_SAMPLE_METERS)
@@ -0,0 +1,208 @@
+"""
+This module contains the client of the Nominatim reverse geocoding API.
+
+All the sessions of the app share one client, so they share:
+    - the kept-alive connections,
+    - the rate limit of the Nominatim usage policy,
+    - the identical requests running at the same time,
+    - the cache of the addresses in memory and on disk.
+"""
+
+# Python
+import asyncio
+import threading
+from typing import Union
+
+# Third party
+import requests
+from requests.adapters import HTTPAdapter
+
+# App
+from cache import MemoryCache, PersistentCache, open_cache
+from concurrency import RequestCoalescer, TokenBucket, get_executor
+from config import GEOCODING
+from metrics import instrument_session, timed
+
+_SESSION = {"session": None}
+_SESSION_LOCK = threading.Lock()
+
+_RATE_LIMITER = TokenBucket(GEOCODING["requests_per_second"])
+_COALESCER = RequestCoalescer()
+_ADDRESSES = MemoryCache(GEOCODING["memory_entries"])
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the process-wide session keeping the connections to the API alive.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+
+    with _SESSION_LOCK:
+        if _SESSION["session"] is None:
+            session = requests.Session()
+            session.headers["User-Agent"] = GEOCODING["user_agent"]
+
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=GEOCODING["pool_size"]
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+
+            _SESSION["session"] = instrument_session(session, "nominatim")
+
+        return _SESSION["session"]
+
+
+def get_address_cache() -> PersistentCache:
+    """Returns the on-disk cache of the addresses shared by all the sessions."""
+
+    return open_cache(GEOCODING["cache_path"], GEOCODING["max_entries"])
+
+
+def get_address_key(lat: float, lon: float) -> str:
+    """
+    Builds the cache key of the address from the rounded coordinates.
+
+    Parameters:
+        lat (float): Latitude of the point.
+        lon (float): Longitude of the point.
+
+    Returns:
+        str: The cache key.
+    """
+    precision = GEOCODING["precision"]
+
+    return (
+        f"{round(lat, precision):.{precision}f}|{round(lon, precision):.{precision}f}"
+    )
+
+
+def get_cached_address(key: str) -> Union[str, None]:
+    """
+    Returns the address from the memory or from the disk, or None if it is missing.
+    """
+
+    address = _ADDRESSES.get(key)
+
+    if address is None:
+        address = get_address_cache().get(key)
+
+        if address is not None:
+            _ADDRESSES.set(key, address)
+
+    return address
+
+
+def cache_address(key: str, address: str):
+    """Stores the address in the memory and on the disk."""
+
+    _ADDRESSES.set(key, address)
+    get_address_cache().set(key, address, GEOCODING["ttl_seconds"])
+
+
+@timed()
+def reverse_geocode(lat: float, lon: float) -> str:
+    """
+    Fetch address from Nominatim Geocoding API using latitude and longitude.
+
+    Parameters:
+        lat (float): Latitude of the point.
+        lon (float): Longitude of the point.
+
+    Returns:
+        str: Address of the given point, or 'No address found.' if no address is available.
+    """
+    key = get_address_key(lat, lon)
+
+    address = get_cached_address(key)
+    if address is not None:
+        return address
+
+    return _COALESCER.run(key, lambda: fetch_address(key, lat, lon))
+
+
+@timed()
+async def areverse_geocode(lat: float, lon: float) -> str:
+    """
+    Fetch address from Nominatim Geocoding API without blocking the event loop.
+
+    The cached addresses are returned right away, otherwise the request runs
+    on the bounded geocoding pool with the shared session. The event loop of the app
+    lives only for one rerun, so its own connections could not be kept alive
+    between the clicks, and its default executor would not bound the threads.
+
+    Parameters:
+        lat (float): Latitude of the point.
+        lon (float): Longitude of the point.
+
+    Returns:
+        str: Address of the given point, or 'No address found.' if no address is available.
+    """
+    address = get_cached_address(get_address_key(lat, lon))
+    if address is not None:
+        return address
+
+    loop = asyncio.get_running_loop()
+
+    return await loop.run_in_executor(
+        get_executor("geocoding"), reverse_geocode, lat, lon
+    )
+
+
+def fetch_address(key: str, lat: float, lon: float) -> str:
+    """
+    Requests the address from the API within the rate limit, caching the answer.
+    During a burst of clicks over the rate limit, the request is not sent.
+
+    Parameters:
+        key (str): The cache key of the address.
+        lat (float): Latitude of the point.
+        lon (float): Longitude of the point.
+
+    Returns:
+        str: The address, or the description of the failure.
+    """
+    params = {"lat": lat, "lon": lon, "format": "json"}
+
+    if not _RATE_LIMITER.acquire(GEOCODING["max_wait_seconds"]):
+        return "Geocoding is busy, try again in a moment."
+
+    try:
+        response = get_session().get(
+            GEOCODING["url"], params=params, timeout=GEOCODING["timeout"]
+        )
+        return read_geocoding_response(key, response)
+
+    except requests.exceptions.RequestException as e:
+        return f"Network error during geocoding: {str(e)}"
+
+
+def read_geocoding_response(key: str, response: requests.Response) -> str:
+    """
+    Reads the address from the response of the API, only the answers are cached.
+
+    Parameters:
+        key (str): The cache key of the address.
+        response (requests.Response): The response of the API.
+
+    Returns:
+        str: The address, or the description of the failure.
+    """
+
+    IS_SUCCESS = response.status_code == 200
+
+    if IS_SUCCESS:
+        json_result = response.json()
+        address = json_result.get("display_name") or "No address found."
+        cache_address(key, address)
+        return address
+    else:
+        return f"Error in Geocoding API call. Status Code: {response.status_code}"
+
+
+def clear_addresses():
+    """Forgets the addresses kept in the memory."""
+
+    _ADDRESSES.clear()
@@ -0,0 +1,306 @@
+"""
+This module contains the local raster store of the layers sampled at the points.
+
+Each layer is a directory holding a manifest and the square chunks of the raster
+as NumPy files, which are memory-mapped on read. The chunks having no data at all
+are not written, most of the bounding box of the Sahel lies outside the polygon.
+The store is built once with `export_rasters.py`, then the points are sampled
+without any network call.
+"""
+
+# Python
+from functools import lru_cache
+import json
+import math
+import os
+import threading
+from typing import NamedTuple
+
+# Third party
+import numpy as np
+
+MANIFEST_FILE = "manifest.json"
+
+
+class LayerSpec(NamedTuple):
+    """The grid and the pixels of a layer, as written in its manifest."""
+
+    bounds: tuple[float, float, float, float]  # west, south, east and north, degrees
+    resolution: float  # the pixel size in degrees
+    chunk_size: int  # the side of the square chunks in pixels
+    dtype: str  # the NumPy type of the pixels
+    no_data: float  # the value of the pixels without data
+    period: dict = None  # the date range of a time-windowed layer
+
+
+class RasterLayer:
+    """
+    A layer of the local raster store, the chunks are memory-mapped on first use.
+    """
+
+    def __init__(self, path: str):
+        """
+        Parameters:
+            path (str): The directory of the layer.
+        """
+
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(
+                f"No local raster at '{path}', export the layers first."
+            )
+
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        self.path = path
+        self.manifest = manifest
+        self.spec = LayerSpec(
+            bounds=tuple(manifest["bounds"]),
+            resolution=manifest["resolution"],
+            chunk_size=manifest["chunk_size"],
+            dtype=manifest["dtype"],
+            no_data=manifest["no_data"],
+            period=manifest.get("period"),
+        )
+        self.height, self.width = manifest["shape"]
+
+        self._chunks: dict[tuple[int, int], np.ndarray] = {}
+        self._chunks_lock = threading.Lock()
+
+    def get_chunk(self, chunk_row: int, chunk_col: int) -> np.ndarray:
+        """
+        Returns the memory-mapped chunk, or a chunk filled with no data if it was not written.
+        """
+
+        key = (chunk_row, chunk_col)
+
+        with self._chunks_lock:
+            chunk = self._chunks.get(key)
+
+            if chunk is None:
+                chunk_path = os.path.join(
+                    self.path, get_chunk_file(chunk_row, chunk_col)
+                )
+
+                if os.path.exists(chunk_path):
+                    chunk = np.load(chunk_path, mmap_mode="r")
+                else:
+                    chunk_size = self.spec.chunk_size
+                    chunk = np.full(
+                        (chunk_size, chunk_size), self.spec.no_data, self.spec.dtype
+                    )
+
+                self._chunks[key] = chunk
+
+        return chunk
+
+    def sample(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """
+        Reads the pixels under the points, the points outside the raster have no data.
+
+        Parameters:
+            lats (np.ndarray): Latitudes of the points.
+            lons (np.ndarray): Longitudes of the points.
+
+        Returns:
+            np.ndarray: The values with the no-data value of the layer.
+        """
+
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        chunk_size = self.spec.chunk_size
+
+        rows, cols = self.get_pixel_indices(lats, lons)
+
+        inside = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+
+        values = np.full(lats.shape, self.spec.no_data, dtype=self.spec.dtype)
+
+        chunk_rows = rows // chunk_size
+        chunk_cols = cols // chunk_size
+
+        for chunk_row, chunk_col in set(
+            zip(chunk_rows[inside].tolist(), chunk_cols[inside].tolist())
+        ):
+            in_chunk = inside & (chunk_rows == chunk_row) & (chunk_cols == chunk_col)
+            chunk = self.get_chunk(chunk_row, chunk_col)
+
+            values[in_chunk] = chunk[
+                rows[in_chunk] % chunk_size, cols[in_chunk] % chunk_size
+            ]
+
+        return values
+
+    def read_grid(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """
+        Reads the pixels under every combination of the latitudes and the longitudes,
+        like the pixels of a map tile, chunk by chunk.
+
+        Parameters:
+            lats (np.ndarray): Latitudes of the grid rows.
+            lons (np.ndarray): Longitudes of the grid columns.
+
+        Returns:
+            np.ndarray: The values of the rows and the columns,
+            with the no-data value of the layer outside the raster.
+        """
+
+        chunk_size = self.spec.chunk_size
+
+        rows, cols = self.get_pixel_indices(
+            np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64)
+        )
+
+        values = np.full(
+            (rows.size, cols.size), self.spec.no_data, dtype=self.spec.dtype
+        )
+
+        rows_inside = (rows >= 0) & (rows < self.height)
+        cols_inside = (cols >= 0) & (cols < self.width)
+
+        chunk_rows = rows // chunk_size
+        chunk_cols = cols // chunk_size
+
+        for chunk_row in np.unique(chunk_rows[rows_inside]).tolist():
+            in_rows = np.flatnonzero(rows_inside & (chunk_rows == chunk_row))
+
+            for chunk_col in np.unique(chunk_cols[cols_inside]).tolist():
+                in_cols = np.flatnonzero(cols_inside & (chunk_cols == chunk_col))
+
+                values[np.ix_(in_rows, in_cols)] = self.get_chunk(chunk_row, chunk_col)[
+                    np.ix_(rows[in_rows] % chunk_size, cols[in_cols] % chunk_size)
+                ]
+
+        return values
+
+    def get_pixel_indices(
+        self, lats: np.ndarray, lons: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the rows of the latitudes and the columns of the longitudes."""
+
+        west, _, _, north = self.spec.bounds
+
+        return (
+            np.floor((north - lats) / self.spec.resolution).astype(np.int64),
+            np.floor((lons - west) / self.spec.resolution).astype(np.int64),
+        )
+
+    def sample_point(self, lat: float, lon: float):
+        """
+        Reads the pixel under the point.
+
+        Returns:
+            The value as a Python number, or the no-data value of the layer.
+        """
+
+        return self.sample(np.array([lat]), np.array([lon]))[0].item()
+
+
+def get_chunk_file(chunk_row: int, chunk_col: int) -> str:
+    """Returns the file name of the chunk."""
+
+    return f"r{chunk_row}_c{chunk_col}.npy"
+
+
+def get_grid_shape(bounds: list[float], resolution: float) -> tuple[int, int]:
+    """
+    Calculates the raster size covering the bounds.
+
+    Parameters:
+        bounds (list): The west, south, east and north edges in degrees.
+        resolution (float): The pixel size in degrees.
+
+    Returns:
+        tuple: The height and the width in pixels.
+    """
+    west, south, east, north = bounds
+
+    return (
+        math.ceil(round((north - south) / resolution, 6)),
+        math.ceil(round((east - west) / resolution, 6)),
+    )
+
+
+def create_layer(root: str, name: str, spec: LayerSpec) -> RasterLayer:
+    """
+    Creates an empty layer in the store, its chunks are written with `write_chunk`.
+
+    Parameters:
+        root (str): The directory of the store.
+        name (str): The layer key, like in `POINT_SAMPLING`.
+        spec (LayerSpec): The grid and the pixels of the layer.
+
+    Returns:
+        RasterLayer: The empty layer.
+    """
+
+    path = os.path.join(root, name)
+    os.makedirs(path, exist_ok=True)
+
+    for file in os.listdir(path):
+        if file.endswith(".npy"):
+            os.remove(os.path.join(path, file))
+
+    manifest = {
+        "bounds": list(spec.bounds),
+        "resolution": spec.resolution,
+        "shape": list(get_grid_shape(spec.bounds, spec.resolution)),
+        "chunk_size": spec.chunk_size,
+        "dtype": np.dtype(spec.dtype).name,
+        "no_data": spec.no_data,
+        "period": spec.period,
+    }
+
+    with open(os.path.join(path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    open_layer.cache_clear()
+
+    return RasterLayer(path)
+
+
+def write_chunk(layer: RasterLayer, chunk_row: int, chunk_col: int, array: np.ndarray):
+    """
+    Writes a chunk of the layer, the chunks having no data at all are skipped.
+
+    Parameters:
+        layer (RasterLayer): The layer created with `create_layer`.
+        chunk_row (int): The row of the chunk.
+        chunk_col (int): The column of the chunk.
+        array (np.ndarray): The pixels, smaller at the right and bottom edges of the raster.
+    """
+
+    spec = layer.spec
+
+    if array.ndim != 2 or any(side > spec.chunk_size for side in array.shape):
+        raise ValueError(
+            f"The chunk should be a 2D array of at most {spec.chunk_size} pixels a side."
+        )
+
+    array = np.asarray(array, dtype=spec.dtype)
+
+    if np.all(array == spec.no_data):
+        return
+
+    chunk = np.full((spec.chunk_size, spec.chunk_size), spec.no_data, spec.dtype)
+    chunk[: array.shape[0], : array.shape[1]] = array
+
+    np.save(os.path.join(layer.path, get_chunk_file(chunk_row, chunk_col)), chunk)
+
+
+@lru_cache(maxsize=None)
+def open_layer(root: str, name: str) -> RasterLayer:
+    """
+    Returns the process-wide layer of the store, opening it only once.
+
+    Parameters:
+        root (str): The directory of the store.
+        name (str): The layer key, like in `POINT_SAMPLING`.
+
+    Returns:
+        RasterLayer: The layer.
+    """
+
+    return RasterLayer(os.path.join(root, name))
@@ -2,12 +2,21 @@
 This module contains functions to retrieve data for a specific point on the map.
 """
 
+# Python
+import asyncio
+
 # Third party
-import requests
 import ee
 
 # App
-from config import SIZE_SAMPLE_METERS
+from cache import PersistentCache, open_cache, quantize_coordinates
+from concurrency import get_executor
+from config import (
+    SIZE_SAMPLE_METERS,
+    POINT_CACHE,
+    POINT_DATA_BACKEND,
+    LOCAL_RASTERS,
+)
 from stages.data_acquisition.gee_server import (
     fetch_total_precipitation_data,
     fetch_mean_soil_moisture_data,
@@ -15,10 +24,201 @@ from stages.data_acquisition.gee_server import (
     fetch_soil_organic_carbon_data,
     fetch_slope_data,
     fetch_world_cover_data,
+    buffer_point_geometry,
 )
+from stages.data_acquisition.geocoding import reverse_geocode, areverse_geocode
+from stages.data_acquisition.local_raster import RasterLayer, open_layer
 from stages.data_categorization import evaluate_afforestation_candidates
 from validation import handle_ee_operations, validate_coordinates
 
+# How each layer is sampled at a point: the band name, the reducer,
+# the scale in meters, the value returned if no data is available
+# and the period of the time-windowed layers.
+POINT_SAMPLING = {
+    "elevation": {
+        "band": "elevation",
+        "reducer": "first",
+        "scale": 10,  # Exception for scale for precision
+        "no_data": -1,
+    },
+    "slope": {
+        "band": "slope",
+        "reducer": "mean",
+        "scale": SIZE_SAMPLE_METERS,
+        # Assign a default value of 0
+        # if no elevation variation is detected in the area,
+        # which results in a 'None' slope value.
+        "no_data": 0,
+    },
+    "soil_moisture": {
+        "band": "mean_soil_moisture_root_zone",
+        "reducer": "first",
+        "scale": SIZE_SAMPLE_METERS,
+        "no_data": -1,
+        "period": "soil_moisture",
+    },
+    "precipitation": {
+        "band": "total_precipitation",
+        "reducer": "first",
+        "scale": SIZE_SAMPLE_METERS,
+        "no_data": -1,
+        "period": "precipitation",
+    },
+    "soil_organic_carbon": {
+        "band": "soil_organic_carbon",
+        "reducer": "first",
+        "scale": SIZE_SAMPLE_METERS,
+        "no_data": -1,
+    },
+    "world_cover_code": {
+        "band": "world_cover",
+        "reducer": "first",
+        "scale": SIZE_SAMPLE_METERS,
+        "no_data": -1,
+    },
+}
+
+
+@handle_ee_operations
+def fetch_point_layers(
+    point: ee.Geometry, periods: dict, keys: list[str] = None
+) -> dict[str, ee.Image]:
+    """
+    Builds the images of the layers sampled at a point.
+
+    Parameters:
+        point (ee.Geometry): The point geometry.
+        periods (dict): The date range for the soil moisture and precipitation data.
+        keys (list): The layer keys from `POINT_SAMPLING`, all of them by default.
+
+    Returns:
+        dict: The images keyed like `POINT_SAMPLING`.
+    """
+
+    def soil_moisture():
+        rainy_season = periods["soil_moisture"]
+        date_range = (rainy_season["start_date"], rainy_season["end_date"])
+        return fetch_mean_soil_moisture_data(date_range, point)
+
+    def precipitation():
+        year = periods["precipitation"]
+        date_range = (year["start_date"], year["end_date"])
+        return fetch_total_precipitation_data(date_range, point)
+
+    builders = {
+        "elevation": lambda: fetch_elevation_data(point),
+        # Expand the region slightly around the point for reliable slope calculation
+        "slope": lambda: fetch_slope_data(buffer_point_geometry(point)),
+        "soil_moisture": soil_moisture,
+        "precipitation": precipitation,
+        "soil_organic_carbon": lambda: fetch_soil_organic_carbon_data(point),
+        "world_cover_code": lambda: fetch_world_cover_data(point),
+    }
+
+    if keys is None:
+        keys = list(POINT_SAMPLING)
+
+    return {key: builders[key]() for key in keys}
+
+
+@handle_ee_operations
+def sample_point_layers(point: ee.Geometry, layers: dict[str, ee.Image]) -> dict:
+    """
+    Samples the values of many layers at a point in a single request to the server.
+
+    The layers sharing a reducer and a scale are stacked into one multi-band image,
+    so each layer keeps its own sampling settings from `POINT_SAMPLING`.
+
+    Parameters:
+        point (ee.Geometry): The point geometry.
+        layers (dict): The images keyed like `POINT_SAMPLING`.
+
+    Returns:
+        dict: The value of each layer at the point,
+        or the no-data value of the layer if no data is available.
+    """
+
+    groups: dict[str, list[str]] = {}
+    for key in layers:
+        sampling = POINT_SAMPLING[key]
+        group = f"{sampling['reducer']}_{sampling['scale']}"
+        groups.setdefault(group, []).append(key)
+
+    reductions = {}
+    for group, keys in groups.items():
+        sampling = POINT_SAMPLING[keys[0]]
+        stacked_image = ee.Image.cat(*[layers[key] for key in keys])
+
+        reductions[group] = stacked_image.reduceRegion(
+            reducer=getattr(ee.Reducer, sampling["reducer"])(),
+            geometry=point,
+            scale=sampling["scale"],
+        )
+
+    samples = ee.Dictionary(reductions).getInfo()
+
+    values = {}
+    for group, keys in groups.items():
+        group_samples = samples.get(group) or {}
+
+        for key in keys:
+            value = group_samples.get(POINT_SAMPLING[key]["band"])
+
+            if value is None:
+                value = POINT_SAMPLING[key]["no_data"]
+
+            values[key] = value
+
+    return values
+
+
+def sample_point_layer(lat: float, lon: float, key: str, periods: dict = None):
+    """
+    Samples a single layer at a point.
+
+    Parameters:
+        lat (float): Latitude of the point.
+        lon (float): Longitude of the point.
+        key (str): The layer key from `POINT_SAMPLING`.
+        periods (dict): The date range for the soil moisture and precipitation data.
+
+    Returns:
+        The value of the layer at the point, or the no-data value of the layer.
+    """
+
+    return get_map_point_layers(lat, lon, periods, [key])[key]
+
+
+def get_point_cache() -> PersistentCache:
+    """Returns the on-disk cache of the sampled values shared by all the sessions."""
+
+    return open_cache(POINT_CACHE["path"], POINT_CACHE["max_entries"])
+
+
+def get_point_cache_key(lat: float, lon: float, key: str, periods: dict) -> str:
+    """
+    Builds the cache key of a layer value, the point is snapped to the sample cell.
+
+    Parameters:
+        lat (float): Latitude of the point.
+        lon (float): Longitude of the point.
+        key (str): The layer key from `POINT_SAMPLING`.
+        periods (dict): The date range for the soil moisture and precipitation data.
+
+    Returns:
+        str: The cache key.
+    """
+    row, column = quantize_coordinates(lat, lon, SIZE_SAMPLE_METERS)
+
+    period_name = POINT_SAMPLING[key].get("period")
+    if period_name:
+        period = periods[period_name]
+        period_key = f"{period['start_date']}/{period['end_date']}"
+    else:
+        period_key = "static"
+
+    return f"{key}|{period_key}|{SIZE_SAMPLE_METERS}|{row}|{column}"
+
 
 @handle_ee_operations
 def get_rootzone_soil_moisture_point(
@@ -37,25 +237,9 @@ def get_rootzone_soil_moisture_point(
         float: Average soil moisture value at the given point for the specified date range,
         or -1 if no data is available.
     """
-    validate_coordinates(lat, lon)
-    point = ee.Geometry.Point([lon, lat])
-
-    mean_soil_moisture_image = fetch_mean_soil_moisture_data(
-        (start_date, end_date), point
-    )
+    periods = {"soil_moisture": {"start_date": start_date, "end_date": end_date}}
 
-    soil_moisture_value = (
-        mean_soil_moisture_image.reduceRegion(
-            ee.Reducer.first(), point, scale=SIZE_SAMPLE_METERS
-        )
-        .get("mean_soil_moisture_root_zone")
-        .getInfo()
-    )
-
-    if soil_moisture_value is None:
-        soil_moisture_value = -1
-
-    return soil_moisture_value
+    return sample_point_layer(lat, lon, "soil_moisture", periods)
 
 
 @handle_ee_operations
@@ -73,27 +257,11 @@ def get_precipitation_point(
 
     Returns:
         float: Total precipitation value at the given point for the specified date range,
-        or 0 if no data is available.
+        or -1 if no data is available.
     """
-    validate_coordinates(lat, lon)
-    point = ee.Geometry.Point([lon, lat])
+    periods = {"precipitation": {"start_date": start_date, "end_date": end_date}}
 
-    total_precipitation_image = fetch_total_precipitation_data(
-        (start_date, end_date), point
-    )
-
-    precipitation_value = (
-        total_precipitation_image.reduceRegion(
-            reducer=ee.Reducer.first(), geometry=point, scale=SIZE_SAMPLE_METERS
-        )
-        .get("total_precipitation")
-        .getInfo()
-    )
-
-    if precipitation_value is None:
-        precipitation_value = -1
-
-    return precipitation_value
+    return sample_point_layer(lat, lon, "precipitation", periods)
 
 
 @handle_ee_operations
@@ -108,24 +276,8 @@ def get_soil_organic_carbon_point(lat: float, lon: float) -> float:
     Returns:
         float: Soil organic carbon value at the given point, or -1 if no data is available.
     """
-    validate_coordinates(lat, lon)
-    point = ee.Geometry.Point([lon, lat])
-    soil_organic_carbon = fetch_soil_organic_carbon_data(point)
-
-    carbon_value = (
-        soil_organic_carbon.reduceRegion(
-            reducer=ee.Reducer.first(),
-            geometry=point,
-            scale=SIZE_SAMPLE_METERS,
-        )
-        .get("soil_organic_carbon")
-        .getInfo()
-    )
-
-    if carbon_value is None:
-        carbon_value = -1
 
-    return carbon_value
+    return sample_point_layer(lat, lon, "soil_organic_carbon")
 
 
 @handle_ee_operations
@@ -141,22 +293,8 @@ def get_elevation_point(lat: float, lon: float) -> float:
     Returns:
         float: Elevation value at the given point, or -1 if no data is available.
     """
-    validate_coordinates(lat, lon)
-    point = ee.Geometry.Point([lon, lat])
-    elevation_image = fetch_elevation_data(point)
-
-    elevation_value = (
-        elevation_image.reduceRegion(
-            ee.Reducer.first(), point, scale=10
-        )  # Exception for scale for precision
-        .get("elevation")
-        .getInfo()
-    )
-
-    if elevation_value is None:
-        elevation_value = -1
 
-    return elevation_value
+    return sample_point_layer(lat, lon, "elevation")
 
 
 @handle_ee_operations
@@ -171,28 +309,8 @@ def get_slope_point(lat: float, lon: float) -> float:
     Returns:
         float: Slope value at the given point, or 0 if no data is available.
     """
-    validate_coordinates(lat, lon)
-    point = ee.Geometry.Point([lon, lat])
-
-    slope = fetch_slope_data(point)
-
-    slope_value = (
-        slope.reduceRegion(
-            reducer=ee.Reducer.mean(),
-            geometry=point,
-            scale=SIZE_SAMPLE_METERS,
-        )
-        .get("slope")
-        .getInfo()
-    )
 
-    # Assign a default value of 0
-    # if no elevation variation is detected in the area,
-    # which results in a 'None' slope value.
-    if slope_value is None:
-        slope_value = 0
-
-    return slope_value
+    return sample_point_layer(lat, lon, "slope")
 
 
 @handle_ee_operations
@@ -207,24 +325,8 @@ def get_world_cover_point(lat: float, lon: float) -> str:
     Returns:
         str: World cover value at the given point, or `-1` if no data.
     """
-    validate_coordinates(lat, lon)
-    point = ee.Geometry.Point([lon, lat])
-    world_cover = fetch_world_cover_data(point)
 
-    world_cover_value = (
-        world_cover.reduceRegion(
-            reducer=ee.Reducer.first(),
-            geometry=point,
-            scale=SIZE_SAMPLE_METERS,
-        )
-        .get("world_cover")
-        .getInfo()
-    )
-
-    if world_cover_value is None:
-        world_cover_value = -1
-
-    return world_cover_value
+    return sample_point_layer(lat, lon, "world_cover_code")
 
 
 def get_address_from_point(lat: float, lon: float) -> str:
@@ -240,27 +342,132 @@ def get_address_from_point(lat: float, lon: float) -> str:
     """
     validate_coordinates(lat, lon)
 
-    base_url = "https://nominatim.openstreetmap.org/reverse"
-    headers = {"User-Agent": "MyApp"}
-    params = {"lat": lat, "lon": lon, "format": "json"}
+    return reverse_geocode(lat, lon)
+
+
+async def aget_address_from_point(lat: float, lon: float) -> str:
+    """
+    Fetch address from Nominatim Geocoding API without blocking the event loop.
+
+    Parameters:
+        lat (float): Latitude of the point.
+        lon (float): Longitude of the point.
+
+    Returns:
+        str: Address of the given point, or 'No address found.' if no address is available.
+    """
+    validate_coordinates(lat, lon)
+
+    return await areverse_geocode(lat, lon)
+
+
+@handle_ee_operations
+def get_map_point_layers(
+    lat: float, lon: float, periods: dict, keys: list[str] = None
+) -> dict:
+    """
+    Retrieves the values of the layers at a specific point.
+
+    The values are read from the on-disk cache first,
+    the missing ones are sampled in a single request to the server.
+    With the local backend, the values are read from the local raster store.
+
+    Parameters:
+        lat (float): Latitude of the point.
+        lon (float): Longitude of the point.
+        periods (dict): The date range for the soil moisture and precipitation data
+        keys (list): The layer keys from `POINT_SAMPLING`, all of them by default.
+
+    Returns:
+        dict: The value of each layer keyed like `POINT_SAMPLING`.
+    """
+    validate_coordinates(lat, lon)
+
+    if keys is None:
+        keys = list(POINT_SAMPLING)
+
+    if POINT_DATA_BACKEND == "local":
+        return sample_local_point_layers(lat, lon, periods, keys)
+
+    cache = get_point_cache()
+    cache_keys = {key: get_point_cache_key(lat, lon, key, periods) for key in keys}
+    cached_values = cache.get_many(list(cache_keys.values()))
+
+    values = {
+        key: cached_values[cache_key]
+        for key, cache_key in cache_keys.items()
+        if cache_key in cached_values
+    }
+
+    missing_keys = [key for key in keys if key not in values]
+    if missing_keys:
+        point = ee.Geometry.Point([lon, lat])
+        layers = fetch_point_layers(point, periods, missing_keys)
+        sampled_values = sample_point_layers(point, layers)
+
+        for key, value in sampled_values.items():
+            cache.set(cache_keys[key], value, POINT_CACHE["ttl_seconds"][key])
+
+        values.update(sampled_values)
 
-    try:
-        response = requests.get(base_url, params=params, headers=headers, timeout=10)
-        IS_SUCCESS = response.status_code == 200
+    return {key: values[key] for key in keys}
+
+
+def sample_local_point_layers(
+    lat: float, lon: float, periods: dict, keys: list[str]
+) -> dict:
+    """
+    Reads the values of the layers at a specific point from the local raster store.
 
-        if IS_SUCCESS:
-            json_result = response.json()
-            address = json_result.get("display_name")
-            return address or "No address found."
-        else:
-            return f"Error in Geocoding API call. Status Code: {response.status_code}"
+    Parameters:
+        lat (float): Latitude of the point.
+        lon (float): Longitude of the point.
+        periods (dict): The date range for the soil moisture and precipitation data
+        keys (list): The layer keys from `POINT_SAMPLING`.
 
-    except requests.exceptions.RequestException as e:
-        return f"Network error during geocoding: {str(e)}"
+    Returns:
+        dict: The value of each layer keyed like `POINT_SAMPLING`.
+    """
+
+    values = {}
+    for key in keys:
+        layer = open_local_layer(key, periods)
+        value = layer.sample_point(lat, lon)
+
+        if value == layer.spec.no_data:
+            value = POINT_SAMPLING[key]["no_data"]
+
+        values[key] = value
+
+    return values
+
+
+def open_local_layer(key: str, periods: dict) -> RasterLayer:
+    """
+    Opens a layer of the local raster store, checking it was exported for the periods.
+
+    Parameters:
+        key (str): The layer key from `POINT_SAMPLING`.
+        periods (dict): The date range for the soil moisture and precipitation data
+
+    Returns:
+        RasterLayer: The layer.
+    """
+    layer = open_layer(LOCAL_RASTERS["path"], key)
+
+    period_name = POINT_SAMPLING[key].get("period")
+    if period_name and layer.spec.period != periods[period_name]:
+        raise ValueError(
+            f"The local raster of {key} was exported for {layer.spec.period}, "
+            + f"not for {periods[period_name]}. Export the layers again."
+        )
+
+    return layer
 
 
 # DO NOT @st.cache_data
-# Cashing disrupts the state management of the streamlit app
+# Cashing disrupts the state management of the streamlit app,
+# the sampled values are cached on disk by `get_map_point_layers` instead.
 @handle_ee_operations
 def get_map_point_data(lat: float, lon: float, periods: dict) -> dict:
     """
@@ -271,27 +478,61 @@ def get_map_point_data(lat: float, lon: float, periods: dict) -> dict:
         lon (float): Longitude of the point.
         periods (dict): The date range for the soil moisture and precipitation data
 
+    Returns:
+        dict: The data for the specified point.
+    """
+    layers = get_map_point_layers(lat, lon, periods)
+    address = get_address_from_point(lat, lon)
+
+    return compose_map_point_data(lat, lon, layers, address)
+
+
+@handle_ee_operations
+async def aget_map_point_data(lat: float, lon: float, periods: dict) -> dict:
+    """
+    Retrieves the data for a specific point on the map,
+    the Earth Engine request and the geocoding run concurrently.
+
+    The Earth Engine request runs on the shared bounded executor,
+    so it takes about as long as the slowest of the two calls.
+
+    Parameters:
+        lat (float): Latitude of the point.
+        lon (float): Longitude of the point.
+        periods (dict): The date range for the soil moisture and precipitation data
+
+    Returns:
+        dict: The data for the specified point.
+    """
+    validate_coordinates(lat, lon)
+
+    loop = asyncio.get_running_loop()
+
+    layers, address = await asyncio.gather(
+        loop.run_in_executor(get_executor(), get_map_point_layers, lat, lon, periods),
+        aget_address_from_point(lat, lon),
+    )
+
+    return compose_map_point_data(lat, lon, layers, address)
+
+
+def compose_map_point_data(lat: float, lon: float, layers: dict, address: str) -> dict:
+    """
+    Combines the layers values and the address of the point
+    with the afforestation evaluation.
+
+    Parameters:
+        lat (float): Latitude of the point.
+        lon (float): Longitude of the point.
+        layers (dict): The value of each layer keyed like `POINT_SAMPLING`.
+        address (str): The address of the point.
+
     Returns:
         dict: The data for the specified point.
     """
     data = {
-        "elevation": get_elevation_point(lat, lon),
-        "slope": get_slope_point(lat, lon),
-        "soil_moisture": get_rootzone_soil_moisture_point(
-            lat,
-            lon,
-            periods["soil_moisture"]["start_date"],
-            periods["soil_moisture"]["end_date"],
-        ),
-        "precipitation": get_precipitation_point(
-            lat,
-            lon,
-            periods["precipitation"]["start_date"],
-            periods["precipitation"]["end_date"],
-        ),
-        "soil_organic_carbon": get_soil_organic_carbon_point(lat, lon),
-        "world_cover_code": get_world_cover_point(lat, lon),
-        "address": get_address_from_point(lat, lon),
+        **layers,
+        "address": address,
         "lat": lat,
         "lon": lon,
     }
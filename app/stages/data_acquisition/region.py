@@ -3,10 +3,19 @@ This module contains functions for fetching environmental data layers
 for a specified region of interest.
 """
 
+# Python
+import hashlib
+import json
+import threading
+from types import MappingProxyType
+from typing import Mapping
+
 # Third party
 import ee
 
 # App
+from concurrency import RequestCoalescer
+from layers import derive_layers, thaw
 from stages.data_acquisition.gee_server import (
     fetch_satellite_imagery_data,
     fetch_total_precipitation_data,
@@ -28,6 +37,10 @@ from validation import (
 )
 from _types import Roi_Coords
 
+_REGION_DATA: dict[str, Mapping] = {}
+_REGION_DATA_LOCK = threading.Lock()
+_REGION_BUILDS = RequestCoalescer()
+
 
 @handle_ee_operations
 def get_rootzone_soil_moisture_region(
@@ -225,19 +238,60 @@ def get_afforestation_candidates_data(
     ):
         raise ValueError("Invalid date format. Dates should be in 'YYYY-MM-DD' format.")
 
-    rainy_season = periods["soil_moisture"]
-    year = periods["precipitation"]
-
-    slope = get_slope_region(roi_coords)
-    precipitation_annual = get_precipitation_region(
-        roi_coords, year["start_date"], year["end_date"]
+    images = build_region_images(
+        ee.Geometry.Polygon(roi_coords),
+        periods,
+        ["slope", "precipitation", "soil_moisture", "world_cover"],
     )
-    soil_moisture_rainy_season = get_rootzone_soil_moisture_region(
-        roi_coords, rainy_season["start_date"], rainy_season["end_date"]
+
+    return (
+        images["slope"],
+        images["precipitation"],
+        images["soil_moisture"],
+        images["world_cover"],
     )
-    world_cover = get_world_cover_region(roi_coords)
 
-    return slope, precipitation_annual, soil_moisture_rainy_season, world_cover
+
+@handle_ee_operations
+def build_region_images(
+    roi: ee.Geometry, periods: dict[str, dict[str, str]], keys: list[str] = None
+) -> dict[str, ee.Image]:
+    """
+    Builds the images of the region layers, each one once and from the same geometry.
+
+    Parameters:
+        roi (ee.Geometry): The shared geometry of the region of interest.
+        periods (dict): Dictionary containing the periods for data fetching.
+        keys (list): The layer keys, all of the base layers by default.
+
+    Returns:
+        dict: The images keyed like the map layers.
+    """
+
+    def soil_moisture():
+        rainy_season = periods["soil_moisture"]
+        date_range = (rainy_season["start_date"], rainy_season["end_date"])
+        return fetch_mean_soil_moisture_data(date_range, roi)
+
+    def precipitation():
+        year = periods["precipitation"]
+        date_range = (year["start_date"], year["end_date"])
+        return fetch_total_precipitation_data(date_range, roi)
+
+    builders = {
+        "satellite_imagery": lambda: fetch_satellite_imagery_data(roi),
+        "elevation": lambda: fetch_elevation_data(roi),
+        "slope": lambda: fetch_slope_data(roi),
+        "world_cover": lambda: fetch_world_cover_data(roi),
+        "soc_0_20cm": lambda: fetch_soil_organic_carbon_data(roi),
+        "soil_moisture": soil_moisture,
+        "precipitation": precipitation,
+    }
+
+    if keys is None:
+        keys = list(builders)
+
+    return {key: builders[key]() for key in keys}
 
 
 def get_satellite_imagery_region(roi_coords: Roi_Coords) -> dict:
@@ -260,63 +314,126 @@ def get_satellite_imagery_region(roi_coords: Roi_Coords) -> dict:
 
 
 # DO NOT @st.cache_data
-# Cashing disrupts the state management of the streamlit app
+# Cashing disrupts the state management of the streamlit app,
+# the built layers are kept by the process-wide cache of `get_region_data` instead.
 @handle_ee_operations
-def get_region_data(roi: dict, map_data: dict) -> dict:
+def get_region_data(roi: dict, layer_registry: Mapping[str, Mapping]) -> Mapping:
     """
-    Enrich the map data dictionary with additional environmental data layers
-    for the specified region of interest.
+    Returns the environmental data layers for the specified region of interest,
+    building them only once per process for the same region and layer settings.
+
+    The reruns of all the sessions, e.g. after a click on the map,
+    reuse the built layers without validating or building them again.
 
     Parameters:
         roi (dict): Dictionary containing the region of interest coordinates
                     and periods for data fetching.
 
-        map_data (dict): Dictionary containing the current map data layers to be enriched.
+        layer_registry (Mapping): The settings of the map layers, like `LAYER_REGISTRY`.
 
     Returns:
-        dict: Dictionary containing the center coordinates and enriched map data
+        Mapping: The read-only center coordinates and map layers with their data
     """
-    # Fetch and update each environmental layer in the map_data dictionary
 
-    data = {}
+    region_key = get_region_key(roi, layer_registry)
 
-    center = calculate_center(roi["roi_coords"])
+    with _REGION_DATA_LOCK:
+        region_data = _REGION_DATA.get(region_key)
 
-    map_data["satellite_imagery"]["data"] = get_satellite_imagery_region(
-        roi["roi_coords"]
-    )
+    if region_data is not None:
+        return region_data
 
-    # Elevation
-    map_data["elevation"]["data"] = get_elevation_region(roi["roi_coords"])
+    def build_and_cache() -> Mapping:
+        region_data = MappingProxyType(build_region_data(roi, layer_registry))
 
-    # Slope
-    map_data["slope"]["data"] = get_slope_region(roi["roi_coords"])
+        # Cached before the waiting sessions are released,
+        # so the next session cannot start the build again
+        with _REGION_DATA_LOCK:
+            _REGION_DATA[region_key] = region_data
 
-    # World Cover
-    map_data["world_cover"]["data"] = get_world_cover_region(roi["roi_coords"])
+        return region_data
 
-    # Soil Organic Carbon
-    map_data["soc_0_20cm"]["data"] = get_soil_organic_carbon_region(roi["roi_coords"])
+    return _REGION_BUILDS.run(region_key, build_and_cache)
 
-    # Soil Moisture
-    map_data["soil_moisture"]["data"] = get_rootzone_soil_moisture_region(
-        roi["roi_coords"],
-        roi["periods"]["soil_moisture"]["start_date"],
-        roi["periods"]["soil_moisture"]["end_date"],
-    )
 
-    # Precipitation
-    map_data["precipitation"]["data"] = get_precipitation_region(
-        roi["roi_coords"],
-        roi["periods"]["precipitation"]["start_date"],
-        roi["periods"]["precipitation"]["end_date"],
-    )
+def get_region_key(roi: dict, layer_registry: Mapping[str, Mapping]) -> str:
+    """
+    Hashes the region of interest with its periods and the settings of the layers.
+
+    Parameters:
+        roi (dict): Dictionary containing the region of interest coordinates
+                    and periods for data fetching.
+
+        layer_registry (Mapping): The settings of the map layers, like `LAYER_REGISTRY`.
 
-    # Afforestation Candidates
-    map_data["afforestation_candidates"]["data"] = get_afforestation_candidates_region(
-        roi["roi_coords"], roi["periods"]
+    Returns:
+        str: The identifier of the built region.
+    """
+
+    region = {
+        "roi_coords": roi["roi_coords"],
+        "periods": roi["periods"],
+        "layers": thaw(layer_registry),
+    }
+
+    return hashlib.sha256(
+        json.dumps(region, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+def clear_region_data():
+    """Forgets all the built regions."""
+
+    with _REGION_DATA_LOCK:
+        _REGION_DATA.clear()
+
+
+@handle_ee_operations
+def build_region_data(roi: dict, layer_registry: Mapping[str, Mapping]) -> dict:
+    """
+    Fetches the environmental data layers for the specified region of interest.
+
+    The registry is shared by all the sessions and stays untouched,
+    the images are returned in a view of the layers derived for this request.
+
+    Parameters:
+        roi (dict): Dictionary containing the region of interest coordinates
+                    and periods for data fetching.
+
+        layer_registry (Mapping): The settings of the map layers, like `LAYER_REGISTRY`.
+
+    Returns:
+        dict: Dictionary containing the center coordinates and the map layers with their data
+    """
+    try:
+        is_valid_roi_coords(roi["roi_coords"])
+    except ValueError as e:
+        raise ValueError(f"Invalid ROI coordinates: {str(e)}") from e
+
+    periods = roi["periods"]
+    if any(
+        validate_many_dates(period["start_date"], period["end_date"])
+        for period in [periods["soil_moisture"], periods["precipitation"]]
+    ):
+        raise ValueError("Invalid date format. Dates should be in 'YYYY-MM-DD' format.")
+
+    data = {}
+
+    center = calculate_center(roi["roi_coords"])
+
+    # Each base image is built once from one geometry,
+    # the candidates are derived from the same objects as their map layers
+    images = build_region_images(ee.Geometry.Polygon(roi["roi_coords"]), periods)
+
+    images["afforestation_candidates"] = evaluate_afforestation_candidates(
+        images["slope"],
+        images["precipitation"],
+        images["soil_moisture"],
+        images["world_cover"],
     )
 
+    map_data = derive_layers(layer_registry, images)
+
     # Validate that all layers are ee.Image objects
     for key, layer in map_data.items():
         if "data" in layer:
@@ -8,23 +8,29 @@ from typing import Union
 
 # Third party
 import ee
+import numpy as np
 
 # App
+from metrics import timed
 from stages.data_acquisition.gee_server import WORLD_COVER_ESA_CODES
 
+# The value of the points without data in the arrays
+NO_DATA = -1
 
+
+@timed()
 def evaluate_afforestation_candidates(
-    slope: Union[ee.Image, int, float],
-    precipitation: Union[ee.Image, int, float],
-    soil_moisture: Union[ee.Image, int, float],
-    world_cover: Union[str, ee.Image],
-) -> Union[bool, ee.Image]:
+    slope: Union[ee.Image, np.ndarray, int, float],
+    precipitation: Union[ee.Image, np.ndarray, int, float],
+    soil_moisture: Union[ee.Image, np.ndarray, int, float],
+    world_cover: Union[str, ee.Image, np.ndarray],
+) -> Union[bool, ee.Image, np.ndarray]:
     """
     Evaluates environmental criteria to determine suitability for
-    afforestation using either Earth Engine objects or scalar values.
+    afforestation using either Earth Engine objects, NumPy arrays or scalar values.
 
     Returns:
-    bool or ee.Image: Is the area suitable for afforestation.
+    bool, np.ndarray or ee.Image: Is the area suitable for afforestation.
     """
     # Centralized handling of conditions to uniformly assess
     # suitability across both point and regional data
@@ -63,6 +69,21 @@ def evaluate_afforestation_candidates(
                 slope, precipitation, soil_moisture, world_cover, CONDITIONS
             )
 
+        elif all(
+            isinstance(item, np.ndarray)
+            for item in [slope, precipitation, soil_moisture, world_cover]
+        ):
+
+            if not np.isin(world_cover, list(WORLD_COVER_ESA_CODES.values())).all():
+                raise ValueError(
+                    "Provided world_cover codes are not valid."
+                    + f"world_cover: {np.unique(world_cover)}"
+                )
+
+            return evaluate_with_arrays(
+                slope, precipitation, soil_moisture, world_cover, CONDITIONS
+            )
+
         elif all(
             isinstance(item, (int, float)) or item is None
             for item in [slope, precipitation, soil_moisture]
@@ -74,7 +95,8 @@ def evaluate_afforestation_candidates(
 
         else:
             raise TypeError(
-                "Input types must either all be Earth Engine Images or all be scalar values."
+                "Input types must either all be Earth Engine Images, "
+                + "all be NumPy arrays or all be scalar values."
                 + f"world_cover: {world_cover} {type(world_cover)},"
                 + f"slope: {slope} {type(slope)},"
                 + f"precipitation: {precipitation} {type(precipitation)},"
@@ -131,3 +153,29 @@ def evaluate_with_scalars(
     )
     valid_cover = world_cover in conditions["vegetation_mask"].values()
     return valid_slope and hydration_criteria and valid_cover
+
+
+def evaluate_with_arrays(
+    slope: np.ndarray,
+    precipitation: np.ndarray,
+    soil_moisture: np.ndarray,
+    world_cover: np.ndarray,
+    conditions: dict,
+) -> np.ndarray:
+    """
+    Evaluate the suitability of many points for afforestation in one pass,
+    with the same conditions as `evaluate_with_scalars`.
+
+    The no-data values (-1) of the precipitation, the soil moisture
+    and the world cover are masked out, so they never meet a condition.
+
+    Returns: np.ndarray: A boolean array, is each point suitable for afforestation.
+    """
+    valid_slope = slope <= conditions["slope"]
+    hydration_criteria = (
+        (soil_moisture != NO_DATA) & (soil_moisture >= conditions["moisture"])
+    ) | ((precipitation != NO_DATA) & (precipitation >= conditions["precipitation"]))
+    valid_cover = (world_cover != NO_DATA) & np.isin(
+        world_cover, list(conditions["vegetation_mask"].values())
+    )
+    return valid_slope & hydration_criteria & valid_cover
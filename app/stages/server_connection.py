@@ -1,12 +1,35 @@
 """
 Module for establishing connection with the Google Earth Engine API.
+
+The app connects once per process with `ensure_connection`, the reruns
+reuse the session. A background thread refreshes the access token before
+it expires and probes the server periodically, the session is initialized
+again only when the server rejects the credentials.
 """
 
 # Python
+from datetime import datetime, timedelta, timezone
+import logging
 import os
+import threading
 
 # Third party
 import ee
+from google.auth.exceptions import GoogleAuthError
+import google.auth.transport.requests
+import requests
+
+# App
+from config import CONNECTION
+from metrics import instrument_session
+from roundtrips import install_roundtrip_counter
+
+# The server errors of rejected credentials, the other errors keep the session
+AUTH_ERRORS = ["401", "unauthenticated", "invalid_grant", "authentication credentials"]
+
+_SESSION = {"credentials": None, "monitor": None}
+_SESSION_LOCK = threading.Lock()
+_SESSION_STOP = threading.Event()
 
 
 def get_environment_variables() -> tuple[str, str]:
@@ -46,12 +69,19 @@ def initialize_earth_engine(service_account: str, private_key_path: str):
         service_account: Google service account email.
         private_key_path: Path to the Google service account private key file.
 
+    Returns:
+        The credentials of the session.
+
     Raises:
         RuntimeError: If initialization fails.
     """
     try:
         credentials = ee.ServiceAccountCredentials(service_account, private_key_path)
         ee.Initialize(credentials)
+
+        instrument_earth_engine()
+        install_roundtrip_counter()
+        return credentials
     except ee.EEException as e:
         raise RuntimeError(f"Failed to initialize Google Earth Engine: {str(e)}") from e
     except Exception as e:
@@ -60,13 +90,56 @@ def initialize_earth_engine(service_account: str, private_key_path: str):
         ) from e
 
 
+def get_ee_requests_session() -> requests.Session:
+    """
+    Returns the session of the Earth Engine client, created if the client has none yet,
+    the initialization keeps it.
+
+    The client keeps it in `ee.data._get_state()` since earthengine-api 1.0,
+    in the globals of `ee.data` in the locked 0.1 versions.
+    """
+    # pylint: disable=protected-access
+    if hasattr(ee.data, "_get_state"):
+        state = ee.data._get_state()
+        if state.requests_session is None:
+            state.requests_session = requests.Session()
+        return state.requests_session
+
+    if ee.data._requests_session is None:
+        ee.data._requests_session = requests.Session()
+    return ee.data._requests_session
+
+
+def instrument_earth_engine():
+    """
+    Counts the responses of the Earth Engine client in the metrics,
+    the connection works without them if the client changed.
+    """
+
+    try:
+        instrument_session(get_ee_requests_session(), "earth_engine")
+    except Exception as e:  # pylint: disable=broad-except
+        logging.warning("Failed to count the Earth Engine requests: %s", e)
+
+
 def establish_connection():
     """Initializes Google Earth Engine with service account credentials."""
 
+    connect()
+    return True
+
+
+def connect():
+    """
+    Initializes Google Earth Engine with service account credentials.
+
+    Returns:
+        The credentials of the session.
+    """
+
     try:
         service_account, private_key = get_environment_variables()
-        initialize_earth_engine(service_account, private_key)
-        return True
+        return initialize_earth_engine(service_account, private_key)
 
     except ee.EEException as e:
         raise RuntimeError(
@@ -76,3 +149,116 @@ def establish_connection():
         raise RuntimeError(
             f"Connection validation failed with an unexpected error: {e}"
         ) from e
+
+
+def ensure_connection() -> bool:
+    """
+    Initializes Google Earth Engine once per process, the next calls return at once.
+
+    Raises:
+        RuntimeError: If initialization fails, the next call tries again.
+    """
+
+    with _SESSION_LOCK:
+        if _SESSION["credentials"] is None:
+            _SESSION["credentials"] = connect()
+
+        if _SESSION["monitor"] is None:
+            _SESSION_STOP.clear()
+            _SESSION["monitor"] = threading.Thread(
+                target=monitor_connection, name="ee-session", daemon=True
+            )
+            _SESSION["monitor"].start()
+
+    return True
+
+
+def close_connection():
+    """Stops the monitoring of the session and forgets its credentials."""
+
+    with _SESSION_LOCK:
+        monitor = _SESSION["monitor"]
+        _SESSION["credentials"] = None
+        _SESSION["monitor"] = None
+        _SESSION_STOP.set()
+
+    if monitor is not None and monitor is not threading.current_thread():
+        monitor.join()
+
+
+def monitor_connection():
+    """Checks the session periodically until the connection is closed."""
+
+    while not _SESSION_STOP.wait(CONNECTION["health_check_seconds"]):
+        check_connection()
+
+
+def check_connection():
+    """
+    Refreshes the access token before it expires and probes the server,
+    initializing the session again if the credentials are rejected.
+    """
+
+    with _SESSION_LOCK:
+        credentials = _SESSION["credentials"]
+
+    if credentials is None:
+        return
+
+    try:
+        refresh_credentials(credentials)
+        probe_connection()
+
+    except Exception as e:  # pylint: disable=broad-except
+        if not is_auth_error(e):
+            # A network or server error, the session is still valid
+            logging.warning("Earth Engine health check failed: %s", e)
+            return
+
+        logging.warning("Earth Engine rejected the credentials, reconnecting: %s", e)
+        reconnect()
+
+
+def refresh_credentials(credentials):
+    """
+    Refreshes the access token of the credentials if it expires within
+    `CONNECTION["refresh_margin_seconds"]`, the session keeps using the same object.
+    """
+
+    margin = timedelta(seconds=CONNECTION["refresh_margin_seconds"])
+    # The expiry of the google-auth credentials is a naive UTC time
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    if credentials.valid and credentials.expiry and credentials.expiry - now > margin:
+        return
+
+    credentials.refresh(google.auth.transport.requests.Request())
+
+
+def probe_connection():
+    """Computes a constant on the server, the cheapest authenticated request."""
+
+    ee.Number(1).getInfo()
+
+
+def is_auth_error(error: Exception) -> bool:
+    """Checks if the error is the server rejecting the credentials."""
+
+    if isinstance(error, GoogleAuthError):
+        return True
+
+    message = str(error).lower()
+    return isinstance(error, ee.EEException) and any(
+        auth_error in message for auth_error in AUTH_ERRORS
+    )
+
+
+def reconnect():
+    """Initializes the session again, the next `ensure_connection` retries on failure."""
+
+    with _SESSION_LOCK:
+        try:
+            _SESSION["credentials"] = connect()
+        except RuntimeError as e:
+            logging.error("Failed to reconnect to Earth Engine: %s", e)
+            _SESSION["credentials"] = None
@@ -0,0 +1,51 @@
+"""
+This module encodes the map tiles as PNG images, without an imaging library.
+"""
+
+# Python
+import struct
+import zlib
+
+# Third party
+import numpy as np
+
+
+def create_chunk(chunk_type: bytes, data: bytes) -> bytes:
+    """Returns the PNG chunk with its length and checksum."""
+
+    return (
+        struct.pack(">I", len(data))
+        + chunk_type
+        + data
+        + struct.pack(">I", zlib.crc32(chunk_type + data))
+    )
+
+
+def encode_png(pixels: np.ndarray, compression: int = 6) -> bytes:
+    """
+    Encodes the RGBA pixels as a PNG image.
+
+    Parameters:
+        pixels (np.ndarray): The pixels, an array of the height, the width and 4 bytes.
+        compression (int): The zlib level, from 1 (fastest) to 9 (smallest).
+
+    Returns:
+        bytes: The PNG file.
+    """
+
+    if pixels.ndim != 3 or pixels.shape[2] != 4:
+        raise ValueError("The pixels should be an array of RGBA values.")
+
+    height, width = pixels.shape[:2]
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+
+    # Each row starts with the filter type 0, then the pixels
+    rows = np.zeros((height, 1 + width * 4), dtype=np.uint8)
+    rows[:, 1:] = np.asarray(pixels, dtype=np.uint8).reshape(height, width * 4)
+
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + create_chunk(b"IHDR", header)
+        + create_chunk(b"IDAT", zlib.compress(rows.tobytes(), compression))
+        + create_chunk(b"IEND", b"")
+    )
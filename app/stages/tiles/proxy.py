@@ -0,0 +1,492 @@
+"""
+This module contains the local caching proxy of the map tiles.
+
+The browsers load the tiles of the map layers from the proxy instead of
+Google Earth Engine. Each tile is fetched from the server once, then it is served
+from the disk cache to all the sessions, even after the tile URL expired
+or the app restarted. The concurrent requests of a missing tile share one fetch,
+and the tiles outside the region of interest are never fetched.
+
+The proxy runs on a thread of the app process, started by `get_tile_proxy`.
+"""
+
+# Python
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import re
+import threading
+from typing import Callable, Mapping, Union
+
+# Third party
+import requests
+from requests.adapters import HTTPAdapter
+
+# App
+from concurrency import RequestCoalescer
+from config import ROI, TILE_BACKEND, TILE_PROXY
+from metrics import get_metrics, instrument_session
+from stages.tiles.roi_quadtree import TRANSPARENT_TILE, RoiQuadtree
+from stages.tiles.tile_cache import TileCache
+
+TILE_PATH = re.compile(
+    r"^/tiles/(?P<layer_id>[0-9a-f]{64})/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)$"
+)
+
+_PROXY = {"proxy": None, "failed": False, "warned": False}
+_PROXY_LOCK = threading.Lock()
+
+
+class UpstreamError(Exception):
+    """The tile could not be fetched from the server."""
+
+
+# The server with its thread, session and cache, and the three kinds of registered layers
+class TileProxy:  # pylint: disable=too-many-instance-attributes
+    """
+    The tile proxy server with its disk cache and the registered layers.
+    """
+
+    def __init__(
+        self,
+        cache: TileCache,
+        roi: RoiQuadtree = None,
+        settings: Mapping = None,
+    ):
+        """
+        Parameters:
+            cache (TileCache): The disk cache of the tiles.
+            roi (RoiQuadtree): The region the layers are clipped to,
+                the tiles outside of it are transparent without a request to the server.
+            settings (Mapping): The "host" and the "port" to listen on, 0 picks a free one,
+                the "public_url" of the proxy for the browsers, the address of the server
+                if None, and the "pool_size" of the connections, `TILE_PROXY` by default.
+        """
+
+        settings = TILE_PROXY if settings is None else settings
+
+        self.cache = cache
+        self.roi = roi
+        self.coalescer = RequestCoalescer()
+
+        # Returns the readiness of the app served on "/ready", see `get_warmup_status`
+        self.readiness: Callable[[], dict] = None
+
+        self._upstream_urls: dict[str, str] = {}
+        self._renderers: dict[str, Callable[[int, int, int], bytes]] = {}
+        self._deferred_layers: dict[str, Callable[[], str]] = {}
+        self._layers_lock = threading.Lock()
+
+        self.session = create_session(settings["pool_size"])
+
+        self.server = ThreadingHTTPServer(
+            (settings["host"], settings["port"]), TileRequestHandler
+        )
+        self.server.daemon_threads = True
+        self.server.proxy = self
+
+        server_host, server_port = self.server.server_address[:2]
+        self.url = (
+            settings["public_url"] or f"http://{server_host}:{server_port}"
+        ).rstrip("/")
+
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name="tile-proxy", daemon=True
+        )
+
+    def start(self) -> "TileProxy":
+        """Serves the tiles on a background thread."""
+
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving the tiles."""
+
+        self.server.shutdown()
+        self.server.server_close()
+        self.session.close()
+
+    def register_layer(self, layer_id: str, upstream_url: str) -> str:
+        """
+        Registers the tile URL of the layer on the server, renewing the expired one.
+
+        Parameters:
+            layer_id (str): The identifier of the layer, see `get_layer_id`.
+            upstream_url (str): The tile URL template of the server.
+
+        Returns:
+            str: The tile URL template of the proxy for the layer.
+        """
+
+        with self._layers_lock:
+            self._upstream_urls[layer_id] = upstream_url
+
+        return f"{self.url}/tiles/{layer_id}/{{z}}/{{x}}/{{y}}"
+
+    def register_deferred_layer(
+        self, layer_id: str, register: Callable[[], str]
+    ) -> str:
+        """
+        Registers the layer to register on the server by its first tile request,
+        the hidden layers cost no request until the user shows them.
+
+        Parameters:
+            layer_id (str): The identifier of the layer, see `get_layer_id`.
+            register (Callable): Returns the tile URL template of the server,
+                see `get_deferred_tile_layer`.
+
+        Returns:
+            str: The tile URL template of the proxy for the layer.
+        """
+
+        with self._layers_lock:
+            self._deferred_layers[layer_id] = register
+
+        return f"{self.url}/tiles/{layer_id}/{{z}}/{{x}}/{{y}}"
+
+    def register_renderer(
+        self, layer_id: str, render: Callable[[int, int, int], bytes]
+    ) -> str:
+        """
+        Registers the layer rendered by the proxy, without the server.
+
+        Parameters:
+            layer_id (str): The identifier of the layer, see `get_rendered_layer_id`.
+            render (Callable): Renders the tile of the zoom level, the column and the row.
+
+        Returns:
+            str: The tile URL template of the proxy for the layer.
+        """
+
+        with self._layers_lock:
+            self._renderers[layer_id] = render
+
+        return f"{self.url}/tiles/{layer_id}/{{z}}/{{x}}/{{y}}"
+
+    def get_renderer(
+        self, layer_id: str
+    ) -> Union[Callable[[int, int, int], bytes], None]:
+        """Returns the renderer of the layer, if rendered by the proxy."""
+
+        with self._layers_lock:
+            return self._renderers.get(layer_id)
+
+    def get_upstream_url(self, layer_id: str) -> Union[str, None]:
+        """
+        Returns the tile URL template of the layer on the server, if registered,
+        registering the deferred layer on the server if needed.
+
+        Raises:
+            UpstreamError: If the deferred layer failed to register.
+        """
+
+        with self._layers_lock:
+            upstream_url = self._upstream_urls.get(layer_id)
+            register = self._deferred_layers.get(layer_id)
+
+        if register is None:
+            return upstream_url
+
+        # The concurrent tiles of the layer just shown wait for one registration
+        try:
+            return self.coalescer.run(f"register/{layer_id}", register)
+        except Exception as e:
+            raise UpstreamError(f"Failed to register the layer {layer_id}: {e}") from e
+
+    def get_tile(self, layer_id: str, z: int, x: int, y: int) -> Union[bytes, None]:
+        """
+        Returns the tile from the disk, fetching it from the server on a miss,
+        or renders it for the layers rendered by the proxy.
+        The deferred layer is registered on the server by its first missing tile.
+
+        Parameters:
+            layer_id (str): The identifier of the layer.
+            z (int): The zoom level.
+            x (int): The column of the tile.
+            y (int): The row of the tile.
+
+        Returns:
+            bytes: The tile, or None if the layer is unknown.
+
+        Raises:
+            UpstreamError: If the server failed to register the layer or return the tile.
+        """
+
+        if self.roi is not None and self.roi.is_outside(z, x, y):
+            return TRANSPARENT_TILE
+
+        # The rendered tiles take milliseconds, they are not stored on the disk
+        render = self.get_renderer(layer_id)
+        if render is not None:
+            return render(z, x, y)
+
+        key = get_tile_key(layer_id, z, x, y)
+
+        tile = self.cache.get(key)
+        if tile is not None:
+            return tile
+
+        upstream_url = self.get_upstream_url(layer_id)
+        if upstream_url is None:
+            return None
+
+        def fetch_tile() -> bytes:
+            """Fetches the tile from the server and stores it on the disk."""
+
+            fetched = fetch_upstream_tile(self.session, upstream_url, z, x, y)
+
+            self.cache.set(key, fetched)
+            return fetched
+
+        return self.coalescer.run(key, fetch_tile)
+
+
+def create_session(pool_size: int) -> requests.Session:
+    """Returns a session keeping the connections to the tile server alive."""
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return instrument_session(session, "tiles")
+
+
+def get_tile_key(layer_id: str, z: int, x: int, y: int) -> str:
+    """Returns the key of the tile in the cache."""
+
+    return f"{layer_id}/{z}/{x}/{y}"
+
+
+def fetch_upstream_tile(
+    session: requests.Session, upstream_url: str, z: int, x: int, y: int
+) -> bytes:
+    """
+    Fetches the tile from the server.
+
+    Parameters:
+        session (requests.Session): The session of the tile server.
+        upstream_url (str): The tile URL template of the server.
+        z (int): The zoom level.
+        x (int): The column of the tile.
+        y (int): The row of the tile.
+
+    Returns:
+        bytes: The tile.
+
+    Raises:
+        UpstreamError: If the server failed to return the tile.
+    """
+
+    try:
+        response = session.get(
+            upstream_url.format(z=z, x=x, y=y), timeout=TILE_PROXY["timeout"]
+        )
+    except requests.exceptions.RequestException as e:
+        raise UpstreamError(f"Network error fetching the tile {z}/{x}/{y}: {e}") from e
+
+    if response.status_code != 200:
+        raise UpstreamError(
+            f"Error fetching the tile {z}/{x}/{y}. Status Code: {response.status_code}"
+        )
+
+    return response.content
+
+
+class TileRequestHandler(BaseHTTPRequestHandler):
+    """Serves the tiles of the proxy with the caching headers for the browsers."""
+
+    server_version = "AfforestationTileProxy"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Serves a tile, "/tiles/<layer_id>/<z>/<x>/<y>", the readiness, "/ready",
+        or the metrics of the app, "/metrics".
+        """
+
+        proxy: TileProxy = self.server.proxy
+        path = self.path.split("?")[0]
+
+        if path == "/ready":
+            self.send_readiness(proxy)
+            return
+
+        if path == "/metrics":
+            self.send_metrics()
+            return
+
+        match = TILE_PATH.match(path)
+        if not match:
+            self.send_empty(404)
+            return
+
+        try:
+            tile = proxy.get_tile(
+                match["layer_id"], int(match["z"]), int(match["x"]), int(match["y"])
+            )
+        except UpstreamError as e:
+            logging.warning(e)
+            self.send_empty(502)
+            return
+
+        if tile is None:
+            self.send_empty(404)
+            return
+
+        # The tiles of a layer never change, its identifier hashes the expression
+        etag = f'"{hashlib.md5(tile).hexdigest()}"'
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_caching_headers(etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(tile)))
+        self.send_caching_headers(etag)
+        self.end_headers()
+        self.wfile.write(tile)
+
+    def send_readiness(self, proxy: TileProxy):
+        """Responds with the readiness of the app, 503 until it is warmed up."""
+
+        status = proxy.readiness() if proxy.readiness else {"state": "ready"}
+        body = json.dumps(status).encode("utf-8")
+
+        self.send_response(200 if status["state"] == "ready" else 503)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_metrics(self):
+        """Responds with the metrics of the app in the Prometheus text format."""
+
+        body = get_metrics().get_prometheus_text().encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_caching_headers(self, etag: str):
+        """Lets the browsers reuse the tile without asking again."""
+
+        self.send_header("ETag", etag)
+        self.send_header(
+            "Cache-Control", f"public, max-age={TILE_PROXY['max_age_seconds']}"
+        )
+
+    def send_empty(self, status: int):
+        """Responds without a body."""
+
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Keeps the access log of the tiles out of the app log."""
+
+
+def get_tile_proxy() -> Union[TileProxy, None]:
+    """
+    Returns the process-wide tile proxy, starting it on first use.
+
+    Returns:
+        TileProxy: The running proxy, or None if it is disabled or failed to start.
+    """
+
+    with _PROXY_LOCK:
+        if _PROXY["proxy"] is None and TILE_PROXY["enabled"] and not _PROXY["failed"]:
+            try:
+                _PROXY["proxy"] = TileProxy(
+                    TileCache(TILE_PROXY["cache_path"], TILE_PROXY["max_bytes"]),
+                    RoiQuadtree(ROI["roi_coords"], TILE_PROXY["roi_max_zoom"]),
+                ).start()
+            except OSError as e:
+                # The map falls back to the tile URLs of the server
+                logging.error("Failed to start the tile proxy: %s", e)
+                _PROXY["failed"] = True
+
+        return _PROXY["proxy"]
+
+
+def get_proxied_tile_url(layer_id: str, upstream_url: str) -> str:
+    """
+    Returns the tile URL template of the proxy for the layer,
+    or the one of the server if the proxy is not running.
+
+    Parameters:
+        layer_id (str): The identifier of the layer, see `get_layer_id`.
+        upstream_url (str): The tile URL template of the server.
+
+    Returns:
+        str: The tile URL template for the map.
+    """
+
+    proxy = get_tile_proxy()
+
+    if proxy is None:
+        return upstream_url
+
+    return proxy.register_layer(layer_id, upstream_url)
+
+
+def get_deferred_tile_url(
+    layer_id: str, register: Callable[[], str]
+) -> Union[str, None]:
+    """
+    Returns the tile URL template of the proxy for the layer registered
+    on the server by its first tile request.
+
+    Parameters:
+        layer_id (str): The identifier of the layer, see `get_layer_id`.
+        register (Callable): Returns the tile URL template of the server.
+
+    Returns:
+        str: The tile URL template for the map, or None if the proxy is not running.
+    """
+
+    proxy = get_tile_proxy()
+
+    if proxy is None:
+        return None
+
+    return proxy.register_deferred_layer(layer_id, register)
+
+
+def warn_about_disabled_proxy(serves_readiness: bool = False):
+    """
+    Warns at the start about the settings without effect while the tile proxy
+    is disabled, only once per process, the script of the app runs on each rerun.
+
+    Parameters:
+        serves_readiness (bool): If the process should serve its readiness, like `serve.py`.
+    """
+
+    with _PROXY_LOCK:
+        if TILE_PROXY["enabled"] or _PROXY["warned"]:
+            return
+        _PROXY["warned"] = True
+
+    if TILE_BACKEND == "local":
+        logging.warning(
+            'TILE_BACKEND is "local", but the tiles are rendered by the tile proxy, '
+            'which is disabled, the layers stay on Earth Engine. '
+            'Set TILE_PROXY["enabled"] to True.'
+        )
+
+    if serves_readiness:
+        logging.warning(
+            'The "/ready" and "/metrics" paths are served by the tile proxy, '
+            'which is disabled. Set TILE_PROXY["enabled"] to True.'
+        )
@@ -0,0 +1,229 @@
+"""
+This module renders the map tiles locally, from the raster store built by `export_rasters.py`.
+
+The values are colored like on Earth Engine, stretched between the `min` and the `max`
+of the visualization parameters over the `palette` of `MAP_DATA`, through a 256-entry
+color table precomputed once per layer. The pixels without data are transparent.
+The tiles are served by the tile proxy, with `TILE_BACKEND = "local"` in `config.py`.
+"""
+
+# Python
+import hashlib
+import json
+import logging
+import math
+import threading
+from typing import Mapping, Union
+
+# Third party
+import numpy as np
+
+# App
+from config import ROI
+from stages.data_acquisition.local_raster import RasterLayer
+from stages.data_acquisition.point import open_local_layer
+from stages.tiles.png import encode_png
+from stages.tiles.proxy import get_tile_proxy
+from stages.tiles.roi_quadtree import TILE_SIZE, TRANSPARENT_TILE
+
+# The map layers with a local raster, the others are rendered by Earth Engine
+RENDERED_LAYERS = {
+    "elevation": "elevation",
+    "slope": "slope",
+    "world_cover": "world_cover_code",
+    "soc_0_20cm": "soil_organic_carbon",
+    "soil_moisture": "soil_moisture",
+    "precipitation": "precipitation",
+}
+
+# The color names used in the palettes, like the CSS ones of Earth Engine
+COLOR_NAMES = {
+    "black": "000000",
+    "white": "FFFFFF",
+    "gray": "808080",
+    "grey": "808080",
+    "red": "FF0000",
+    "green": "008000",
+    "lime": "00FF00",
+    "blue": "0000FF",
+    "yellow": "FFFF00",
+    "cyan": "00FFFF",
+    "magenta": "FF00FF",
+    "orange": "FFA500",
+    "purple": "800080",
+    "brown": "A52A2A",
+}
+
+_RENDERERS: dict[str, "TileRenderer"] = {}
+_RENDERERS_LOCK = threading.Lock()
+
+
+def parse_color(color: str) -> tuple[int, int, int]:
+    """
+    Converts the color of a palette to its red, green and blue values.
+
+    Parameters:
+        color (str): The hexadecimal code, like "FF0000" or "#FF0000", or the color name.
+
+    Returns:
+        tuple: The red, green and blue values.
+    """
+
+    code = COLOR_NAMES.get(color.lower(), color).lstrip("#")
+
+    if len(code) != 6:
+        raise ValueError(f"Unknown palette color: {color}")
+
+    return int(code[0:2], 16), int(code[2:4], 16), int(code[4:6], 16)
+
+
+def create_color_table(vis_params: Mapping) -> np.ndarray:
+    """
+    Precomputes the colors of the stretched values, interpolated between
+    the evenly spaced colors of the palette like on Earth Engine.
+
+    Parameters:
+        vis_params (Mapping): The visualization parameters with the opacity.
+
+    Returns:
+        np.ndarray: The 256 RGBA colors, from the `min` to the `max` value.
+    """
+
+    palette = vis_params.get("palette", ["000000", "FFFFFF"])
+    colors = np.array([parse_color(color) for color in palette], dtype=np.float64)
+
+    if len(colors) == 1:
+        colors = np.repeat(colors, 2, axis=0)
+
+    stops = np.linspace(0, 1, len(colors))
+    positions = np.linspace(0, 1, 256)
+
+    table = np.empty((256, 4), dtype=np.uint8)
+    for channel in range(3):
+        table[:, channel] = np.rint(np.interp(positions, stops, colors[:, channel]))
+    table[:, 3] = round(255 * vis_params.get("opacity", 1))
+
+    return table
+
+
+def get_pixel_coordinates(z: int, x: int, y: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Calculates the centers of the pixels of the Web Mercator tile.
+
+    Returns:
+        tuple: The latitudes of the pixel rows and the longitudes of the pixel columns.
+    """
+
+    world_size = TILE_SIZE * 2**z
+    pixels = np.arange(TILE_SIZE) + 0.5
+
+    lons = (x * TILE_SIZE + pixels) / world_size * 360 - 180
+    lats = np.degrees(
+        np.arctan(np.sinh(math.pi * (1 - 2 * (y * TILE_SIZE + pixels) / world_size)))
+    )
+
+    return lats, lons
+
+
+# The color table is built once per layer, the proxy calls `render` for each tile
+class TileRenderer:  # pylint: disable=too-few-public-methods
+    """
+    Renders the tiles of a layer of the raster store with its visualization parameters.
+    """
+
+    def __init__(self, layer: RasterLayer, vis_params: Mapping):
+        """
+        Parameters:
+            layer (RasterLayer): The layer of the raster store.
+            vis_params (Mapping): The `min`, the `max`, the `palette` and the `opacity`.
+        """
+
+        self.layer = layer
+        self.min = vis_params.get("min", 0)
+        self.max = vis_params.get("max", 1)
+        self.color_table = create_color_table(vis_params)
+
+    def render(self, z: int, x: int, y: int) -> bytes:
+        """
+        Renders the tile.
+
+        Parameters:
+            z (int): The zoom level.
+            x (int): The column of the tile.
+            y (int): The row of the tile.
+
+        Returns:
+            bytes: The PNG image of the tile.
+        """
+
+        values = self.layer.read_grid(*get_pixel_coordinates(z, x, y))
+
+        valid = values != self.layer.spec.no_data
+        if np.issubdtype(values.dtype, np.floating):
+            valid &= ~np.isnan(values)
+
+        if not valid.any():
+            return TRANSPARENT_TILE
+
+        stretched = (np.where(valid, values, self.min) - self.min) / (
+            self.max - self.min
+        )
+        indexes = np.clip(np.rint(stretched * 255), 0, 255).astype(np.uint8)
+
+        pixels = self.color_table[indexes]
+        pixels[~valid] = 0
+
+        # The fastest compression, the tiles are rendered on each request
+        return encode_png(pixels, compression=1)
+
+
+def get_rendered_layer_id(key: str, layer: RasterLayer, vis_params: Mapping) -> str:
+    """
+    Returns the identifier of the locally rendered layer, it changes with
+    the visualization parameters and with each export of the raster.
+    """
+
+    description = json.dumps(
+        {"key": key, "raster": layer.manifest, "vis_params": vis_params},
+        sort_keys=True,
+    )
+
+    return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+
+def get_rendered_tile_url(key: str, vis_params: Mapping) -> Union[str, None]:
+    """
+    Returns the tile URL template of the layer rendered by the tile proxy.
+
+    Parameters:
+        key (str): The layer key from `MAP_DATA`.
+        vis_params (Mapping): The visualization parameters with the opacity.
+
+    Returns:
+        str: The tile URL template, or None if the layer has no local raster
+        or the proxy is not running.
+    """
+
+    raster_key = RENDERED_LAYERS.get(key)
+    if raster_key is None:
+        return None
+
+    proxy = get_tile_proxy()
+    if proxy is None:
+        return None
+
+    try:
+        layer = open_local_layer(raster_key, ROI["periods"])
+    except (FileNotFoundError, ValueError) as e:
+        logging.warning("The %s layer is rendered by Earth Engine: %s", key, e)
+        return None
+
+    layer_id = get_rendered_layer_id(key, layer, vis_params)
+
+    with _RENDERERS_LOCK:
+        renderer = _RENDERERS.get(layer_id)
+
+        if renderer is None:
+            renderer = _RENDERERS[layer_id] = TileRenderer(layer, vis_params)
+
+    return proxy.register_renderer(layer_id, renderer.render)
@@ -0,0 +1,281 @@
+"""
+This module classifies the map tiles against the region of interest without Earth Engine.
+
+All the layers are clipped to the region, so a tile lying fully outside its polygon
+is transparent. The tiles are classified with a quadtree of the tile pyramid,
+precomputed once down to a zoom level, where each tile keeps only the polygon
+edges crossing it.
+
+The polygon edges are geodesic on Earth Engine, so they are densified along
+the great circles before the classification, and the tiles are slightly
+expanded, so a tile touching the region is never classified as outside.
+"""
+
+# Python
+import math
+
+# Third party
+import numpy as np
+
+# App
+from stages.tiles.png import encode_png
+
+OUTSIDE = "outside"
+INSIDE = "inside"
+INTERSECTS = "intersects"
+
+TILE_SIZE = 256
+
+# Longitude, latitude
+Point = tuple[float, float]
+Edge = tuple[Point, Point]
+
+
+def create_transparent_png(size: int = TILE_SIZE) -> bytes:
+    """
+    Encodes a fully transparent square RGBA PNG image.
+
+    Parameters:
+        size (int): The side of the image in pixels.
+
+    Returns:
+        bytes: The PNG file.
+    """
+
+    return encode_png(np.zeros((size, size, 4), dtype=np.uint8), compression=9)
+
+
+TRANSPARENT_TILE = create_transparent_png()
+
+
+def get_tile_bounds(z: int, x: int, y: int) -> tuple[float, float, float, float]:
+    """
+    Calculates the edges of the Web Mercator tile in degrees.
+
+    Returns:
+        tuple: The west, south, east and north edges.
+    """
+    tiles = 2**z
+
+    def latitude(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / tiles))))
+
+    return (
+        x / tiles * 360 - 180,
+        latitude(y + 1),
+        (x + 1) / tiles * 360 - 180,
+        latitude(y),
+    )
+
+
+def densify_geodesic(coords: list[Point], step_degrees: float = 0.5) -> list[Point]:
+    """
+    Adds the points along the great circles between the vertices of the closed polygon.
+
+    Parameters:
+        coords (list): The longitude and latitude of the vertices.
+        step_degrees (float): The largest angle between the added points.
+
+    Returns:
+        list: The vertices of the densified polygon.
+    """
+
+    def to_vector(point: Point) -> tuple[float, float, float]:
+        lon, lat = map(math.radians, point)
+        return (
+            math.cos(lat) * math.cos(lon),
+            math.cos(lat) * math.sin(lon),
+            math.sin(lat),
+        )
+
+    def to_point(vector: tuple[float, float, float]) -> Point:
+        x, y, z = vector
+        return math.degrees(math.atan2(y, x)), math.degrees(
+            math.atan2(z, math.hypot(x, y))
+        )
+
+    densified = []
+    for start, end in zip(coords, coords[1:] + coords[:1]):
+        a, b = to_vector(start), to_vector(end)
+        angle = math.acos(max(-1.0, min(1.0, sum(i * j for i, j in zip(a, b)))))
+        steps = max(1, math.ceil(math.degrees(angle) / step_degrees))
+
+        densified.append(tuple(start))
+        for step in range(1, steps):
+            # Spherical linear interpolation
+            t = step / steps
+            weight_a = math.sin((1 - t) * angle) / math.sin(angle)
+            weight_b = math.sin(t * angle) / math.sin(angle)
+            densified.append(
+                to_point(tuple(weight_a * i + weight_b * j for i, j in zip(a, b)))
+            )
+
+    return densified
+
+
+def segments_intersect(a: Point, b: Point, c: Point, d: Point) -> bool:
+    """Checks if the segments a-b and c-d intersect, touching included."""
+
+    def orientation(p: Point, q: Point, r: Point) -> float:
+        return (q[0] - p[0]) * (r[1] - p[1]) - (q[1] - p[1]) * (r[0] - p[0])
+
+    def on_segment(p: Point, q: Point, r: Point) -> bool:
+        within_x = min(p[0], q[0]) <= r[0] <= max(p[0], q[0])
+        within_y = min(p[1], q[1]) <= r[1] <= max(p[1], q[1])
+        return within_x and within_y
+
+    d1, d2 = orientation(c, d, a), orientation(c, d, b)
+    d3, d4 = orientation(a, b, c), orientation(a, b, d)
+
+    if ((d1 > 0 > d2) or (d1 < 0 < d2)) and ((d3 > 0 > d4) or (d3 < 0 < d4)):
+        return True
+
+    return (
+        (d1 == 0 and on_segment(c, d, a))
+        or (d2 == 0 and on_segment(c, d, b))
+        or (d3 == 0 and on_segment(a, b, c))
+        or (d4 == 0 and on_segment(a, b, d))
+    )
+
+
+def edge_crosses_box(edge: Edge, box: tuple[float, float, float, float]) -> bool:
+    """Checks if the edge has a point inside the box or crosses its sides."""
+
+    (x1, y1), (x2, y2) = edge
+    west, south, east, north = box
+
+    if max(x1, x2) < west or min(x1, x2) > east:
+        return False
+    if max(y1, y2) < south or min(y1, y2) > north:
+        return False
+
+    if west <= x1 <= east and south <= y1 <= north:
+        return True
+
+    corners = [(west, south), (east, south), (east, north), (west, north)]
+    return any(
+        segments_intersect(edge[0], edge[1], corner, next_corner)
+        for corner, next_corner in zip(corners, corners[1:] + corners[:1])
+    )
+
+
+def is_point_in_polygon(point: Point, edges: list[Edge]) -> bool:
+    """Checks if the point is inside the polygon of the edges, by ray casting."""
+
+    x, y = point
+    inside = False
+
+    for (x1, y1), (x2, y2) in edges:
+        if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+            inside = not inside
+
+    return inside
+
+
+class RoiQuadtree:
+    """
+    The tiles of the pyramid classified as outside, inside or intersecting the region.
+    """
+
+    def __init__(self, roi_coords: list[Point], max_zoom: int, margin_pixels: int = 2):
+        """
+        Parameters:
+            roi_coords (list): The longitude and latitude of the polygon vertices.
+            max_zoom (int): The deepest zoom level of the precomputed tiles.
+            margin_pixels (int): The tiles are expanded by the pixels of their zoom
+                before the classification.
+        """
+
+        vertices = densify_geodesic([tuple(coord) for coord in roi_coords])
+
+        self.edges: list[Edge] = list(zip(vertices, vertices[1:] + vertices[:1]))
+        self.max_zoom = max_zoom
+        self.margin_pixels = margin_pixels
+        self.tiles: dict[tuple[int, int, int], str] = {}
+
+        self._build(0, 0, 0, self.edges)
+
+    def _classify(
+        self, z: int, x: int, y: int, edges: list[Edge]
+    ) -> tuple[str, list[Edge]]:
+        """
+        Classifies the tile against the edges crossing its parent.
+
+        Returns:
+            tuple: The class of the tile and the edges crossing it.
+        """
+
+        west, south, east, north = get_tile_bounds(z, x, y)
+        margin = (east - west) / TILE_SIZE * self.margin_pixels
+        box = (west - margin, south - margin, east + margin, north + margin)
+
+        crossing_edges = [edge for edge in edges if edge_crosses_box(edge, box)]
+
+        if crossing_edges:
+            return INTERSECTS, crossing_edges
+
+        center = ((west + east) / 2, (south + north) / 2)
+
+        if is_point_in_polygon(center, self.edges):
+            return INSIDE, []
+
+        return OUTSIDE, []
+
+    def _build(self, z: int, x: int, y: int, edges: list[Edge]):
+        """Classifies the tile and, if it intersects the region, its children."""
+
+        tile_class, crossing_edges = self._classify(z, x, y, edges)
+        self.tiles[(z, x, y)] = tile_class
+
+        if tile_class == INTERSECTS and z < self.max_zoom:
+            for child_x in (2 * x, 2 * x + 1):
+                for child_y in (2 * y, 2 * y + 1):
+                    self._build(z + 1, child_x, child_y, crossing_edges)
+
+    def classify(self, z: int, x: int, y: int) -> str:
+        """
+        Classifies the tile, the tiles deeper than the quadtree get the class
+        of their deepest precomputed ancestor.
+
+        Returns:
+            str: OUTSIDE, INSIDE or INTERSECTS.
+        """
+
+        while z >= 0:
+            tile_class = self.tiles.get((z, x, y))
+
+            if tile_class is not None:
+                return tile_class
+
+            z, x, y = z - 1, x // 2, y // 2
+
+        return INTERSECTS
+
+    def is_outside(self, z: int, x: int, y: int) -> bool:
+        """Checks if the tile lies fully outside the region."""
+
+        return self.classify(z, x, y) == OUTSIDE
+
+    def get_tiles(self, z: int) -> list[tuple[int, int]]:
+        """
+        Lists the tiles of the zoom level not lying fully outside the region.
+
+        Parameters:
+            z (int): The zoom level.
+
+        Returns:
+            list: The columns and the rows of the tiles.
+        """
+
+        tiles = [(0, 0)]
+
+        for child_z in range(1, z + 1):
+            tiles = [
+                (child_x, child_y)
+                for x, y in tiles
+                for child_x in (2 * x, 2 * x + 1)
+                for child_y in (2 * y, 2 * y + 1)
+                if not self.is_outside(child_z, child_x, child_y)
+            ]
+
+        return tiles
@@ -0,0 +1,210 @@
+"""
+This module seeds the disk cache of the tile proxy ahead of the users.
+
+The tiles of a layer are fetched zoom level by zoom level over the region of interest,
+by a bounded pool of workers sharing the rate limit to the server.
+The completed zoom levels are saved in the manifest, keyed by the layer identifiers,
+so an interrupted seeding resumes where it stopped and a changed layer is seeded again.
+"""
+
+# Python
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Callable, Iterator, Mapping, Union
+
+# App
+from concurrency import TokenBucket
+from config import TILE_SEEDING
+from stages.tiles.proxy import (
+    UpstreamError,
+    create_session,
+    fetch_upstream_tile,
+    get_tile_key,
+)
+from stages.tiles.roi_quadtree import RoiQuadtree
+from stages.tiles.tile_cache import TileCache
+
+
+def load_manifest(path: str) -> dict:
+    """
+    Reads the progress of the previous seeding.
+
+    Returns:
+        dict: The completed zoom levels of each layer, empty without a manifest.
+    """
+
+    if not os.path.isfile(path):
+        return {"layers": {}}
+
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(path: str, manifest: dict):
+    """Writes the progress of the seeding, replacing the manifest at once."""
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+
+    descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temporary_path, path)
+
+
+class TileSeeder:
+    """
+    Fetches the missing tiles of the layers into the disk cache.
+    """
+
+    def __init__(self, cache: TileCache, roi: RoiQuadtree, settings: Mapping = None):
+        """
+        Parameters:
+            cache (TileCache): The disk cache of the tile proxy.
+            roi (RoiQuadtree): The region of the tiles to seed.
+            settings (Mapping): The manifest path, the number of the concurrent requests
+                and their rate limit, `TILE_SEEDING` by default.
+        """
+        settings = TILE_SEEDING if settings is None else settings
+
+        self.cache = cache
+        self.roi = roi
+        self.manifest_path = settings["manifest_path"]
+        self.max_workers = settings["max_workers"]
+
+        self.manifest = load_manifest(self.manifest_path)
+        self.rate_limiter = TokenBucket(settings["requests_per_second"])
+        self.session = create_session(self.max_workers)
+
+    def seed_tile(
+        self, layer_id: str, upstream_url: str, tile: tuple[int, int, int]
+    ) -> Union[int, None]:
+        """
+        Fetches the tile within the rate limit and stores it.
+
+        Parameters:
+            layer_id (str): The identifier of the layer, see `get_layer_id`.
+            upstream_url (str): The tile URL template of the server.
+            tile (tuple): The zoom level, the column and the row of the tile.
+
+        Returns:
+            int: The bytes written, or None if the server failed to return the tile.
+        """
+
+        z, x, y = tile
+        self.rate_limiter.acquire()
+
+        try:
+            tile = fetch_upstream_tile(self.session, upstream_url, z, x, y)
+        except UpstreamError as e:
+            logging.warning(e)
+            return None
+
+        self.cache.set(get_tile_key(layer_id, z, x, y), tile)
+        return len(tile)
+
+    def seed_zoom(self, layer_id: str, upstream_url: str, z: int) -> dict:
+        """
+        Fetches the missing tiles of the zoom level over the region.
+
+        Parameters:
+            layer_id (str): The identifier of the layer, see `get_layer_id`.
+            upstream_url (str): The tile URL template of the server.
+            z (int): The zoom level.
+
+        Returns:
+            dict: The numbers of the tiles, fetched, already cached and failed,
+            the bytes written and the duration.
+        """
+
+        start = time.perf_counter()
+        tiles = self.roi.get_tiles(z)
+
+        missing = [
+            (x, y)
+            for x, y in tiles
+            if get_tile_key(layer_id, z, x, y) not in self.cache
+        ]
+
+        with ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="tile-seeding"
+        ) as executor:
+            written = list(
+                executor.map(
+                    lambda tile: self.seed_tile(layer_id, upstream_url, (z, *tile)),
+                    missing,
+                )
+            )
+
+        failed = written.count(None)
+
+        return {
+            "zoom": z,
+            "tiles": len(tiles),
+            "fetched": len(missing) - failed,
+            "cached": len(tiles) - len(missing),
+            "failed": failed,
+            "bytes": sum(size for size in written if size is not None),
+            "seconds": time.perf_counter() - start,
+        }
+
+    def seed_layer(
+        self,
+        name: str,
+        get_layer: Callable[[], tuple[str, str]],
+        min_zoom: int,
+        max_zoom: int,
+    ) -> Iterator[dict]:
+        """
+        Seeds the zoom levels of the layer not completed by the previous seedings.
+
+        Parameters:
+            name (str): The key of the layer, for the manifest.
+            get_layer (Callable): Returns the identifier and the tile URL template
+                of the layer, called before each zoom level to renew the expired URL.
+            min_zoom (int): The first zoom level.
+            max_zoom (int): The last zoom level.
+
+        Yields:
+            dict: The statistics of each zoom level, see `seed_zoom`,
+            with "resumed" for the zoom levels completed before.
+        """
+
+        for z in range(min_zoom, max_zoom + 1):
+            layer_id, upstream_url = get_layer()
+
+            progress = self.manifest["layers"].setdefault(
+                layer_id, {"layer": name, "completed_zooms": []}
+            )
+
+            if z in progress["completed_zooms"]:
+                tiles = len(self.roi.get_tiles(z))
+                yield {
+                    "zoom": z,
+                    "tiles": tiles,
+                    "fetched": 0,
+                    "cached": tiles,
+                    "failed": 0,
+                    "bytes": 0,
+                    "seconds": 0.0,
+                    "resumed": True,
+                }
+                continue
+
+            stats = self.seed_zoom(layer_id, upstream_url, z)
+
+            # The zoom levels with failed tiles are retried by the next seeding
+            if not stats["failed"]:
+                progress["completed_zooms"].append(z)
+                save_manifest(self.manifest_path, self.manifest)
+
+            yield {**stats, "resumed": False}
+
+    def close(self):
+        """Closes the connections to the server."""
+
+        self.session.close()
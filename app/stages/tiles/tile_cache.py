@@ -0,0 +1,151 @@
+"""
+This module contains the size-bounded disk cache of the map tiles.
+
+Each tile is a file under its layer, zoom and column directories.
+The least recently used tiles are removed when the cache outgrows its size,
+the order of use survives the restarts of the app through the file times.
+The tiles written by another process, like the seeding script, are indexed
+on their first read.
+"""
+
+# Python
+from collections import OrderedDict
+import os
+import tempfile
+import threading
+import time
+from typing import Union
+
+
+class TileCache:
+    """
+    The tiles of all the layers on the disk, shared by all the threads of the app.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        """
+        Parameters:
+            path (str): The directory of the cache.
+            max_bytes (int): The largest size of all the tiles.
+        """
+
+        self.path = path
+        self.max_bytes = max_bytes
+
+        self._sizes: OrderedDict[str, int] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        """Indexes the tiles already on the disk, from the least recently used."""
+
+        tiles = []
+        for directory, _, files in os.walk(self.path):
+            for file in files:
+                if file.endswith(".tmp"):
+                    continue
+
+                file_path = os.path.join(directory, file)
+                stat = os.stat(file_path)
+                key = os.path.relpath(file_path, self.path).replace(os.sep, "/")
+                tiles.append((stat.st_mtime, key, stat.st_size))
+
+        for _, key, size in sorted(tiles):
+            self._sizes[key] = size
+            self._total_bytes += size
+
+    def _get_file_path(self, key: str) -> str:
+        """Returns the file of the tile."""
+
+        return os.path.join(self.path, *key.split("/"))
+
+    def get(self, key: str) -> Union[bytes, None]:
+        """
+        Returns the tile, or None if it is missing.
+
+        Parameters:
+            key (str): The tile key, "<layer>/<z>/<x>/<y>".
+        """
+
+        file_path = self._get_file_path(key)
+
+        with self._lock:
+            indexed = key in self._sizes
+            if indexed:
+                self._sizes.move_to_end(key)
+
+        if not indexed and not os.path.isfile(file_path):
+            return None
+
+        try:
+            with open(file_path, "rb") as f:
+                tile = f.read()
+
+            # The order of use for the next start of the app
+            os.utime(file_path, (time.time(), time.time()))
+
+        except FileNotFoundError:
+            # Evicted meanwhile by another thread
+            return None
+
+        if not indexed:
+            with self._lock:
+                if key not in self._sizes:
+                    self._sizes[key] = len(tile)
+                    self._total_bytes += len(tile)
+
+        return tile
+
+    def set(self, key: str, tile: bytes):
+        """
+        Stores the tile, removing the least recently used tiles over the size.
+
+        Parameters:
+            key (str): The tile key, "<layer>/<z>/<x>/<y>".
+            tile (bytes): The content of the tile.
+        """
+
+        file_path = self._get_file_path(key)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+
+        # Written aside and renamed, so no reader sees a partial tile
+        descriptor, temporary_path = tempfile.mkstemp(
+            dir=os.path.dirname(file_path), suffix=".tmp"
+        )
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(tile)
+        os.replace(temporary_path, file_path)
+
+        with self._lock:
+            self._total_bytes += len(tile) - self._sizes.pop(key, 0)
+            self._sizes[key] = len(tile)
+
+            evicted = []
+            while self._total_bytes > self.max_bytes and len(self._sizes) > 1:
+                old_key, size = self._sizes.popitem(last=False)
+                self._total_bytes -= size
+                evicted.append(old_key)
+
+        for old_key in evicted:
+            try:
+                os.remove(self._get_file_path(old_key))
+            except FileNotFoundError:
+                pass
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._sizes
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sizes)
+
+    @property
+    def total_bytes(self) -> int:
+        """The size of all the tiles."""
+
+        with self._lock:
+            return self._total_bytes
@@ -0,0 +1,157 @@
+"""
+This module contains the process-wide cache of the tile URLs of the map layers.
+
+Registering a layer on Google Earth Engine (getMapId) is a blocking request,
+so the URL template is reused by all the sessions until it expires.
+The hidden layers are registered only once their tiles are requested,
+see `get_deferred_tile_layer`.
+"""
+
+# Python
+import hashlib
+import json
+import threading
+import time
+from typing import Callable, Mapping
+
+# Third party
+import ee
+
+# App
+from config import TILE_IDS
+from layers import thaw
+from validation import handle_ee_operations
+
+LAYER_OPACITY = 0.6
+
+_TILE_URLS: dict[str, tuple[str, float]] = {}
+_TILE_URLS_LOCK = threading.Lock()
+
+
+def get_map_vis_params(vis_params: Mapping) -> dict:
+    """
+    Returns the visualization parameters of the layer on the map.
+
+    Parameters:
+        vis_params (Mapping): The read-only visualization parameters of the registry.
+
+    Returns:
+        dict: The visualization parameters with the opacity of the map layers.
+    """
+
+    return {**thaw(vis_params), "opacity": LAYER_OPACITY}
+
+
+def get_layer_id(image: ee.Image, vis_params: dict) -> str:
+    """
+    Hashes the expression of the layer with its visualization parameters.
+
+    Parameters:
+        image (ee.Image): The image of the layer.
+        vis_params (dict): The visualization parameters, including the opacity.
+
+    Returns:
+        str: The identifier of the layer.
+    """
+
+    layer = image.serialize() + json.dumps(vis_params, sort_keys=True)
+
+    return hashlib.sha256(layer.encode("utf-8")).hexdigest()
+
+
+@handle_ee_operations
+def get_tile_url(image: ee.Image, vis_params: dict) -> str:
+    """
+    Returns the XYZ tile URL template of the layer, registering it only on a cache miss.
+
+    Parameters:
+        image (ee.Image): The image of the layer.
+        vis_params (dict): The visualization parameters, including the opacity.
+
+    Returns:
+        str: The URL template with the {z}, {x} and {y} placeholders.
+    """
+
+    return get_tile_layer(image, vis_params)[1]
+
+
+@handle_ee_operations
+def get_tile_layer(image: ee.Image, vis_params: dict) -> tuple[str, str]:
+    """
+    Returns the identifier and the XYZ tile URL template of the layer,
+    registering it only on a cache miss.
+
+    Parameters:
+        image (ee.Image): The image of the layer.
+        vis_params (dict): The visualization parameters, including the opacity.
+
+    Returns:
+        tuple: The identifier of the layer and the URL template
+        with the {z}, {x} and {y} placeholders.
+    """
+
+    layer_id = get_layer_id(image, vis_params)
+
+    return layer_id, register_tile_layer(layer_id, image, vis_params)
+
+
+@handle_ee_operations
+def get_deferred_tile_layer(
+    image: ee.Image, vis_params: dict
+) -> tuple[str, Callable[[], str]]:
+    """
+    Returns the identifier of the layer and the function registering it,
+    for the layers registered only once their tiles are requested.
+
+    Parameters:
+        image (ee.Image): The image of the layer.
+        vis_params (dict): The visualization parameters, including the opacity.
+
+    Returns:
+        tuple: The identifier of the layer and the function returning
+        its URL template, registering the layer only on a cache miss.
+    """
+
+    layer_id = get_layer_id(image, vis_params)
+
+    @handle_ee_operations
+    def register() -> str:
+        return register_tile_layer(layer_id, image, vis_params)
+
+    return layer_id, register
+
+
+def register_tile_layer(layer_id: str, image: ee.Image, vis_params: dict) -> str:
+    """
+    Returns the cached URL template of the layer, registering it on the server
+    if missing or expired.
+    """
+
+    now = time.time()
+
+    with _TILE_URLS_LOCK:
+        cached = _TILE_URLS.get(layer_id)
+
+    if cached and cached[1] > now:
+        return cached[0]
+
+    map_id = image.getMapId(vis_params)
+    url_format = map_id["tile_fetcher"].url_format
+
+    with _TILE_URLS_LOCK:
+        # The changed layers leave expired URLs behind, they are dropped on insert
+        for expired in [
+            key for key, (_, expires_at) in _TILE_URLS.items() if expires_at <= now
+        ]:
+            del _TILE_URLS[expired]
+
+        _TILE_URLS[layer_id] = (url_format, now + TILE_IDS["ttl_seconds"])
+
+    return url_format
+
+
+def clear_tile_urls():
+    """Forgets all the cached tile URLs."""
+
+    with _TILE_URLS_LOCK:
+        _TILE_URLS.clear()
@@ -1,42 +1,212 @@
 """
 This module contains functions to display the map and map point information on the Streamlit app.
+
+The map libraries, geemap and folium, take seconds to import, so they are imported
+on the first display of the map, not with the module, see `import_map_modules`.
 """
 
+# Python
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import logging
+import time
+from typing import TYPE_CHECKING, Collection, Mapping
+
 # Third party
 import ee
-import folium
-from folium.plugins import MousePosition
-import geemap.foliumap as geemap
 import streamlit as st
 import streamlit.components.v1 as components
 
 # App
+from concurrency import get_executor
+from config import TILE_BACKEND, TILE_IDS, UI_STRINGS
+from metrics import timed
 from stages.data_acquisition.gee_server import WORLD_COVER_ESA_CODES
+from stages.tiles.proxy import (
+    get_deferred_tile_url,
+    get_proxied_tile_url,
+    get_tile_proxy,
+)
+from stages.tiles.renderer import get_rendered_tile_url
+from stages.tiles.tile_ids import (
+    get_deferred_tile_layer,
+    get_map_vis_params,
+    get_tile_layer,
+)
+
+if TYPE_CHECKING:
+    import geemap.foliumap as geemap
+
+# The session state of the hidden layers selected under the map
+SELECTED_LAYERS_KEY = "selected_layers"
+
+
+def import_map_modules():
+    """
+    Imports the map libraries, only the first call pays for it.
+    The warm-up calls it, so the first session finds them imported.
+    """
+
+    # pylint: disable=import-outside-toplevel, unused-import
+    import folium
+    import geemap.foliumap
+    import streamlit_folium
 
 
-def add_layer_to_map(gee_map: geemap.Map, layer: dict):
-    """Add a layer to the map with the specified vis_params and name."""
+def add_layer_to_map(gee_map: "geemap.Map", layer: Mapping, key: str = None):
+    """
+    Add a layer to the map with the specified vis_params and name,
+    the key of the layer in `MAP_DATA` selects its local rendering.
+    """
     try:
-        data: ee.Image = layer["data"]
-        vis_params: dict = layer["vis_params"]
-        name: str = layer["name"]
-        shown: bool = layer["shown"]
+        add_tile_layer(gee_map, layer, get_layer_tile_url(layer, key))
 
-        # Validate data types
-        if not isinstance(data, ee.Image):
-            raise TypeError("Data must be an Earth Engine Image.")
-        if not isinstance(vis_params, dict):
-            raise TypeError("Visualization parameters must be a dictionary.")
-        if not isinstance(name, str):
-            raise TypeError("Layer name must be a string.")
+    except Exception as e:
+        raise RuntimeError(f"Failed to add layer to map: {e}") from e
 
-        updated_vis_params = vis_params.copy()
-        updated_vis_params["opacity"] = 0.6  # Set opacity to 60%
 
-        gee_map.addLayer(data, updated_vis_params, name, shown=shown)
+def add_layers_to_map(gee_map: "geemap.Map", maps: Mapping[str, Mapping]):
+    """
+    Add the layers to the map in their order, their tile URLs are requested
+    concurrently on their own pool, so they do not wait behind the sampling.
+    A layer failing or late to load is left out of the map with a warning,
+    without blocking the other layers.
+    """
 
-    except Exception as e:
-        raise RuntimeError(f"Failed to add layer to map: {e}") from e
+    maps = get_map_layers(maps, st.session_state.get(SELECTED_LAYERS_KEY, ()))
+
+    executor = get_executor("tile_ids")
+    futures = {
+        key: executor.submit(get_layer_tile_url, layer, key)
+        for key, layer in maps.items()
+    }
+
+    deadline = time.monotonic() + TILE_IDS["timeout"]
+
+    for key, layer in maps.items():
+        try:
+            tile_url = futures[key].result(timeout=max(0, deadline - time.monotonic()))
+
+        except FutureTimeoutError:
+            # Registered meanwhile, the layer is shown by the next rerun
+            logging.error("Timed out loading the %s layer.", key)
+            st.warning(f"The {layer['name']} layer is still loading, refresh the app.")
+            continue
+
+        except Exception as e:  # pylint: disable=broad-except
+            logging.error("Failed to load the %s layer: %s", key, e)
+            st.warning(f"The {layer['name']} layer failed to load.")
+            continue
+
+        add_tile_layer(gee_map, layer, tile_url)
+
+
+def get_deferred_layers(maps: Mapping[str, Mapping]) -> list[str]:
+    """
+    Returns the keys of the hidden layers left out of the map until they are selected,
+    none if the tile proxy registers them on their first tile request.
+    """
+
+    if not TILE_IDS["defer_hidden_layers"] or get_tile_proxy() is not None:
+        return []
+
+    return [key for key, layer in maps.items() if not layer["shown"]]
+
+
+def get_map_layers(
+    maps: Mapping[str, Mapping], selected_layers: Collection[str] = ()
+) -> dict[str, Mapping]:
+    """
+    Returns the layers added to the map, without the deferred hidden layers
+    not selected yet, the selected ones are shown.
+
+    Parameters:
+        maps (Mapping): The layers of the region by their keys.
+        selected_layers (Collection): The keys of the hidden layers selected by the user.
+
+    Returns:
+        dict: The layers by their keys, in their order.
+    """
+
+    deferred = get_deferred_layers(maps)
+
+    return {
+        key: {**layer, "shown": True} if key in deferred else layer
+        for key, layer in maps.items()
+        if key not in deferred or key in selected_layers
+    }
+
+
+def display_layer_selector(maps: Mapping[str, Mapping]):
+    """
+    Display the selector of the hidden layers deferred until selected,
+    a selected layer is registered on the server and shown on the next rerun.
+    """
+
+    deferred = get_deferred_layers(maps)
+
+    if deferred:
+        st.multiselect(
+            UI_STRINGS["hidden_layers"],
+            options=deferred,
+            format_func=lambda key: maps[key]["name"],
+            key=SELECTED_LAYERS_KEY,
+        )
+
+
+def get_layer_tile_url(layer: Mapping, key: str = None) -> str:
+    """
+    Returns the tile URL template of the layer, registering it on the server if needed.
+    """
+    data: ee.Image = layer["data"]
+    vis_params: Mapping = layer["vis_params"]
+    name: str = layer["name"]
+    shown: bool = layer["shown"]
+
+    # Validate data types
+    if not isinstance(data, ee.Image):
+        raise TypeError("Data must be an Earth Engine Image.")
+    if not isinstance(vis_params, Mapping):
+        raise TypeError("Visualization parameters must be a mapping.")
+    if not isinstance(name, str):
+        raise TypeError("Layer name must be a string.")
+
+    # The settings of the registry are read-only, shared by all the sessions
+    updated_vis_params = get_map_vis_params(vis_params)
+
+    tile_url = None
+    if TILE_BACKEND == "local":
+        # Rendered by the tile proxy from the local raster store, if exported
+        tile_url = get_rendered_tile_url(key, updated_vis_params)
+
+    if tile_url is None and not shown and TILE_IDS["defer_hidden_layers"]:
+        # Registered on the server by the proxy once the user shows the layer
+        layer_id, register = get_deferred_tile_layer(data, updated_vis_params)
+        tile_url = get_deferred_tile_url(layer_id, register)
+
+    if tile_url is None:
+        # The tile URL is reused across the reruns until it expires,
+        # it spares the request to register the layer on the server
+        layer_id, upstream_url = get_tile_layer(data, updated_vis_params)
+
+        # The tiles are loaded through the local caching proxy, if it is running
+        tile_url = get_proxied_tile_url(layer_id, upstream_url)
+
+    return tile_url
+
+
+def add_tile_layer(gee_map: "geemap.Map", layer: Mapping, tile_url: str):
+    """Add the tiles of the layer to the map, under its name in the layer control."""
+    import folium  # pylint: disable=import-outside-toplevel
+
+    folium.TileLayer(
+        tiles=tile_url,
+        attr="Google Earth Engine",
+        name=layer["name"],
+        overlay=True,
+        control=True,
+        show=layer["shown"],
+        max_zoom=24,
+    ).add_to(gee_map)
 
 
 def generate_legend(map_data: dict) -> str:
@@ -172,17 +342,23 @@ def generate_legend_entries(map_legends: dict) -> str:
     return legend_entries
 
 
-def display_map(data: dict) -> geemap.Map:
+@timed()
+def display_map(data: dict) -> "geemap.Map":
     """
     Display the map with the specified data layers and center.
     """
+    # pylint: disable=import-outside-toplevel
+    import folium
+    from folium.plugins import MousePosition
+    import geemap.foliumap as geemap
 
     try:
         maps = data["maps"]
         center = data["center"]
 
-        # Create the map centered at the calculated centroid
-        gee_map = geemap.Map(center=center, zoom=3.0)
+        # Create the map centered at the calculated centroid,
+        # Earth Engine is already initialized by the app, see `ensure_connection`
+        gee_map = geemap.Map(center=center, zoom=3.0, ee_initialize=False)
 
         gee_map.add_child(folium.LatLngPopup())
 
@@ -192,8 +368,7 @@ def display_map(data: dict) -> geemap.Map:
                 popup="Current Location",
             ).add_to(gee_map)
 
-        for layer in maps.values():
-            add_layer_to_map(gee_map, layer)
+        add_layers_to_map(gee_map, maps)
 
         formatter = "function(num) {return L.Util.formatNum(num, 3) + ' º ';};"
 
@@ -216,6 +391,7 @@ def display_map(data: dict) -> geemap.Map:
         raise RuntimeError(f"Failed to display map: {e}") from e
 
 
+@timed()
 def display_map_point_info(data: dict):
     """
     Display the information for the clicked point on the map as a separate success or error message.
@@ -318,6 +494,7 @@ def format_map_point_output(formatted_values: dict, address: str) -> str:
     return output_text
 
 
+@timed()
 def display_coordinate_input_panel():
     """Display the coordinate input panel."""
 
@@ -342,6 +519,7 @@ def display_coordinate_input_panel():
         )
 
 
+@timed()
 def display_map_legend(map_data: dict):
     """
     Display the map legend for the specified map data.
@@ -350,6 +528,7 @@ def display_map_legend(map_data: dict):
     components.html(legends_html, height=400, scrolling=True)
 
 
+@timed()
 def display_title(text: str):
     """Display a title in the center of the page."""
 
@@ -359,6 +538,7 @@ def display_title(text: str):
     )
 
 
+@timed()
 def display_text(text: str):
     """Display text in the center of the page."""
 
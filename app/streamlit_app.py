@@ -1,30 +1,36 @@
 """
-This script contains the Streamlit app logic and is the entry point for the Streamlit app. 
+This script contains the Streamlit app logic and is the entry point for the Streamlit app.
 It initializes the Earth Engine module, retrieves the region data, and displays the map.
 """
 
 # Python
+import asyncio
 import logging
+from typing import Mapping
 
 # Third party
 import streamlit as st
-from streamlit_folium import st_folium
 
 # App
-from stages.server_connection import establish_connection
+from stages.server_connection import ensure_connection
+from stages.tiles.proxy import warn_about_disabled_proxy
 from stages.visualization import (
     display_text,
     display_title,
     display_map,
+    display_layer_selector,
     display_coordinate_input_panel,
     display_map_point_info,
     display_map_legend,
     report_error,
 )
-from stages.data_acquisition.point import get_map_point_data
+from stages.data_acquisition.point import aget_map_point_data
 from stages.data_acquisition.region import get_region_data, calculate_center
-from config import UI_STRINGS, MAP_DATA, ROI
+from config import UI_STRINGS, ROI
+from layers import LAYER_REGISTRY
 from logger import set_logging_level
+from metrics import span
+from warmup import is_warming_up, wait_for_warmup
 
 
 def streamlit_app():
@@ -33,6 +39,11 @@ def streamlit_app():
     display_title(UI_STRINGS["title"])
     display_text(UI_STRINGS["subtitle"])
 
+    if is_warming_up():
+        # The session reuses the layers and the tiles of the warm-up
+        with st.spinner(UI_STRINGS["warming_up"]):
+            wait_for_warmup()
+
     if not initialize_earth_engine():
         return  # Exit app
 
@@ -50,7 +61,7 @@ def streamlit_app():
         update_latitude_longitude_session(map_result)
 
     lat, lon = st.session_state["latitude"], st.session_state["longitude"]
-    point_data = get_map_point_data(lat, lon, ROI["periods"])
+    point_data = asyncio.run(aget_map_point_data(lat, lon, ROI["periods"]))
     display_map_point_info(point_data)
 
     # The display_coordinate_input_panel() is called here
@@ -60,7 +71,7 @@ def streamlit_app():
     # https://docs.streamlit.io/develop/api-reference/caching-and-state/st.session_state
     display_coordinate_input_panel()
 
-    display_legend(MAP_DATA)
+    display_legend(LAYER_REGISTRY)
 
 
 def setup_latitude_longitude_session():
@@ -73,7 +84,7 @@ def setup_latitude_longitude_session():
 def initialize_earth_engine() -> bool:
     """Initialize the Earth Engine and handle errors."""
     try:
-        establish_connection()
+        ensure_connection()
         return True
     except RuntimeError as e:
         error = "Failed to initialize Earth Engine module"
@@ -83,10 +94,16 @@ def initialize_earth_engine() -> bool:
 
 def fetch_and_display_region_data():
     """Fetch region data and display the map."""
+    # Imported with the map, see `import_map_modules`
+    from streamlit_folium import st_folium  # pylint: disable=import-outside-toplevel
+
     try:
-        regions_data = get_region_data(ROI, MAP_DATA)
+        regions_data = get_region_data(ROI, LAYER_REGISTRY)
         folium_map = display_map(regions_data)
-        map_result = st_folium(folium_map, key="map", width=725, height=500)
+        # The serialization of the map to the component
+        with span("st_folium"):
+            map_result = st_folium(folium_map, key="map", width=725, height=500)
+        display_layer_selector(regions_data["maps"])
         return regions_data, map_result
     except RuntimeError as e:
         error = "Failed to retrieve or display region data"
@@ -108,7 +125,7 @@ def update_latitude_longitude_session(map_result: dict):
         st.session_state["longitude"] = last_click_lng
 
 
-def display_legend(map_data: dict):
+def display_legend(map_data: Mapping):
     """Display the map legend."""
     try:
         display_map_legend(map_data)
@@ -121,6 +138,7 @@ def display_legend(map_data: dict):
 if __name__ == "__main__":
 
     set_logging_level()
+    warn_about_disabled_proxy()
 
     try:
         streamlit_app()
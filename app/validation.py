@@ -4,9 +4,12 @@ This module contains functions to validate the input data.
 
 # Python
 from datetime import datetime
+import functools
+import inspect
 
 # App
 from _types import Roi_Coords
+from metrics import span
 
 # Third party
 import ee
@@ -73,11 +76,32 @@ def validate_coordinates(lat: float, lon: float):
 
 
 def handle_ee_operations(func):
-    """Decorator to handle errors from Google Earth Engine operations"""
+    """
+    Decorator to handle errors from Google Earth Engine operations,
+    timed in a span named after the function, see `metrics.py`.
+    """
+
+    if inspect.iscoroutinefunction(func):
+
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                with span(func.__name__):
+                    return await func(*args, **kwargs)
+            except ee.EEException as e:
+                raise RuntimeError(f"Earth Engine operation failed: {str(e)}") from e
+            except Exception as e:
+                raise RuntimeError(
+                    f"Unexpected error in Earth Engine operation: {str(e)}"
+                ) from e
+
+        return async_wrapper
 
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         try:
-            return func(*args, **kwargs)
+            with span(func.__name__):
+                return func(*args, **kwargs)
         except ee.EEException as e:
             raise RuntimeError(f"Earth Engine operation failed: {str(e)}") from e
         except Exception as e:
@@ -0,0 +1,176 @@
+"""
+This module warms up the process-wide caches of the app when the server starts.
+
+The first session would otherwise pay for the import of the map libraries,
+the connection to Earth Engine, the build of the region layers, the registration
+of their tiles and the sampling of the starting point. The warm-up does it
+on a background thread, started by `serve.py` before the Streamlit server,
+and its readiness is exposed to the sessions and on the "/ready" path of the tile proxy.
+"""
+
+# Python
+import logging
+import threading
+import time
+
+# App
+from concurrency import get_executor
+from config import ROI, WARMUP
+from layers import LAYER_REGISTRY
+from stages.server_connection import ensure_connection
+from stages.data_acquisition.point import get_map_point_data
+from stages.data_acquisition.region import calculate_center, get_region_data
+from stages.tiles.proxy import get_tile_proxy
+from stages.visualization import (
+    get_layer_tile_url,
+    get_map_layers,
+    import_map_modules,
+)
+
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+FAILED = "failed"
+
+_WARMUP = {"state": PENDING, "steps": {}, "error": None, "thread": None}
+_WARMUP_LOCK = threading.Lock()
+_WARMUP_DONE = threading.Event()
+
+
+def connect():
+    """Connects to Earth Engine."""
+
+    ensure_connection()
+
+
+def build_region_layers():
+    """Builds the region layers into the process-wide cache."""
+
+    get_region_data(ROI, LAYER_REGISTRY)
+
+
+def register_tile_layers():
+    """
+    Registers the tiles of the map layers on the tile proxy and the server,
+    a failing layer is left to the first session.
+    """
+
+    # The layers of the map of a new session
+    maps = get_map_layers(get_region_data(ROI, LAYER_REGISTRY)["maps"])
+
+    futures = {
+        key: get_executor("tile_ids").submit(get_layer_tile_url, layer, key)
+        for key, layer in maps.items()
+    }
+
+    for key, future in futures.items():
+        try:
+            future.result()
+        except Exception as e:  # pylint: disable=broad-except
+            logging.error("Failed to warm up the tiles of the %s layer: %s", key, e)
+
+
+def sample_starting_point():
+    """Samples the centroid of the region, the starting point of the sessions."""
+
+    lat, lon = calculate_center(ROI["roi_coords"])
+    get_map_point_data(lat, lon, ROI["periods"])
+
+
+WARMUP_STEPS = [
+    ("map_modules", import_map_modules),
+    ("connection", connect),
+    ("region_layers", build_region_layers),
+    ("tile_layers", register_tile_layers),
+    ("starting_point", sample_starting_point),
+]
+
+
+def run_warmup():
+    """Runs the steps of the warm-up, recording their durations."""
+
+    # The readiness for the load balancers, from the start of the warm-up
+    proxy = get_tile_proxy()
+    if proxy is not None:
+        proxy.readiness = get_warmup_status
+
+    try:
+        for name, step in WARMUP_STEPS:
+            start = time.perf_counter()
+            step()
+
+            with _WARMUP_LOCK:
+                _WARMUP["steps"][name] = round(time.perf_counter() - start, 3)
+
+        with _WARMUP_LOCK:
+            _WARMUP["state"] = READY
+
+    except Exception as e:  # pylint: disable=broad-except
+        # The sessions build what is missing themselves
+        logging.error("Failed to warm up the app: %s", e)
+
+        with _WARMUP_LOCK:
+            _WARMUP["state"] = FAILED
+            _WARMUP["error"] = str(e)
+
+    finally:
+        _WARMUP_DONE.set()
+
+
+def start_warmup() -> threading.Thread:
+    """
+    Starts the warm-up on a background thread, only once per process.
+
+    Returns:
+        threading.Thread: The thread of the warm-up.
+    """
+
+    with _WARMUP_LOCK:
+        if _WARMUP["thread"] is None:
+            _WARMUP["state"] = RUNNING
+            _WARMUP["thread"] = threading.Thread(
+                target=run_warmup, name="warmup", daemon=True
+            )
+            _WARMUP["thread"].start()
+
+        return _WARMUP["thread"]
+
+
+def get_warmup_status() -> dict:
+    """
+    Returns the readiness of the app.
+
+    Returns:
+        dict: The state, "pending" without a warm-up, "running", "ready" or "failed",
+        the durations of the completed steps in seconds and the error.
+    """
+
+    with _WARMUP_LOCK:
+        return {
+            "state": _WARMUP["state"],
+            "steps": dict(_WARMUP["steps"]),
+            "error": _WARMUP["error"],
+        }
+
+
+def is_warming_up() -> bool:
+    """Checks if the warm-up is still running."""
+
+    return get_warmup_status()["state"] == RUNNING
+
+
+def wait_for_warmup(timeout: float = None) -> dict:
+    """
+    Waits for the running warm-up, so the session reuses its results.
+
+    Parameters:
+        timeout (float): The longest wait in seconds, `WARMUP["timeout"]` by default.
+
+    Returns:
+        dict: The readiness of the app, see `get_warmup_status`.
+    """
+
+    if is_warming_up():
+        _WARMUP_DONE.wait(WARMUP["timeout"] if timeout is None else timeout)
+
+    return get_warmup_status()
@@ -0,0 +1,14 @@
+"""
+The benchmarks of the app, run them from the repository root, e.g.:
+
+    python -m benchmarks.bench_evaluation
+"""
+
+# Python
+import os
+import sys
+
+# The app modules import each other from the 'app' directory
+sys.path.append(
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app")
+)
@@ -0,0 +1,120 @@
+"""
+The benchmark of the afforestation evaluation of many points,
+the vectorized NumPy path against the loop over the scalar path.
+
+    python -m benchmarks.bench_evaluation [--points 1000000]
+"""
+
+# Python
+import argparse
+import time
+
+# Third party
+import numpy as np
+
+# App
+from app.stages.data_categorization import evaluate_afforestation_candidates
+from app.stages.data_acquisition.gee_server import WORLD_COVER_ESA_CODES
+
+# The evaluation without the metrics of @timed, which the scalar path
+# would otherwise pay once per point
+evaluate = evaluate_afforestation_candidates.__wrapped__
+
+
+def create_points(count: int, seed: int = 0) -> dict[str, np.ndarray]:
+    """
+    Creates random layer values around the conditions, with no-data values.
+
+    Parameters:
+        count (int): The number of points.
+        seed (int): The seed of the random generator.
+
+    Returns:
+        dict: The arrays of the slope, precipitation, soil moisture and world cover.
+    """
+    generator = np.random.default_rng(seed)
+
+    def with_no_data(values: np.ndarray) -> np.ndarray:
+        values[generator.random(count) < 0.05] = -1
+        return values
+
+    return {
+        "slope": generator.uniform(0, 30, count),
+        "precipitation": with_no_data(generator.uniform(0, 400, count)),
+        "soil_moisture": with_no_data(generator.uniform(0, 0.4, count)),
+        "world_cover": generator.choice(
+            np.array(list(WORLD_COVER_ESA_CODES.values())), count
+        ),
+    }
+
+
+def evaluate_scalars(points: dict[str, np.ndarray]) -> list[bool]:
+    """Evaluates the points one by one, like the single point of the map."""
+
+    return [
+        evaluate(slope, precipitation, soil_moisture, cover)
+        for slope, precipitation, soil_moisture, cover in zip(
+            points["slope"].tolist(),
+            points["precipitation"].tolist(),
+            points["soil_moisture"].tolist(),
+            points["world_cover"].tolist(),
+        )
+    ]
+
+
+def evaluate_arrays(points: dict[str, np.ndarray]) -> np.ndarray:
+    """Evaluates all the points in one vectorized pass."""
+
+    return evaluate(
+        points["slope"],
+        points["precipitation"],
+        points["soil_moisture"],
+        points["world_cover"],
+    )
+
+
+def measure(func, *args) -> tuple[float, object]:
+    """Returns the duration of the call in seconds and its result."""
+
+    start = time.perf_counter()
+    value = func(*args)
+    return time.perf_counter() - start, value
+
+
+def run(count: int) -> dict:
+    """
+    Runs the benchmark, checking that both paths agree.
+
+    Returns:
+        dict: The durations in seconds and the speedup.
+    """
+    points = create_points(count)
+
+    scalars_seconds, scalars = measure(evaluate_scalars, points)
+    arrays_seconds, arrays = measure(evaluate_arrays, points)
+
+    if arrays.tolist() != scalars:
+        raise AssertionError("The vectorized and the scalar evaluations differ.")
+
+    return {
+        "points": count,
+        "scalars_seconds": scalars_seconds,
+        "arrays_seconds": arrays_seconds,
+        "speedup": scalars_seconds / arrays_seconds,
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--points", type=int, default=1_000_000)
+    arguments = parser.parse_args()
+
+    result = run(arguments.points)
+
+    print(
+        f"{result['points']:,} points: "
+        f"scalars {result['scalars_seconds']:.3f} s, "
+        f"arrays {result['arrays_seconds']:.3f} s, "
+        f"speedup x{result['speedup']:.0f}"
+    )
@@ -0,0 +1,343 @@
+"""
+The benchmark of the hot paths of a click, each path timed on its own, on the fake
+Earth Engine of the tests and without the geocoding, so it needs neither the network
+nor the credentials:
+
+    python -m benchmarks.bench_hot_paths [--runs 20] [--output results.json]
+
+The results are written as JSON, by default to `cache/benchmarks/hot_paths.json`,
+and compared with the baseline stored in the repository, a path slower than
+its baseline by more than the tolerance fails the run. The durations depend on
+the machine, store the baseline of the current commit on the machine comparing them:
+
+    python -m benchmarks.bench_hot_paths --save-baseline
+"""
+
+# Python
+import argparse
+from contextlib import ExitStack
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable
+from unittest import mock
+
+# Test
+from tests._fake_ee import use_fake_ee
+
+# App
+from app.config import ROI
+from app.layers import LAYER_REGISTRY
+from app.roundtrips import count_roundtrips
+from app.stages.data_acquisition import point
+from app.stages.data_acquisition.region import calculate_center, get_region_data
+from app.stages.data_categorization import evaluate_afforestation_candidates
+from app.stages.visualization import (
+    display_map,
+    format_map_point_values,
+    generate_legend,
+    import_map_modules,
+)
+
+# Benchmarks
+from benchmarks.bench_evaluation import create_points, evaluate_arrays
+from benchmarks.bench_replay import clear_caches
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baseline.json"
+)
+OUTPUT_PATH = "cache/benchmarks/hot_paths.json"
+
+# The share a path may be slower than its baseline
+TOLERANCE = 0.25
+
+RUNS = 20
+
+# The calls timed together in a run of the paths taking microseconds
+FAST_PATH_CALLS = 1000
+
+# The evaluation of the whole grid of the region, like the batch API
+ARRAY_POINTS = 100_000
+
+
+def measure(
+    function: Callable,
+    setup: Callable[[], ExitStack] = ExitStack,
+    runs: int = RUNS,
+    calls: int = 1,
+) -> dict:
+    """
+    Times the function, the first run is left out, it fills the lazy imports.
+
+    Parameters:
+        function (Callable): The path, called without arguments.
+        setup (Callable): Returns the context of a run, e.g. the cleared caches.
+        runs (int): The number of the timed runs.
+        calls (int): The calls of the function in a run.
+
+    Returns:
+        dict: The median and the min duration of a call in seconds,
+        and the Earth Engine round-trips of a run.
+    """
+
+    with setup():
+        function()
+
+    durations = []
+    for _ in range(runs):
+        with setup(), count_roundtrips() as roundtrips:
+            start = time.perf_counter()
+            for _ in range(calls):
+                function()
+            durations.append((time.perf_counter() - start) / calls)
+
+    return {
+        "median_seconds": statistics.median(durations),
+        "min_seconds": min(durations),
+        "runs": runs,
+        "calls": calls,
+        "roundtrips": roundtrips.count,
+    }
+
+
+def without_geocoding() -> ExitStack:
+    """Clears the caches like a new process, the address is answered at once."""
+
+    stack = clear_caches()
+    stack.enter_context(
+        mock.patch.object(point, "get_address_from_point", return_value="Sahel")
+    )
+    stack.enter_context(mock.patch.object(point, "POINT_DATA_BACKEND", "gee"))
+
+    return stack
+
+
+def run(runs: int = RUNS) -> dict[str, dict]:
+    """
+    Times the hot paths in the order of a click, on the outputs of the previous ones.
+
+    Returns:
+        dict: The timing of each path, see `measure`.
+    """
+
+    lat, lon = calculate_center(ROI["roi_coords"])
+    import_map_modules()
+
+    with use_fake_ee(), without_geocoding():
+        point_data = point.get_map_point_data(lat, lon, ROI["periods"])
+        region_data = get_region_data(ROI, LAYER_REGISTRY)
+
+    array_points = create_points(ARRAY_POINTS)
+
+    # The function, the setup of a run and the calls in a run of each path
+    paths = {
+        "get_map_point_data": (
+            lambda: point.get_map_point_data(lat, lon, ROI["periods"]),
+            without_geocoding,
+            1,
+        ),
+        "get_region_data": (
+            lambda: get_region_data(ROI, LAYER_REGISTRY),
+            without_geocoding,
+            1,
+        ),
+        # Without the cached tile URLs, serialized to HTML like by `st_folium`
+        "display_map": (
+            lambda: display_map(region_data).get_root().render(),
+            without_geocoding,
+            1,
+        ),
+        "generate_legend": (
+            lambda: generate_legend(LAYER_REGISTRY),
+            ExitStack,
+            FAST_PATH_CALLS,
+        ),
+        "format_map_point_values": (
+            lambda: format_map_point_values(point_data),
+            ExitStack,
+            FAST_PATH_CALLS,
+        ),
+        "evaluate_afforestation_candidates": (
+            lambda: evaluate_afforestation_candidates(
+                point_data["slope"],
+                point_data["precipitation"],
+                point_data["soil_moisture"],
+                point_data["world_cover_code"],
+            ),
+            ExitStack,
+            FAST_PATH_CALLS,
+        ),
+        "evaluate_afforestation_candidates_arrays": (
+            lambda: evaluate_arrays(array_points),
+            ExitStack,
+            1,
+        ),
+    }
+
+    with use_fake_ee():
+        return {
+            name: measure(function, setup, runs, calls)
+            for name, (function, setup, calls) in paths.items()
+        }
+
+
+def get_commit() -> str:
+    """Returns the hash of the checked out commit, or an empty string outside git."""
+
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+    return result.stdout.strip()
+
+
+def create_report(paths: dict[str, dict]) -> dict:
+    """Adds the commit and the machine to the timings, to compare the commits."""
+
+    return {
+        "commit": get_commit(),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "paths": paths,
+    }
+
+
+def compare(
+    paths: dict[str, dict],
+    baseline: dict[str, dict],
+    tolerance: float = TOLERANCE,
+) -> dict[str, dict]:
+    """
+    Compares the median durations with the baseline.
+
+    Parameters:
+        paths (dict): The timings of the paths, see `measure`.
+        baseline (dict): The timings of the paths of the baseline.
+        tolerance (float): The share a path may be slower than its baseline.
+
+    Returns:
+        dict: The ratio to the baseline of each path found in both,
+        and whether it regressed.
+    """
+
+    comparison = {}
+
+    for name, timing in paths.items():
+        if not baseline.get(name, {}).get("median_seconds"):
+            continue
+
+        seconds = timing["median_seconds"]
+        baseline_seconds = baseline[name]["median_seconds"]
+
+        comparison[name] = {
+            "baseline_seconds": baseline_seconds,
+            "ratio": seconds / baseline_seconds,
+            "regressed": seconds > baseline_seconds * (1 + tolerance),
+        }
+
+    return comparison
+
+
+def load_baseline(path: str) -> dict:
+    """Returns the stored report, or an empty one if there is none yet."""
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_report(report: dict, path: str):
+    """Writes the report as JSON."""
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2, sort_keys=True)
+        file.write("\n")
+
+
+def print_summary(report: dict):
+    """Prints the duration of each path and its ratio to the baseline."""
+
+    print(f"{'':>42} {'median':>12} {'baseline':>12} {'ratio':>7}")
+
+    for path, timing in report["paths"].items():
+        change = report["comparison"].get(path)
+        baseline = (
+            f"{change['baseline_seconds'] * 1e3:>9.3f} ms {change['ratio']:>7.2f}"
+            + (" regressed" if change["regressed"] else "")
+            if change
+            else ""
+        )
+        print(f"{path:>42} {timing['median_seconds'] * 1e3:>9.3f} ms {baseline}")
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--runs", type=int, default=RUNS)
+    parser.add_argument("--output", default=OUTPUT_PATH, help="The JSON results.")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the results as the baseline instead of comparing them.",
+    )
+    arguments = parser.parse_args()
+
+    results = create_report(run(arguments.runs))
+
+    if arguments.save_baseline:
+        save_report(results, arguments.baseline)
+        commit = results["commit"] or "the working tree"
+        print(f"The baseline of {commit} is saved to {arguments.baseline}")
+        sys.exit(0)
+
+    stored = load_baseline(arguments.baseline)
+    if not stored:
+        print(f"No baseline in {arguments.baseline} to compare.", file=sys.stderr)
+    elif stored["machine"] != results["machine"]:
+        print(
+            f"The baseline was measured on {stored['machine']}, "
+            "store one on this machine to compare the durations.",
+            file=sys.stderr,
+        )
+
+    results["baseline_commit"] = stored.get("commit")
+    results["comparison"] = compare(
+        results["paths"], stored.get("paths", {}), arguments.tolerance
+    )
+
+    save_report(results, arguments.output)
+    print_summary(results)
+    print(f"The results are saved to {arguments.output}")
+
+    regressions = [
+        name for name, change in results["comparison"].items() if change["regressed"]
+    ]
+
+    for regression in regressions:
+        ratio = results["comparison"][regression]["ratio"]
+        print(
+            f"{regression} regressed: x{ratio:.2f} "
+            f"of the baseline {results['baseline_commit']}",
+            file=sys.stderr,
+        )
+
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,98 @@
+"""
+The measurement of the cold start of the app modules, the import time
+reported by `python -X importtime` summarized per top-level package.
+
+Each module is imported in a new interpreter, the median of the runs is reported.
+It needs no credentials:
+
+    python -m benchmarks.bench_import_time [module ...]
+"""
+
+# Python
+from collections import defaultdict
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "app")
+
+# The entry points of the app, imported like `streamlit run` and `serve.py` do
+MODULES = ["stages.visualization", "warmup", "streamlit_app", "seed_tiles"]
+RUNS = 5
+TOP_PACKAGES = 10
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def measure_import(module: str) -> dict[str, float]:
+    """
+    Imports the module in a new interpreter.
+
+    Returns:
+        dict[str, float]: The import time in seconds of each top-level package,
+        its own modules only, and the total under "total".
+    """
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_PATH,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    return summarize_import_time(result.stderr)
+
+
+def summarize_import_time(report: str) -> dict[str, float]:
+    """
+    Sums the self time of the imported modules per top-level package.
+
+    Parameters:
+        report (str): The output of `python -X importtime`.
+
+    Returns:
+        dict[str, float]: The seconds per package and the total under "total".
+    """
+
+    packages = defaultdict(float)
+
+    for line in report.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, _, _, name = match.groups()
+            packages[name.split(".")[0]] += int(self_us) / 1e6
+
+    packages["total"] = sum(packages.values())
+
+    return dict(packages)
+
+
+def measure_median(module: str, runs: int = RUNS) -> dict[str, float]:
+    """Returns the median import time per package over the runs."""
+
+    measurements = [measure_import(module) for _ in range(runs)]
+    packages = {package for measurement in measurements for package in measurement}
+
+    return {
+        package: statistics.median(
+            measurement.get(package, 0.0) for measurement in measurements
+        )
+        for package in packages
+    }
+
+
+if __name__ == "__main__":
+
+    for app_module in sys.argv[1:] or MODULES:
+        timings = measure_median(app_module)
+        total = timings.pop("total")
+
+        print(f"{app_module}: {total:.2f} s")
+
+        for package, seconds in sorted(
+            timings.items(), key=lambda item: item[1], reverse=True
+        )[:TOP_PACKAGES]:
+            print(f"    {package:<24} {seconds:.3f} s")
@@ -0,0 +1,59 @@
+"""
+The measurement of the cold registration of the map layers on Earth Engine,
+all the layers at once against the hidden layers deferred until shown.
+
+It needs the Earth Engine credentials, like the app:
+
+    python -m benchmarks.bench_map_layers
+"""
+
+# Python
+import time
+
+# App
+from app.config import ROI
+from app.layers import LAYER_REGISTRY
+from app.stages.server_connection import establish_connection
+from app.stages.data_acquisition.region import get_region_data
+from app.stages.tiles.tile_ids import (
+    clear_tile_urls,
+    get_deferred_tile_layer,
+    get_map_vis_params,
+    get_tile_layer,
+)
+
+
+def register_layers(maps, defer_hidden: bool) -> float:
+    """
+    Registers the layers like the first render of the map, without any cached tile URL.
+
+    Returns:
+        float: The duration in seconds.
+    """
+
+    clear_tile_urls()
+    start = time.perf_counter()
+
+    for layer in maps.values():
+        vis_params = get_map_vis_params(layer["vis_params"])
+
+        if defer_hidden and not layer["shown"]:
+            get_deferred_tile_layer(layer["data"], vis_params)
+        else:
+            get_tile_layer(layer["data"], vis_params)
+
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+
+    establish_connection()
+
+    region_maps = get_region_data(ROI, LAYER_REGISTRY)["maps"]
+    shown = sum(layer["shown"] for layer in region_maps.values())
+
+    eager = register_layers(region_maps, defer_hidden=False)
+    deferred = register_layers(region_maps, defer_hidden=True)
+
+    print(f"all {len(region_maps)} layers registered: {eager:.2f} s")
+    print(f"{shown} shown layers registered, the others deferred: {deferred:.2f} s")
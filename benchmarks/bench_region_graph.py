@@ -0,0 +1,208 @@
+"""
+The measurement of the expression graphs of the region layers, the layers built
+one by one, like before the base images were shared, against the layers sharing them.
+
+The Earth Engine client deduplicates the serialized expression by the content
+of its nodes, so both builds send the same bytes to the server. The sharing spares
+the work of the client instead: the subexpressions built again, e.g. the polygon
+of the region and the four inputs of the candidates, and the nodes walked
+by the serializer.
+
+It runs on the fake Earth Engine of the tests, or on Earth Engine with the credentials:
+
+    python -m benchmarks.bench_region_graph [--live] [--runs 20]
+"""
+
+# Python
+import argparse
+from collections import Counter
+from contextlib import ExitStack, nullcontext
+import statistics
+import time
+from typing import Callable
+from unittest import mock
+
+# Test
+from tests._fake_ee import use_fake_ee
+
+# App
+from app.config import ROI
+from app.layers import LAYER_REGISTRY
+from app.stages.server_connection import establish_connection
+from app.stages.data_acquisition import region
+from app.stages.data_categorization import evaluate_afforestation_candidates
+
+# The subexpressions counted, the builders of the base images and the polygon
+BUILDERS = [
+    "fetch_satellite_imagery_data",
+    "fetch_elevation_data",
+    "fetch_slope_data",
+    "fetch_world_cover_data",
+    "fetch_soil_organic_carbon_data",
+    "fetch_mean_soil_moisture_data",
+    "fetch_total_precipitation_data",
+]
+
+RUNS = 20
+
+
+def build_layers_one_by_one(roi: dict) -> dict:
+    """
+    Builds each layer on its own, like before the sharing,
+    the candidates build their four inputs again.
+    """
+
+    coords = roi["roi_coords"]
+    rainy_season = roi["periods"]["soil_moisture"]
+    year = roi["periods"]["precipitation"]
+
+    def build_soil_moisture():
+        return region.get_rootzone_soil_moisture_region(
+            coords, rainy_season["start_date"], rainy_season["end_date"]
+        )
+
+    def build_precipitation():
+        return region.get_precipitation_region(
+            coords, year["start_date"], year["end_date"]
+        )
+
+    return {
+        "satellite_imagery": region.get_satellite_imagery_region(coords),
+        "elevation": region.get_elevation_region(coords),
+        "slope": region.get_slope_region(coords),
+        "world_cover": region.get_world_cover_region(coords),
+        "soc_0_20cm": region.get_soil_organic_carbon_region(coords),
+        "soil_moisture": build_soil_moisture(),
+        "precipitation": build_precipitation(),
+        "afforestation_candidates": evaluate_afforestation_candidates(
+            region.get_slope_region(coords),
+            build_precipitation(),
+            build_soil_moisture(),
+            region.get_world_cover_region(coords),
+        ),
+    }
+
+
+def build_shared_layers(roi: dict) -> dict:
+    """Builds the layers like the app, sharing the geometry and the base images."""
+
+    maps = region.build_region_data(roi, LAYER_REGISTRY)["maps"]
+
+    return {key: layer["data"] for key, layer in maps.items()}
+
+
+def count_builds(build: Callable[[dict], dict], roi: dict) -> tuple[Counter, dict]:
+    """
+    Counts the subexpressions built by the function.
+
+    Returns:
+        tuple: The calls of each builder and of the polygon, and the layers.
+    """
+
+    calls = Counter()
+
+    def counted(name: str, function: Callable) -> Callable:
+        def wrapper(*args, **kwargs):
+            calls[name] += 1
+            return function(*args, **kwargs)
+
+        return wrapper
+
+    with ExitStack() as stack:
+        for name in BUILDERS:
+            stack.enter_context(
+                mock.patch.object(
+                    region, name, counted(name, getattr(region, name))
+                )
+            )
+        stack.enter_context(
+            mock.patch.object(
+                region.ee.Geometry,
+                "Polygon",
+                counted("Polygon", region.ee.Geometry.Polygon),
+            )
+        )
+        images = build(roi)
+
+    return calls, images
+
+
+def measure_seconds(function: Callable, runs: int) -> float:
+    """Returns the median duration of the function in seconds."""
+
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+
+    return statistics.median(durations)
+
+
+def measure(build: Callable[[dict], dict], runs: int) -> dict:
+    """
+    Measures a build of the layers.
+
+    Returns:
+        dict: The calls of the builders and of the polygon, the subexpressions built
+        more than once, the build and the serialization of all the layers in seconds,
+        and the bytes of the serialized expressions.
+    """
+
+    calls, images = count_builds(build, ROI)
+    graph = region.ee.Dictionary(images)
+
+    return {
+        "calls": dict(calls),
+        "subexpressions_built": sum(calls.values()),
+        "duplicated_subexpressions": sum(count - 1 for count in calls.values()),
+        "build_seconds": measure_seconds(lambda: build(ROI), runs),
+        "serialize_seconds": measure_seconds(graph.serialize, runs),
+        "layers_bytes": sum(len(image.serialize()) for image in images.values()),
+        "graph_bytes": len(graph.serialize()),
+    }
+
+
+def run(runs: int = RUNS) -> dict:
+    """Measures the both builds of the region layers."""
+
+    return {
+        "one_by_one": measure(build_layers_one_by_one, runs),
+        "shared": measure(build_shared_layers, runs),
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument(
+        "--live", action="store_true", help="Build on Earth Engine, not on the fake."
+    )
+    parser.add_argument("--runs", type=int, default=RUNS)
+    arguments = parser.parse_args()
+
+    if arguments.live:
+        establish_connection()
+
+    with nullcontext() if arguments.live else use_fake_ee():
+        results = run(arguments.runs)
+
+    before, after = results["one_by_one"], results["shared"]
+
+    print(f"{'':>32} {'one by one':>12} {'shared':>12}")
+    for builder in [*BUILDERS, "Polygon"]:
+        print(
+            f"{builder:>32} {before['calls'].get(builder, 0):>12,}"
+            f" {after['calls'].get(builder, 0):>12,}"
+        )
+    for metric in [
+        "subexpressions_built",
+        "duplicated_subexpressions",
+        "layers_bytes",
+        "graph_bytes",
+    ]:
+        print(f"{metric:>32} {before[metric]:>12,} {after[metric]:>12,}")
+    # The fake builds the expressions with the images, only the client serializes them
+    seconds = ["build_seconds", "serialize_seconds"][: 2 if arguments.live else 1]
+    for metric in seconds:
+        print(f"{metric:>32} {before[metric]:>12.5f} {after[metric]:>12.5f}")
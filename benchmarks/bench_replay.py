@@ -0,0 +1,174 @@
+"""
+The end-to-end profile of a click, `get_map_point_data`, `get_region_data` and
+`display_map`, on the recorded traffic of Earth Engine and Nominatim.
+
+Record the traffic once, it needs the Earth Engine credentials and the network:
+
+    python -m benchmarks.bench_replay --record
+
+Then replay it offline, at once or with the recorded latencies, e.g. on CI:
+
+    python -m benchmarks.bench_replay [--latency 1.0] [--runs 5] [--profile]
+"""
+
+# Python
+import argparse
+import cProfile
+from contextlib import ExitStack
+import pstats
+import statistics
+import time
+from unittest import mock
+
+# App
+from app.cache import PersistentCache
+from app.cassette import connect_replay, use_cassette
+from app.config import CASSETTE, ROI
+from app.concurrency import TokenBucket
+from app.layers import LAYER_REGISTRY
+from app.roundtrips import count_roundtrips
+from app.stages.data_acquisition import point
+from app.stages.data_acquisition.region import (
+    calculate_center,
+    clear_region_data,
+    get_region_data,
+)
+from app.stages.server_connection import establish_connection
+from app.stages.visualization import display_map, import_map_modules
+
+# The app modules import the clients and their caches by their names in the 'app' directory
+# pylint: disable=wrong-import-order
+from stages.data_acquisition import geocoding
+from stages.tiles.tile_ids import clear_tile_urls
+
+PATHS = ["get_map_point_data", "get_region_data", "display_map"]
+
+
+def clear_caches() -> ExitStack:
+    """
+    Starts each run like a new process, without the cached samples, addresses,
+    region layers and tile URLs, and without the rate limit of Nominatim.
+
+    Returns:
+        ExitStack: Restores the caches at its exit.
+    """
+
+    clear_region_data()
+    clear_tile_urls()
+    geocoding.clear_addresses()
+
+    stack = ExitStack()
+    for patch in [
+        mock.patch.object(
+            point,
+            "get_point_cache",
+            return_value=PersistentCache(":memory:", max_entries=1000),
+        ),
+        mock.patch.object(
+            geocoding,
+            "get_address_cache",
+            return_value=PersistentCache(":memory:", max_entries=1000),
+        ),
+        mock.patch.object(geocoding, "_RATE_LIMITER", TokenBucket(rate=1000)),
+    ]:
+        stack.enter_context(patch)
+
+    return stack
+
+
+def run_click() -> dict[str, dict]:
+    """
+    Runs the paths of a click in turn.
+
+    Returns:
+        dict: The duration in seconds and the Earth Engine round-trips of each path.
+    """
+
+    lat, lon = calculate_center(ROI["roi_coords"])
+    results = {}
+
+    def measure(name, function, *args):
+        with count_roundtrips() as roundtrips:
+            start = time.perf_counter()
+            value = function(*args)
+            seconds = time.perf_counter() - start
+
+        results[name] = {"seconds": seconds, "roundtrips": roundtrips.count}
+        return value
+
+    with clear_caches():
+        measure(
+            "get_map_point_data", point.get_map_point_data, lat, lon, ROI["periods"]
+        )
+        region_data = measure("get_region_data", get_region_data, ROI, LAYER_REGISTRY)
+        measure("display_map", display_map, region_data)
+
+    return results
+
+
+def replay(runs: int, profile: cProfile.Profile = None) -> dict[str, dict]:
+    """
+    Replays the click, the first run is left out, it imports the map libraries.
+
+    Returns:
+        dict: The median duration in seconds and the round-trips of each path.
+    """
+
+    import_map_modules()
+    run_click()
+
+    timings = []
+    for _ in range(runs):
+        if profile:
+            profile.enable()
+        timings.append(run_click())
+        if profile:
+            profile.disable()
+
+    return {
+        name: {
+            "seconds": statistics.median(timing[name]["seconds"] for timing in timings),
+            "roundtrips": timings[-1][name]["roundtrips"],
+        }
+        for name in PATHS
+    }
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--cassette", default=CASSETTE["path"])
+    parser.add_argument("--record", action="store_true")
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.0,
+        help="The share of the recorded latency injected, 0 replays at once.",
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--profile", action="store_true")
+    arguments = parser.parse_args()
+
+    if arguments.record:
+        with use_cassette(arguments.cassette, "record") as recording:
+            establish_connection()
+            import_map_modules()
+            run_click()
+
+        print(f"{len(recording)} exchanges recorded in {arguments.cassette}")
+
+    else:
+        with use_cassette(arguments.cassette, "replay", arguments.latency) as cassette:
+            connect_replay(cassette)
+
+            profiler = cProfile.Profile() if arguments.profile else None
+            result = replay(arguments.runs, profiler)
+
+        for path, timing in result.items():
+            print(
+                f"{path:<20} {timing['seconds']:.3f} s, "
+                f"{timing['roundtrips']} round-trips"
+            )
+
+        if profiler:
+            pstats.Stats(profiler).sort_stats("cumulative").print_stats(30)
@@ -0,0 +1,990 @@
+"""
+This module is an in-process fake of the Earth Engine client, backed by small NumPy rasters.
+
+It implements the subset of the `ee` API the app uses, so the acquisition and
+the categorization stages run offline, deterministically and in milliseconds:
+    - `Image` from an asset or a constant, `clip`, `select`, `rename`, the comparisons,
+      `And`, `Or`, `unmask`, `reduceRegion`, `reduceRegions`, `getMapId`, `serialize`,
+    - `ImageCollection` with `filterDate`, `filterBounds`, `select`, `mean`, `sum`, `first`,
+    - `Terrain.slope`, `Reducer`, `Geometry`, `Feature`, `FeatureCollection`,
+    - `Dictionary`, `Number` and `getInfo`.
+
+The images are lazy like on the server: each one samples its bands at the coordinates
+asked by a reduction, only `getInfo` and `getMapId` compute, and each call is counted
+as a round-trip, see `app/roundtrips.py`.
+
+Replace the `ee` module of the loaded app modules with:
+
+    with use_fake_ee():
+        get_map_point_data(lat, lon, periods)
+"""
+
+# Python
+from contextlib import ExitStack, contextmanager
+from datetime import date
+import functools
+import hashlib
+import json
+import math
+import os
+import sys
+import types
+from typing import Callable, Iterator, NamedTuple, Union
+import warnings
+from unittest import mock
+
+# Third party
+import numpy as np
+import requests
+
+# App
+from app.config import GEE_MAP_COLLECTIONS
+from app.roundtrips import get_call_site, record_roundtrip
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "app")
+
+FAKE_API_URL = "https://earthengine.fake/v1"
+
+# The west, south, east and north edges of the fake rasters, around the Sahel
+BOUNDS = (-20.0, 5.0, 45.0, 25.0)
+
+METERS_PER_DEGREE = 111_320
+
+# The distance to the neighbouring pixels of the slope, the resolution of SRTM
+SLOPE_STEP_METERS = 30
+
+# The values of the pixels at the coordinates, NaN where they are masked
+Sampler = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+
+class Band(NamedTuple):
+    """A band of an image, its integer values are reduced to integers like on the server."""
+
+    sample: Sampler
+    integer: bool = False
+
+
+class EEException(Exception):
+    """The error of the fake server."""
+
+
+class Raster:
+    """A single-band raster over `BOUNDS`, sampled at its nearest pixel or interpolated."""
+
+    def __init__(self, pixels: np.ndarray, resolution: float, smooth: bool = False):
+        """
+        Parameters:
+            pixels (np.ndarray): The rows from the north, the columns from the west.
+            resolution (float): The size of the pixels in degrees.
+            smooth (bool): Interpolate between the centers of the pixels, for the terrain.
+        """
+
+        self.pixels = pixels.astype(np.float64)
+        self.resolution = resolution
+        self.smooth = smooth
+        self.integer = np.issubdtype(pixels.dtype, np.integer)
+
+    def get_band(self) -> Band:
+        """Returns the band sampling the raster."""
+
+        return Band(self.sample, self.integer)
+
+    def sample(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Returns the pixels under the points, NaN outside of the raster."""
+
+        west, _, _, north = BOUNDS
+        rows = (north - lats) / self.resolution
+        cols = (lons - west) / self.resolution
+
+        height, width = self.pixels.shape
+        inside = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+
+        values = np.full(lats.shape, np.nan)
+
+        if not self.smooth:
+            rows, cols = rows[inside].astype(np.int64), cols[inside].astype(np.int64)
+            values[inside] = self.pixels[rows, cols]
+            return values
+
+        # Bilinear between the centers of the four nearest pixels
+        rows = np.clip(rows[inside] - 0.5, 0, height - 1)
+        cols = np.clip(cols[inside] - 0.5, 0, width - 1)
+        top = np.minimum(rows.astype(np.int64), height - 2)
+        left = np.minimum(cols.astype(np.int64), width - 2)
+        dy, dx = rows - top, cols - left
+
+        values[inside] = (
+            self.pixels[top, left] * (1 - dy) * (1 - dx)
+            + self.pixels[top, left + 1] * (1 - dy) * dx
+            + self.pixels[top + 1, left] * dy * (1 - dx)
+            + self.pixels[top + 1, left + 1] * dy * dx
+        )
+        return values
+
+
+def create_grid(resolution: float) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the latitudes and the longitudes of the centers of the pixels over `BOUNDS`."""
+
+    west, south, east, north = BOUNDS
+    lats = np.arange(north - resolution / 2, south, -resolution)
+    lons = np.arange(west + resolution / 2, east, resolution)
+    return np.meshgrid(lats, lons, indexing="ij")
+
+
+def create_month_starts(first_year: int, last_year: int) -> list[str]:
+    """Returns the first days of the months of the years."""
+
+    return [
+        date(year, month, 1).isoformat()
+        for year in range(first_year, last_year + 1)
+        for month in range(1, 13)
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def get_datasets() -> dict:
+    """
+    Returns the synthetic datasets, keyed by their identifiers in `GEE_MAP_COLLECTIONS`.
+
+    The images are dicts of the bands and the collections lists of the images with
+    their start dates, monthly. The values follow the north to south gradient
+    of the Sahel, from the desert to the savanna.
+    """
+
+    lats, lons = create_grid(0.05)
+    wave = np.sin(np.radians(lons) * 12) * np.cos(np.radians(lats) * 20)
+    elevation = 250 + 150 * wave + 10 * (lons - BOUNDS[0])
+
+    coarse_lats, _coarse_lons = create_grid(0.25)
+    wetness = np.clip((20 - coarse_lats) / 12, 0, 1)  # 1 south of 8°N, 0 north of 20°N
+
+    # The bare land in the north, the grassland in the middle, the trees in the south
+    world_cover = np.where(
+        lats > 17, 60, np.where(lats > 11, 30, np.where(lons % 2 < 1, 10, 40))
+    )
+    world_cover[:, (lons[0] > 40) & (lons[0] < 41)] = 80  # a river
+
+    months = create_month_starts(2019, 2024)
+
+    def month_factor(month: int) -> float:
+        # The rainy season from June to September
+        return 1.0 if 6 <= month <= 9 else 0.1
+
+    precipitation = [
+        (
+            start,
+            {
+                "precipitation": Raster(
+                    wetness * 150 * month_factor(int(start[5:7])), 0.25
+                )
+            },
+        )
+        for start in months
+    ]
+    soil_moisture = [
+        (
+            start,
+            {
+                "sm_rootzone": Raster(
+                    0.05 + wetness * 0.35 * month_factor(int(start[5:7])), 0.25
+                )
+            },
+        )
+        for start in months
+    ]
+
+    return {
+        GEE_MAP_COLLECTIONS["elevation"]: {
+            "elevation": Raster(elevation, 0.05, smooth=True)
+        },
+        GEE_MAP_COLLECTIONS["soil_organic_carbon"]: {
+            "mean_0_20": Raster(5 + 20 * wetness, 0.25)
+        },
+        GEE_MAP_COLLECTIONS["world_type_terrain_cover"]: {
+            "Map": Raster(world_cover, 0.05)
+        },
+        GEE_MAP_COLLECTIONS["precipitation"]: precipitation,
+        GEE_MAP_COLLECTIONS["rootzone_soil_moisture"]: soil_moisture,
+        GEE_MAP_COLLECTIONS["satellite_imagery"]: [
+            (
+                "2023-01-01",
+                {
+                    band: Raster(1000 + 500 * wetness * weight, 0.25)
+                    for band, weight in [("B4", 0.5), ("B3", 0.8), ("B2", 0.3)]
+                },
+            )
+        ],
+    }
+
+
+def count_roundtrip(method: str, path: str):
+    """Counts a round-trip of the fake client, at the call site out of this module."""
+
+    frame = sys._getframe(2)  # pylint: disable=protected-access
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+
+    record_roundtrip(method, f"{FAKE_API_URL}/{path}", 0.0, get_call_site(frame))
+
+
+class ComputedObject:
+    """A value computed only by `getInfo`, like on the server."""
+
+    def __init__(self, compute: Callable, expression: str):
+        self._compute = compute
+        self._expression = expression
+
+    def evaluate(self):
+        """Computes the value without a round-trip, for the nested objects."""
+
+        return evaluate(self._compute())
+
+    def getInfo(self):  # pylint: disable=invalid-name
+        """Computes the value in a round-trip."""
+
+        count_roundtrip("POST", "value:compute")
+        return self.evaluate()
+
+    def serialize(self) -> str:
+        """Returns the expression of the value."""
+
+        return self._expression
+
+
+def evaluate(value):
+    """Computes the nested objects of the value."""
+
+    if isinstance(value, ComputedObject):
+        return value.evaluate()
+    if isinstance(value, dict):
+        return {key: evaluate(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [evaluate(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def Dictionary(values: dict) -> ComputedObject:  # pylint: disable=invalid-name
+    """A dictionary of computed objects."""
+
+    return ComputedObject(lambda: values, f"Dictionary({describe(values)})")
+
+
+def Number(value: float) -> ComputedObject:  # pylint: disable=invalid-name
+    """A number."""
+
+    return ComputedObject(lambda: value, f"Number({value})")
+
+
+def describe(value) -> str:
+    """Returns the expression of an argument."""
+
+    if isinstance(value, (ComputedObject, Image, Geometry, Reducer)):
+        return value.serialize()
+    if isinstance(value, dict):
+        return (
+            "{"
+            + ",".join(f"{key}:{describe(item)}" for key, item in value.items())
+            + "}"
+        )
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(describe(item) for item in value) + "]"
+    return json.dumps(value)
+
+
+class Geometry:
+    """A geometry in longitude and latitude."""
+
+    def __init__(self, kind: str, coordinates: list, radius: float = 0.0):
+        self.kind = kind
+        self.coordinates = coordinates
+        self.radius = radius  # meters, the buffer of the points
+
+    @staticmethod
+    def Point(coordinates: list) -> "Geometry":  # pylint: disable=invalid-name
+        """A point, [lon, lat]."""
+
+        return Geometry("Point", [list(coordinates)])
+
+    @staticmethod
+    def MultiPoint(coordinates: list) -> "Geometry":  # pylint: disable=invalid-name
+        """Many points, [[lon, lat], ...]."""
+
+        return Geometry("MultiPoint", [list(point) for point in coordinates])
+
+    @staticmethod
+    def Polygon(coordinates: list) -> "Geometry":  # pylint: disable=invalid-name
+        """A polygon, [[lon, lat], ...] or its rings."""
+
+        if coordinates and isinstance(coordinates[0][0], (list, tuple)):
+            coordinates = coordinates[0]
+        return Geometry("Polygon", [list(point) for point in coordinates])
+
+    def buffer(self, distance: float) -> "Geometry":
+        """Expands the points by the distance in meters."""
+
+        return Geometry(self.kind, self.coordinates, self.radius + distance)
+
+    def type(self) -> ComputedObject:  # pylint: disable=invalid-name
+        """The type of the geometry."""
+
+        return ComputedObject(lambda: self.kind, f"{self.serialize()}.type()")
+
+    def serialize(self) -> str:
+        """Returns the expression of the geometry."""
+
+        return f"{self.kind}({describe(self.coordinates)},{self.radius:g})"
+
+    def contains(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        """Checks which coordinates are inside the geometry."""
+
+        if self.kind == "Polygon":
+            return contains_in_polygon(self.coordinates, lats, lons)
+
+        inside = np.zeros(lats.shape, dtype=bool)
+        for lon, lat in self.coordinates:
+            # A point without a buffer covers its pixel
+            inside |= get_distance(lat, lon, lats, lons) <= max(self.radius, 1.0)
+        return inside
+
+    def get_sample_points(self, scale: float) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the coordinates of the pixels of the scale inside the geometry."""
+
+        if self.kind != "Polygon" and self.radius < scale:
+            points = np.array(self.coordinates, dtype=np.float64)
+            return points[:, 1], points[:, 0]
+
+        points = np.array(self.coordinates, dtype=np.float64)
+        margin = self.radius / METERS_PER_DEGREE
+        south, north = points[:, 1].min() - margin, points[:, 1].max() + margin
+        west, east = points[:, 0].min() - margin, points[:, 0].max() + margin
+
+        step = scale / METERS_PER_DEGREE
+        lats, lons = np.meshgrid(
+            np.arange(north - step / 2, south, -step),
+            np.arange(west + step / 2, east, step),
+            indexing="ij",
+        )
+        lats, lons = lats.ravel(), lons.ravel()
+        inside = self.contains(lats, lons)
+        return lats[inside], lons[inside]
+
+
+def get_distance(
+    lat: float, lon: float, lats: np.ndarray, lons: np.ndarray
+) -> np.ndarray:
+    """Returns the distances in meters from the point, on the equirectangular projection."""
+
+    dx = (lons - lon) * METERS_PER_DEGREE * math.cos(math.radians(lat))
+    dy = (lats - lat) * METERS_PER_DEGREE
+    return np.hypot(dx, dy)
+
+
+def contains_in_polygon(
+    polygon: list, lats: np.ndarray, lons: np.ndarray
+) -> np.ndarray:
+    """Checks which coordinates are inside the polygon, by the even-odd rule."""
+
+    inside = np.zeros(lats.shape, dtype=bool)
+    points = polygon + [polygon[0]]
+
+    for (lon1, lat1), (lon2, lat2) in zip(points[:-1], points[1:]):
+        crosses = (lat1 > lats) != (lat2 > lats)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossing_lon = lon1 + (lats - lat1) * (lon2 - lon1) / (lat2 - lat1)
+        inside ^= crosses & (lons < crossing_lon)
+
+    return inside
+
+
+class Reducer:
+    """A reducer of the pixels of a region."""
+
+    def __init__(self, name: str, reduce: Callable, outputs: list[str] = None):
+        self.name = name
+        self.reduce = reduce
+        self.outputs = outputs
+
+    @staticmethod
+    def first() -> "Reducer":
+        """The first unmasked pixel."""
+
+        def reduce(values: np.ndarray):
+            unmasked = values[~np.isnan(values)]
+            return unmasked[0] if unmasked.size else None
+
+        return Reducer("first", reduce)
+
+    @staticmethod
+    def mean() -> "Reducer":
+        """The mean of the unmasked pixels."""
+
+        def reduce(values: np.ndarray):
+            unmasked = values[~np.isnan(values)]
+            return unmasked.mean() if unmasked.size else None
+
+        return Reducer("mean", reduce)
+
+    def reduce_band(self, band: Band, lats: np.ndarray, lons: np.ndarray):
+        """Reduces the band at the coordinates, None if all of them are masked."""
+
+        value = self.reduce(band.sample(lats, lons))
+
+        if value is None:
+            return None
+        if band.integer and self.name == "first":
+            return int(value)
+        return float(value)
+
+    def setOutputs(  # pylint: disable=invalid-name
+        self, outputs: list[str]
+    ) -> "Reducer":
+        """Names the output of a single band."""
+
+        return Reducer(self.name, self.reduce, list(outputs))
+
+    def serialize(self) -> str:
+        """Returns the expression of the reducer."""
+
+        return f"Reducer.{self.name}({describe(self.outputs)})"
+
+
+# The fake mirrors the methods of `ee.Image` used by the app
+class Image:  # pylint: disable=too-many-public-methods
+    """A lazy multi-band image, sampling its bands at the coordinates of a reduction."""
+
+    def __init__(self, source: Union[str, float, "Image"] = None):
+        """
+        Parameters:
+            source: The identifier of an image asset, a constant or another image.
+        """
+
+        if isinstance(source, Image):
+            self._set(source.bands, source.expression, source.resolution)
+
+        elif isinstance(source, str):
+            dataset = get_datasets().get(source)
+            if not isinstance(dataset, dict):
+                raise EEException(f"Image asset '{source}' not found.")
+
+            self._set(
+                {band: raster.get_band() for band, raster in dataset.items()},
+                f"Image({json.dumps(source)})",
+                min(raster.resolution for raster in dataset.values()),
+            )
+
+        else:
+            value = 0 if source is None else source
+            self._set(
+                {
+                    "constant": Band(
+                        lambda lats, lons: np.full(lats.shape, float(value)),
+                        isinstance(value, int),
+                    )
+                },
+                f"Image({value})",
+                None,
+            )
+
+    def _set(self, bands: dict[str, Band], expression: str, resolution: float):
+        self.bands = dict(bands)
+        self.expression = expression
+        self.resolution = resolution
+
+    @classmethod
+    def create(
+        cls, bands: dict[str, Band], expression: str, resolution: float = None
+    ) -> "Image":
+        """Returns an image of its bands."""
+
+        image = cls.__new__(cls)
+        image._set(bands, expression, resolution)
+        return image
+
+    def derive(self, bands: dict[str, Band], operation: str) -> "Image":
+        """Returns the image derived from this one by the operation."""
+
+        return Image.create(bands, f"{self.expression}.{operation}", self.resolution)
+
+    def map_bands(
+        self,
+        operation: str,
+        function: Callable[[np.ndarray, np.ndarray, np.ndarray], np.ndarray],
+        integer: bool = None,
+    ) -> "Image":
+        """
+        Derives each band by the function of its values and the coordinates,
+        the bands stay integer unless `integer` is set.
+        """
+
+        def map_band(band: Band) -> Band:
+            return Band(
+                lambda lats, lons: function(band.sample(lats, lons), lats, lons),
+                band.integer if integer is None else integer,
+            )
+
+        return self.derive(
+            {name: map_band(band) for name, band in self.bands.items()}, operation
+        )
+
+    @staticmethod
+    def cat(*images: "Image") -> "Image":
+        """Combines the bands of the images."""
+
+        bands = {}
+        for image in images:
+            bands.update(image.bands)
+
+        resolutions = [image.resolution for image in images if image.resolution]
+
+        return Image.create(
+            bands,
+            f"Image.cat({describe(list(images))})",
+            min(resolutions, default=None),
+        )
+
+    def clip(self, geometry: Geometry) -> "Image":
+        """Masks the pixels outside of the geometry."""
+
+        return self.map_bands(
+            f"clip({geometry.serialize()})",
+            lambda values, lats, lons: np.where(
+                geometry.contains(lats, lons), values, np.nan
+            ),
+        )
+
+    def select(self, bands: Union[str, list], *more_bands: str) -> "Image":
+        """Keeps the bands, in their order."""
+
+        names = [bands, *more_bands] if isinstance(bands, str) else list(bands)
+
+        missing = [name for name in names if name not in self.bands]
+        if missing:
+            raise EEException(
+                f"Image.select: Band pattern '{missing[0]}' did not match any bands."
+            )
+
+        return self.derive(
+            {name: self.bands[name] for name in names}, f"select({describe(names)})"
+        )
+
+    def rename(self, names: Union[str, list], *more_names: str) -> "Image":
+        """Renames the bands, in their order."""
+
+        names = [names, *more_names] if isinstance(names, str) else list(names)
+
+        if len(names) != len(self.bands):
+            raise EEException(
+                f"Image.rename: {len(names)} names for {len(self.bands)} bands."
+            )
+
+        return self.derive(
+            dict(zip(names, self.bands.values())), f"rename({describe(names)})"
+        )
+
+    def bandNames(self) -> ComputedObject:  # pylint: disable=invalid-name
+        """The names of the bands."""
+
+        return ComputedObject(
+            lambda: list(self.bands), f"{self.expression}.bandNames()"
+        )
+
+    def compare(self, operation: str, function: Callable, other) -> "Image":
+        """1 where the function of the values and the first band of the other holds."""
+
+        if isinstance(other, Image):
+            other_sample = list(other.bands.values())[0].sample
+            argument = other.expression
+        else:
+            value = float(other)
+
+            def other_sample(lats, _lons):
+                return np.full(lats.shape, value)
+
+            argument = json.dumps(other)
+
+        def apply(values, lats, lons):
+            others = other_sample(lats, lons)
+            with np.errstate(invalid="ignore"):
+                result = function(values, others).astype(np.float64)
+            return np.where(np.isnan(values) | np.isnan(others), np.nan, result)
+
+        return self.map_bands(f"{operation}({argument})", apply, integer=True)
+
+    def gt(self, other) -> "Image":  # pylint: disable=invalid-name
+        """1 where greater than the other."""
+
+        return self.compare("gt", np.greater, other)
+
+    def gte(self, other) -> "Image":
+        """1 where greater than or equal to the other."""
+
+        return self.compare("gte", np.greater_equal, other)
+
+    def lt(self, other) -> "Image":  # pylint: disable=invalid-name
+        """1 where less than the other."""
+
+        return self.compare("lt", np.less, other)
+
+    def lte(self, other) -> "Image":
+        """1 where less than or equal to the other."""
+
+        return self.compare("lte", np.less_equal, other)
+
+    def eq(self, other) -> "Image":  # pylint: disable=invalid-name
+        """1 where equal to the other."""
+
+        return self.compare("eq", np.equal, other)
+
+    def And(self, other) -> "Image":  # pylint: disable=invalid-name
+        """1 where both are not 0."""
+
+        return self.compare("And", lambda a, b: (a != 0) & (b != 0), other)
+
+    def Or(self, other) -> "Image":  # pylint: disable=invalid-name
+        """1 where any is not 0."""
+
+        return self.compare("Or", lambda a, b: (a != 0) | (b != 0), other)
+
+    def unmask(self, value: float = 0) -> "Image":
+        """Replaces the masked pixels with the value."""
+
+        return self.map_bands(
+            f"unmask({value})",
+            lambda values, lats, lons: np.nan_to_num(values, nan=value),
+        )
+
+    def toFloat(self) -> "Image":  # pylint: disable=invalid-name
+        """Keeps the values as floats."""
+
+        return self.map_bands("toFloat()", lambda values, *_: values, integer=False)
+
+    def toInt16(self) -> "Image":  # pylint: disable=invalid-name
+        """Rounds the values."""
+
+        return self.map_bands(
+            "toInt16()", lambda values, *_: np.round(values), integer=True
+        )
+
+    def reduceRegion(  # pylint: disable=invalid-name
+        self, reducer: Reducer, geometry: Geometry, scale: float, **kwargs
+    ) -> ComputedObject:
+        """Reduces each band over the pixels of the scale inside the geometry."""
+
+        # pylint: disable=unused-argument
+        def compute():
+            lats, lons = geometry.get_sample_points(scale)
+            return {
+                name: reducer.reduce_band(band, lats, lons)
+                for name, band in self.bands.items()
+            }
+
+        return ComputedObject(
+            compute,
+            f"{self.expression}.reduceRegion({reducer.serialize()},"
+            f"{geometry.serialize()},{scale})",
+        )
+
+    def reduceRegions(  # pylint: disable=invalid-name
+        self, collection: "FeatureCollection", reducer: Reducer, scale: float
+    ) -> "FeatureCollection":
+        """Reduces the bands over each feature, adding the values to its properties."""
+
+        def reduce_feature(feature: "Feature") -> "Feature":
+            values = self.reduceRegion(reducer, feature.geometry, scale).evaluate()
+
+            if reducer.outputs and len(values) == 1:
+                values = {reducer.outputs[0]: list(values.values())[0]}
+
+            # The server leaves out the properties without a value
+            properties = {**feature.properties}
+            properties.update(
+                {name: value for name, value in values.items() if value is not None}
+            )
+            return Feature(feature.geometry, properties)
+
+        return FeatureCollection(
+            lambda: [reduce_feature(feature) for feature in collection.get_features()],
+            f"{self.expression}.reduceRegions({collection.serialize()},"
+            f"{reducer.serialize()},{scale})",
+        )
+
+    def getMapId(self, vis_params: dict = None) -> dict:  # pylint: disable=invalid-name
+        """Registers the image for its tiles."""
+
+        count_roundtrip("POST", "maps")
+
+        map_id = hashlib.sha256(
+            f"{self.expression}{describe(vis_params)}".encode("utf-8")
+        ).hexdigest()[:32]
+
+        return {
+            "mapid": map_id,
+            "token": "",
+            "tile_fetcher": types.SimpleNamespace(
+                url_format=f"{FAKE_API_URL}/maps/{map_id}/tiles/{{z}}/{{x}}/{{y}}"
+            ),
+            "image": self,
+        }
+
+    def getInfo(self) -> dict:  # pylint: disable=invalid-name
+        """Returns the description of the bands."""
+
+        count_roundtrip("POST", "value:compute")
+        return {"type": "Image", "bands": [{"id": name} for name in self.bands]}
+
+    def serialize(self) -> str:
+        """Returns the expression of the image."""
+
+        return self.expression
+
+
+class ImageCollection:
+    """A collection of images with their start dates."""
+
+    def __init__(self, source: Union[str, list], expression: str = None):
+        """
+        Parameters:
+            source: The identifier of a collection asset, or a list of (date, Image).
+        """
+
+        if isinstance(source, str):
+            dataset = get_datasets().get(source)
+            if not isinstance(dataset, list):
+                raise EEException(f"ImageCollection asset '{source}' not found.")
+
+            self.images = [
+                (
+                    start,
+                    Image.create(
+                        {band: raster.get_band() for band, raster in bands.items()},
+                        f"Image({json.dumps(source)},{json.dumps(start)})",
+                        min(raster.resolution for raster in bands.values()),
+                    ),
+                )
+                for start, bands in dataset
+            ]
+            self.expression = f"ImageCollection({json.dumps(source)})"
+        else:
+            self.images = list(source)
+            self.expression = expression
+
+    def derive(self, images: list, operation: str) -> "ImageCollection":
+        """Returns the collection derived from this one by the operation."""
+
+        return ImageCollection(images, f"{self.expression}.{operation}")
+
+    def filterDate(  # pylint: disable=invalid-name
+        self, start: str, end: str
+    ) -> "ImageCollection":
+        """Keeps the images starting in [start, end)."""
+
+        return self.derive(
+            [(day, image) for day, image in self.images if start <= day < end],
+            f"filterDate({json.dumps(start)},{json.dumps(end)})",
+        )
+
+    def filterBounds(  # pylint: disable=invalid-name
+        self, geometry: Geometry
+    ) -> "ImageCollection":
+        """Keeps all the images, the fake rasters cover the region."""
+
+        return self.derive(self.images, f"filterBounds({geometry.serialize()})")
+
+    def select(self, bands: Union[str, list], *more_bands: str) -> "ImageCollection":
+        """Keeps the bands of each image."""
+
+        return self.derive(
+            [(day, image.select(bands, *more_bands)) for day, image in self.images],
+            f"select({describe(bands)})",
+        )
+
+    def first(self) -> Image:
+        """The first image."""
+
+        if not self.images:
+            raise EEException("Collection is empty.")
+
+        image = self.images[0][1]
+        return Image.create(image.bands, f"{self.expression}.first()", image.resolution)
+
+    def reduce_images(self, operation: str, reduce: Callable) -> Image:
+        """Reduces the images pixel by pixel, ignoring their masked pixels."""
+
+        images = [image for _, image in self.images]
+        if not images:
+            return Image.create({}, f"{self.expression}.{operation}()")
+
+        def reduce_band(name: str) -> Band:
+            def sample(lats, lons):
+                stack = np.stack(
+                    [image.bands[name].sample(lats, lons) for image in images]
+                )
+                with warnings.catch_warnings():
+                    warnings.simplefilter("ignore", RuntimeWarning)
+                    values = reduce(stack, axis=0)
+                return np.where(np.isnan(stack).all(axis=0), np.nan, values)
+
+            return Band(sample)
+
+        return Image.create(
+            {name: reduce_band(name) for name in images[0].bands},
+            f"{self.expression}.{operation}()",
+            images[0].resolution,
+        )
+
+    def mean(self) -> Image:
+        """The mean of the images."""
+
+        return self.reduce_images("mean", np.nanmean)
+
+    def sum(self) -> Image:
+        """The sum of the images."""
+
+        return self.reduce_images("sum", np.nansum)
+
+
+class Terrain:  # pylint: disable=too-few-public-methods
+    """The terrain algorithms."""
+
+    @staticmethod
+    def slope(image: Image) -> Image:
+        """The slope in degrees of the first band, from its neighbouring pixels."""
+
+        sample = list(image.bands.values())[0].sample
+        step = SLOPE_STEP_METERS / METERS_PER_DEGREE
+
+        def sample_slope(lats, lons):
+            north, south = sample(lats + step, lons), sample(lats - step, lons)
+            east, west = sample(lats, lons + step), sample(lats, lons - step)
+
+            dy = (north - south) / (2 * step * METERS_PER_DEGREE)
+            dx = (east - west) / (
+                2 * step * METERS_PER_DEGREE * np.cos(np.radians(lats))
+            )
+            return np.degrees(np.arctan(np.hypot(dx, dy)))
+
+        return Image.create(
+            {"slope": Band(sample_slope)},
+            f"Terrain.slope({image.expression})",
+            image.resolution,
+        )
+
+
+class Feature:  # pylint: disable=too-few-public-methods
+    """A geometry with its properties."""
+
+    def __init__(self, geometry: Geometry, properties: dict = None):
+        self.geometry = geometry
+        self.properties = dict(properties or {})
+
+    def serialize(self) -> str:
+        """Returns the expression of the feature."""
+
+        return f"Feature({self.geometry.serialize()},{describe(self.properties)})"
+
+
+class FeatureCollection(ComputedObject):
+    """A collection of features, computed by `getInfo`."""
+
+    def __init__(self, features: Union[list, Callable], expression: str = None):
+        if callable(features):
+            self.get_features = features
+        else:
+            features = list(features)
+            self.get_features = lambda: features
+            expression = (
+                f"FeatureCollection([{','.join(f.serialize() for f in features)}])"
+            )
+
+        super().__init__(self.compute, expression)
+
+    def compute(self) -> dict:
+        """Returns the features like the server."""
+
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": {
+                        "type": feature.geometry.kind,
+                        "coordinates": feature.geometry.coordinates,
+                    },
+                    "properties": feature.properties,
+                }
+                for feature in self.get_features()
+            ],
+        }
+
+    def select(  # pylint: disable=invalid-name
+        self, properties: list, new_properties: list = None, retain_geometry=True
+    ) -> "FeatureCollection":
+        """Keeps the properties of the features, and their geometries."""
+
+        # pylint: disable=unused-argument
+        def select_features():
+            return [
+                Feature(
+                    feature.geometry,
+                    {
+                        key: value
+                        for key, value in feature.properties.items()
+                        if key in properties
+                    },
+                )
+                for feature in self.get_features()
+            ]
+
+        return FeatureCollection(
+            select_features, f"{self.serialize()}.select({describe(properties)})"
+        )
+
+
+def Initialize(_credentials=None, **_kwargs):  # pylint: disable=invalid-name
+    """Initializes nothing, the fake server needs no credentials."""
+
+
+def ServiceAccountCredentials(  # pylint: disable=invalid-name
+    email: str, key_file: str = None
+):
+    """Returns credentials without a key."""
+
+    # pylint: disable=unused-argument
+    return mock.Mock(valid=True, expiry=None, service_account_email=email)
+
+
+_STATE = types.SimpleNamespace(requests_session=requests.Session(), initialized=True)
+
+# The state of earthengine-api 1.x, the locked 0.1.416 has no `ee.data._get_state`,
+# it only exists for the compatibility shim, see `get_ee_requests_session`
+data = types.SimpleNamespace(_get_state=lambda: _STATE)
+
+
+def get_app_modules() -> Iterator[types.ModuleType]:
+    """Returns the loaded modules of the app importing `ee`, under both of their names."""
+
+    real_ee = sys.modules["ee"]
+
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None) or ""
+        if path.startswith(APP_PATH) and getattr(module, "ee", None) is real_ee:
+            yield module
+
+
+@contextmanager
+def use_fake_ee() -> Iterator[types.ModuleType]:
+    """
+    Replaces the `ee` module of the loaded app modules with this fake.
+
+    Yields:
+        The fake module.
+    """
+
+    fake_ee = sys.modules[__name__]
+
+    with ExitStack() as stack:
+        for module in get_app_modules():
+            stack.enter_context(mock.patch.object(module, "ee", fake_ee))
+        yield fake_ee
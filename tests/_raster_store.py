@@ -0,0 +1,74 @@
+"""
+This module creates the local raster stores of the tests, without the network.
+"""
+
+# Python
+import unittest
+
+# Third party
+import numpy as np
+
+# App
+from app.config import ROI
+from app.stages.data_acquisition.local_raster import (
+    LayerSpec,
+    create_layer,
+    write_chunk,
+)
+from app.stages.data_acquisition.point import POINT_SAMPLING
+from tests._setup import create_temporary_directory
+
+# The constant value of each layer of the store
+STORE_VALUES = {
+    "elevation": 300.0,
+    "slope": 2.5,
+    "soil_moisture": 0.25,
+    "precipitation": 450.0,
+    "soil_organic_carbon": 12.0,
+    "world_cover_code": 30,
+}
+
+
+def create_raster_store(
+    test_case: unittest.TestCase,
+    bounds: list[float],
+    chunk_size: int,
+    no_data_columns: int = 1,
+) -> str:
+    """
+    Creates a store of constant layers in a temporary directory,
+    removed at the end of the test.
+
+    Parameters:
+        test_case (unittest.TestCase): The test owning the directory.
+        bounds (list[float]): The west, south, east and north bounds of the layers.
+        chunk_size (int): The side of the chunks in pixels.
+        no_data_columns (int): The columns without data at the west edge.
+
+    Returns:
+        str: The path of the store.
+    """
+
+    directory = create_temporary_directory(test_case)
+
+    for key, value in STORE_VALUES.items():
+        period_name = POINT_SAMPLING[key].get("period")
+        is_code = key == "world_cover_code"
+
+        layer = create_layer(
+            directory,
+            key,
+            LayerSpec(
+                bounds=tuple(bounds),
+                resolution=0.5,
+                chunk_size=chunk_size,
+                dtype="int16" if is_code else "float32",
+                no_data=-1 if is_code else -9999,
+                period=ROI["periods"][period_name] if period_name else None,
+            ),
+        )
+        raster = np.full((layer.height, layer.width), value)
+        raster[:, :no_data_columns] = layer.spec.no_data
+        write_chunk(layer, 0, 0, raster)
+
+    return directory
@@ -4,7 +4,9 @@ This module contains the setup functions for the tests.
 
 # Python
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 
 # Third-party
@@ -35,6 +37,15 @@ def setup_import_paths():
     sys.path.append(os.path.abspath(app_dir))
 
 
+def create_temporary_directory(test_case: unittest.TestCase) -> str:
+    """Creates a temporary directory, removed at the end of the test."""
+
+    path = tempfile.mkdtemp()
+    test_case.addCleanup(shutil.rmtree, path, ignore_errors=True)
+
+    return path
+
+
 class BaseTestCase(unittest.TestCase):
     """Base test case for all tests."""
 
@@ -0,0 +1,145 @@
+"""
+The module tests the data acquisition of many points at once.
+"""
+
+# Python
+import threading
+import time
+import unittest
+from unittest import mock
+
+# Test
+from tests._raster_store import STORE_VALUES, create_raster_store
+
+# App
+from app.config import ROI
+from app.stages.data_acquisition.batch import (
+    get_map_points_data,
+    merge_map_points_data,
+    read_points_samples,
+)
+from app.stages.data_acquisition.point import POINT_SAMPLING
+
+BATCH_MODULE = "app.stages.data_acquisition.batch"
+
+
+class TestBatchPointsData(unittest.TestCase):
+    """Test the chunks of the points sampled from the local raster store."""
+
+    periods = ROI["periods"]
+
+    values = STORE_VALUES
+
+    def setUp(self):
+        """Create a store of constant layers, without data west of 0 longitude."""
+
+        path = create_raster_store(
+            self, bounds=[-1.0, 10.0, 1.0, 11.0], chunk_size=4, no_data_columns=2
+        )
+
+        for patch in [
+            mock.patch(f"{BATCH_MODULE}.POINT_DATA_BACKEND", "local"),
+            mock.patch.dict(
+                "app.stages.data_acquisition.point.LOCAL_RASTERS", {"path": path}
+            ),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_chunks_are_columnar(self):
+        """Test that the points are sampled in chunks of columns."""
+
+        lats = [10.5] * 5
+        lons = [0.5, -0.5, 0.5, -0.5, 0.5]
+
+        chunks = list(get_map_points_data(lats, lons, self.periods, chunk_size=2))
+
+        self.assertEqual(sorted(len(chunk["index"]) for chunk in chunks), [1, 2, 2])
+
+        columns = merge_map_points_data(chunks)
+
+        self.assertEqual(columns["index"], [0, 1, 2, 3, 4])
+        self.assertEqual(columns["lon"], lons)
+        self.assertEqual(
+            set(columns),
+            {"index", "lat", "lon", "afforestation_validation", *POINT_SAMPLING},
+        )
+
+    def test_same_values_as_single_point(self):
+        """Test the no-data values and the evaluation of the single point."""
+
+        columns = merge_map_points_data(
+            get_map_points_data([10.5, 10.5], [0.5, -0.5], self.periods)
+        )
+
+        for key, value in self.values.items():
+            self.assertEqual(columns[key], [value, POINT_SAMPLING[key]["no_data"]])
+
+        self.assertEqual(columns["afforestation_validation"], [True, False])
+
+    def test_invalid_points(self):
+        """Test that the points are validated before any request."""
+
+        with self.assertRaises(ValueError):
+            list(get_map_points_data([10.5], [0.5, 0.5], self.periods))
+
+        with self.assertRaises(ValueError):
+            list(get_map_points_data([100.0], [0.5], self.periods))
+
+
+class TestBatchStreaming(unittest.TestCase):
+    """Test that the chunks are requested concurrently and streamed back."""
+
+    def test_chunks_in_flight_are_bounded(self):
+        """Test that a batch does not take all the workers of the shared executor."""
+
+        running = {"now": 0, "max": 0}
+        lock = threading.Lock()
+
+        def get_chunk(start, lats, _lons, _periods):
+            with lock:
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+
+            time.sleep(0.05)
+
+            with lock:
+                running["now"] -= 1
+
+            return {"index": list(range(start, start + len(lats)))}
+
+        with mock.patch(f"{BATCH_MODULE}.get_points_chunk_data", get_chunk):
+            with mock.patch.dict(
+                f"{BATCH_MODULE}.BATCH_POINTS", {"max_chunks_in_flight": 2}
+            ):
+                chunks = list(
+                    get_map_points_data([10.5] * 10, [0.5] * 10, {}, chunk_size=1)
+                )
+
+        self.assertEqual(len(chunks), 10)
+        self.assertEqual(running["max"], 2)
+
+    def test_server_samples_are_read(self):
+        """Test that the missing values of the server get the no-data values."""
+
+        samples = {
+            "type": "FeatureCollection",
+            "features": [
+                {
+                    "type": "Feature",
+                    "geometry": None,
+                    "properties": {"index": 1, "elevation": 250, "slope": None},
+                },
+                {
+                    "type": "Feature",
+                    "geometry": None,
+                    "properties": {"index": 0, "world_cover": 60},
+                },
+            ],
+        }
+
+        values = read_points_samples(samples, 2)
+
+        self.assertEqual(values["elevation"], [-1, 250])
+        self.assertEqual(values["slope"], [0, 0])
+        self.assertEqual(values["world_cover_code"], [60, -1])
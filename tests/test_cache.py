@@ -0,0 +1,222 @@
+"""
+The module tests the on-disk cache of the app.
+"""
+
+# Python
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+# App
+from app.cache import PersistentCache, quantize_coordinates
+from app.config import ROI, SIZE_SAMPLE_METERS
+from app.stages.data_acquisition.point import (
+    get_map_point_layers,
+    get_point_cache_key,
+    POINT_SAMPLING,
+)
+from tests._setup import create_temporary_directory
+
+
+class TestPersistentCache(unittest.TestCase):
+    """Test the SQLite cache with the least recently used eviction."""
+
+    def setUp(self):
+        """Create a cache in a temporary directory."""
+
+        directory = create_temporary_directory(self)
+        self.path = os.path.join(directory, "cache.sqlite3")
+        self.cache = PersistentCache(self.path, max_entries=3)
+
+    def test_set_and_get(self):
+        """Test that the stored values are returned."""
+
+        self.cache.set("elevation", 312.5)
+        self.cache.set_many({"address": "Niamey", "cover": 30})
+
+        self.assertEqual(self.cache.get("elevation"), 312.5)
+        self.assertEqual(
+            self.cache.get_many(["address", "cover", "missing"]),
+            {"address": "Niamey", "cover": 30},
+        )
+        self.assertIsNone(self.cache.get("missing"))
+
+    def test_values_persist_on_disk(self):
+        """Test that the values are available after reopening the file."""
+
+        self.cache.set("elevation", 312.5)
+
+        reopened = PersistentCache(self.path, max_entries=3)
+
+        self.assertEqual(reopened.get("elevation"), 312.5)
+
+    def test_expired_values_are_missing(self):
+        """Test that the values expire after their time to live."""
+
+        self.cache.set("precipitation", 450, ttl=0.05)
+        self.cache.set("elevation", 312.5, ttl=None)
+
+        time.sleep(0.1)
+
+        self.assertIsNone(self.cache.get("precipitation"))
+        self.assertEqual(self.cache.get("elevation"), 312.5)
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that the cache keeps its size by evicting the least recently used."""
+
+        for key in ["a", "b", "c"]:
+            self.cache.set(key, key)
+            time.sleep(0.01)
+
+        self.cache.get("a")  # "b" becomes the least recently used
+        self.cache.set("d", "d")
+
+        self.assertEqual(len(self.cache), 3)
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(
+            self.cache.get_many(["a", "c", "d"]), {"a": "a", "c": "c", "d": "d"}
+        )
+
+    def test_count_of_the_entries(self):
+        """Test that the replaced, expired, evicted and reopened entries are counted."""
+
+        self.cache.set_many({"a": 1, "b": 2})
+        self.cache.set_many({"b": 3, "c": 4})
+        self.assertEqual(len(self.cache), 3)
+
+        self.cache.set("d", 5, ttl=0.05)
+        self.assertEqual(len(self.cache), 3)
+
+        time.sleep(0.1)
+        self.cache.get("d")
+        self.assertEqual(len(self.cache), 2)
+
+        reopened = PersistentCache(self.path, max_entries=3)
+        self.assertEqual(len(reopened), 2)
+
+        self.cache.clear()
+        self.assertEqual(len(self.cache), 0)
+
+    def test_entries_of_other_processes_are_evicted(self):
+        """Test that the limit holds for the processes sharing the file."""
+
+        other = PersistentCache(self.path, max_entries=3)
+
+        self.cache.set_many({"a": 1, "b": 2})
+        time.sleep(0.01)
+        other.set_many({"c": 3, "d": 4})
+
+        self.assertEqual(len(self.cache), 3)
+        self.assertIsNone(self.cache.get("a"))
+
+    def test_concurrent_threads(self):
+        """Test that many threads can use the same cache."""
+
+        cache = PersistentCache(self.path, max_entries=1000)
+        errors = []
+
+        def worker(index: int):
+            try:
+                for i in range(50):
+                    cache.set(f"{index}-{i}", i)
+                    self.assertEqual(cache.get(f"{index}-{i}"), i)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(cache), 400)
+
+
+class TestPointCache(unittest.TestCase):
+    """Test the cache of the values sampled at the points."""
+
+    periods = ROI["periods"]
+
+    values = {
+        "elevation": 300,
+        "slope": 2.5,
+        "soil_moisture": 0.25,
+        "precipitation": 450,
+        "soil_organic_carbon": 12,
+        "world_cover_code": 30,
+    }
+
+    def setUp(self):
+        """Replace the cache of the app with a temporary one."""
+
+        self.cache = PersistentCache(":memory:", max_entries=100)
+
+        point_module = "app.stages.data_acquisition.point"
+
+        self.fetch_point_layers = self._patch(
+            f"{point_module}.fetch_point_layers",
+            side_effect=lambda _, __, keys: dict.fromkeys(keys),
+        )
+        self._patch(f"{point_module}.get_point_cache", return_value=self.cache)
+        self._patch(f"{point_module}.ee")
+        self._patch(
+            f"{point_module}.sample_point_layers",
+            side_effect=lambda _, layers: {key: self.values[key] for key in layers},
+        )
+
+    def _patch(self, target: str, **kwargs) -> mock.MagicMock:
+        """Patch the target for the duration of the test."""
+
+        patch = mock.patch(target, **kwargs)
+        self.addCleanup(patch.stop)
+        return patch.start()
+
+    def test_quantize_coordinates(self):
+        """Test that the points in the same sample cell share the cell."""
+
+        cell = quantize_coordinates(14.0, 2.0, SIZE_SAMPLE_METERS)
+
+        self.assertEqual(
+            quantize_coordinates(14.0001, 2.0001, SIZE_SAMPLE_METERS), cell
+        )
+        self.assertNotEqual(quantize_coordinates(14.01, 2.0, SIZE_SAMPLE_METERS), cell)
+
+    def test_time_windowed_layers_key_on_period(self):
+        """Test that the time-windowed layers are cached per period."""
+
+        other_periods = {
+            **self.periods,
+            "precipitation": {"start_date": "2022-01-01", "end_date": "2022-12-31"},
+        }
+
+        for key in POINT_SAMPLING:
+            same_key = get_point_cache_key(
+                14.0, 2.0, key, self.periods
+            ) == get_point_cache_key(14.0, 2.0, key, other_periods)
+
+            self.assertEqual(same_key, key != "precipitation")
+
+    def test_cached_point_is_not_sampled_again(self):
+        """Test that the second click in the same cell is served from the cache."""
+
+        first = get_map_point_layers(14.0, 2.0, self.periods)
+        second = get_map_point_layers(14.0001, 2.0001, self.periods)
+
+        self.assertEqual(first, self.values)
+        self.assertEqual(second, self.values)
+        self.assertEqual(self.fetch_point_layers.call_count, 1)
+
+    def test_only_missing_layers_are_sampled(self):
+        """Test that only the layers missing in the cache are sampled."""
+
+        get_map_point_layers(14.0, 2.0, self.periods, ["elevation", "slope"])
+        get_map_point_layers(14.0, 2.0, self.periods)
+
+        sampled_keys = self.fetch_point_layers.call_args.args[2]
+
+        self.assertNotIn("elevation", sampled_keys)
+        self.assertNotIn("slope", sampled_keys)
+        self.assertEqual(len(sampled_keys), len(POINT_SAMPLING) - 2)
@@ -0,0 +1,167 @@
+"""
+The module tests the recording and the replay of the traffic, without the network.
+"""
+
+# Python
+import os
+import time
+import unittest
+from unittest import mock
+
+# Third party
+import ee
+import requests
+from ee import _cloud_api_utils
+
+# Test
+from tests._setup import create_temporary_directory
+from tests.test_metrics import FakeAdapter
+
+# App
+from app.cassette import Cassette, CassetteAdapter, CassetteMiss, use_cassette
+
+COMPUTE_URL = (
+    "https://earthengine.googleapis.com/v1/projects/earthengine-legacy/value:compute"
+)
+GEOCODING_URL = "https://nominatim.openstreetmap.org/reverse"
+
+
+class SlowAdapter(FakeAdapter):
+    """Responds like `FakeAdapter`, after a delay."""
+
+    delay = 0.05  # seconds
+
+    def send(self, request, **kwargs):
+        time.sleep(self.delay)
+        return super().send(request, **kwargs)
+
+
+def create_session(adapter: requests.adapters.BaseAdapter) -> requests.Session:
+    """Returns a session sending all the requests through the adapter."""
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    return session
+
+
+class TestCassette(unittest.TestCase):
+    """Test that the recorded exchanges are replayed offline."""
+
+    def setUp(self):
+        """Record a computation and a geocoding through a slow fake server."""
+
+        directory = create_temporary_directory(self)
+        self.path = os.path.join(directory, "cassettes", "traffic.json.gz")
+
+        self.cassette = Cassette("afforestation-tracker")
+        recording = create_session(
+            CassetteAdapter(self.cassette, "record", adapter=SlowAdapter(b'{"a": 1}'))
+        )
+
+        # pylint: disable-next=protected-access
+        transport = _cloud_api_utils._Http(recording)
+        transport.request(COMPUTE_URL, method="POST", body='{"expression": 1}')
+        recording.get(
+            GEOCODING_URL, params={"lat": 13.5, "lon": 2.1, "key": "secret"}, timeout=5
+        )
+
+        self.cassette.save(self.path)
+
+    def replay(self, latency: float = 0.0) -> requests.Session:
+        """Returns a session replaying the saved cassette."""
+
+        return create_session(
+            CassetteAdapter(Cassette.load(self.path), "replay", latency)
+        )
+
+    def test_exchanges_are_replayed(self):
+        """Test that the responses are served from the file, with their timings."""
+
+        session = self.replay()
+
+        response = session.post(COMPUTE_URL, data='{"expression": 1}', timeout=5)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"a": 1})
+
+        cassette = Cassette.load(self.path)
+        exchange = cassette.play(
+            Cassette.get_key("POST", COMPUTE_URL, '{"expression": 1}')
+        )
+
+        self.assertGreaterEqual(exchange["seconds"], SlowAdapter.delay)
+        self.assertEqual(cassette.project, "afforestation-tracker")
+        self.assertEqual(len(cassette), 2)
+
+    def test_keys_ignore_the_order_of_the_query_and_the_api_key(self):
+        """Test that the same request is matched with another order or key."""
+
+        session = self.replay()
+
+        response = session.get(
+            GEOCODING_URL, params={"key": "other", "lon": 2.1, "lat": 13.5}, timeout=5
+        )
+
+        self.assertEqual(response.content, b'{"a": 1}')
+
+    def test_unrecorded_request_fails(self):
+        """Test that a request missing from the cassette is not sent."""
+
+        session = self.replay()
+
+        with self.assertRaises(CassetteMiss):
+            session.post(COMPUTE_URL, data='{"expression": 2}', timeout=5)
+
+    def test_latency_injection(self):
+        """Test that the replay waits for the recorded latency, if asked."""
+
+        session = self.replay(latency=1.0)
+
+        start = time.perf_counter()
+        session.post(COMPUTE_URL, data='{"expression": 1}', timeout=5)
+        elapsed = time.perf_counter() - start
+
+        self.assertGreaterEqual(elapsed, SlowAdapter.delay * 0.9)
+
+        start = time.perf_counter()
+        self.replay().post(COMPUTE_URL, data='{"expression": 1}', timeout=5)
+
+        self.assertLess(time.perf_counter() - start, SlowAdapter.delay)
+
+    def test_binary_bodies(self):
+        """Test that a binary body, e.g. a tile, is stored in base64."""
+
+        cassette = Cassette()
+        session = create_session(
+            CassetteAdapter(cassette, "record", adapter=FakeAdapter(b"\x89PNG\xff"))
+        )
+        session.get(f"{COMPUTE_URL}/tiles/3/4/5", timeout=5)
+        cassette.save(self.path)
+
+        session = create_session(CassetteAdapter(Cassette.load(self.path), "replay"))
+
+        self.assertEqual(
+            session.get(f"{COMPUTE_URL}/tiles/3/4/5", timeout=5).content,
+            b"\x89PNG\xff",
+        )
+
+    def test_recording_on_the_earth_engine_client(self):
+        """Test that the session and the project of the locked client are recorded."""
+
+        # The earthengine-api of Pipfile.lock keeps them in the globals of `ee.data`
+        session = requests.Session()
+        patches = [
+            mock.patch.object(ee.data, "_requests_session", session, create=True),
+            mock.patch.object(
+                ee.data, "_cloud_api_user_project", "afforestation-tracker", create=True
+            ),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        with use_cassette(self.path, "record"):
+            self.assertIsInstance(session.get_adapter(COMPUTE_URL), CassetteAdapter)
+
+        self.assertNotIsInstance(session.get_adapter(COMPUTE_URL), CassetteAdapter)
+        self.assertEqual(Cassette.load(self.path).project, "afforestation-tracker")
@@ -7,6 +7,7 @@ and fetching afforestation candidates for a specific region.
 from contextlib import contextmanager
 import time
 from typing import List
+import unittest
 
 # Test
 from tests._types import PeriodsDict, Period
@@ -24,6 +25,7 @@ from app.stages.data_acquisition.gee_server import WORLD_COVER_ESA_CODES
 
 # Third-party
 import ee
+import numpy as np
 
 
 class TestCandidateForAfforestation(BaseTestCase):
@@ -133,3 +135,52 @@ class TestCandidateForAfforestation(BaseTestCase):
             self.fail(f"Invalid ROI coordinates: {str(e)}")
         except RuntimeError as e:
             self.fail(f"Runtime error during fetching candidates: {str(e)}")
+
+
+class TestVectorizedEvaluation(unittest.TestCase):
+    """
+    Test that the NumPy arrays are evaluated like the scalar values, point by point.
+    """
+
+    grassland = WORLD_COVER_ESA_CODES["Grassland"]
+    tree_cover = WORLD_COVER_ESA_CODES["Tree Cover"]
+    no_data = WORLD_COVER_ESA_CODES["No data / Ocean"]
+
+    # slope, precipitation, soil moisture, world cover
+    points = [
+        (15, 200, 0.2, grassland),  # at the thresholds
+        (16, 200, 0.2, grassland),  # too steep
+        (0, -1, 0.3, grassland),  # no precipitation data, moist soil
+        (0, 250, -1, grassland),  # no soil moisture data, rainy
+        (0, -1, -1, grassland),  # no hydration data
+        (0, 300, 0.3, tree_cover),  # covered already
+        (0, 300, 0.3, no_data),  # no world cover data
+    ]
+
+    def test_same_as_scalars(self):
+        """Test that each point has the same evaluation as with scalar values."""
+
+        slope, precipitation, soil_moisture, world_cover = map(
+            np.array, zip(*self.points)
+        )
+
+        result = evaluate_afforestation_candidates(
+            slope, precipitation, soil_moisture, world_cover
+        )
+
+        self.assertEqual(result.dtype, bool)
+        self.assertEqual(
+            result.tolist(),
+            [evaluate_afforestation_candidates(*point) for point in self.points],
+        )
+        self.assertEqual(
+            result.tolist(), [True, False, True, True, False, False, False]
+        )
+
+    def test_invalid_world_cover(self):
+        """Test that the unknown world cover codes are rejected like a scalar value."""
+
+        with self.assertRaises(RuntimeError):
+            evaluate_afforestation_candidates(
+                np.zeros(2), np.zeros(2), np.zeros(2), np.array([self.grassland, 404])
+            )
@@ -3,22 +3,30 @@ The module contains the tests for the connection to Google Earth Engine.
 """
 
 # Python
+from datetime import datetime, timedelta
 import json
 import os
+import unittest
+from unittest import mock
 
 # Third party
 from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.backends import default_backend
+import ee
+from google.auth.exceptions import RefreshError
 
 # Test
 from tests._setup import BaseTestCase
 
 # App:
+from app.stages import server_connection
 from app.stages.server_connection import (
     get_environment_variables,
     establish_connection,
 )
 
+CONNECTION_MODULE = "app.stages.server_connection"
+
 
 class TestConnectionToGoogleEarthEngine(BaseTestCase):
     """
@@ -92,3 +100,138 @@ class TestConnectionToGoogleEarthEngine(BaseTestCase):
             return True
         except ValueError:
             return False
+
+
+class TestEarthEngineSession(unittest.TestCase):
+    """Test the process-wide Earth Engine session, without the network."""
+
+    def setUp(self):
+        """Start each test from a process without a session or its monitor."""
+
+        patch = mock.patch.dict(
+            f"{CONNECTION_MODULE}._SESSION", {"credentials": None, "monitor": None}
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        self.connect = self._patch("connect")
+        self.thread = self._patch("threading.Thread")
+        self.probe = self._patch("probe_connection")
+        self._patch("google.auth.transport.requests.Request")
+
+        self.credentials = self.connect.return_value
+        self.credentials.valid = True
+        self.credentials.expiry = datetime.utcnow() + timedelta(hours=1)
+
+    def _patch(self, name: str) -> mock.MagicMock:
+        """Patch the attribute of the connection module for the duration of the test."""
+
+        patch = mock.patch(f"{CONNECTION_MODULE}.{name}")
+        self.addCleanup(patch.stop)
+        return patch.start()
+
+    def test_initialized_once(self):
+        """Test that the reruns reuse the session and its monitor."""
+
+        for _ in range(3):
+            self.assertTrue(server_connection.ensure_connection())
+
+        self.connect.assert_called_once()
+        self.thread.return_value.start.assert_called_once()
+
+    def test_failed_initialization_is_retried(self):
+        """Test that a failed initialization is not cached."""
+
+        self.connect.side_effect = [RuntimeError("No credentials"), self.credentials]
+
+        with self.assertRaises(RuntimeError):
+            server_connection.ensure_connection()
+        server_connection.ensure_connection()
+
+        self.assertEqual(self.connect.call_count, 2)
+
+    def test_token_refreshed_before_expiry(self):
+        """Test that only a token close to its expiry is refreshed."""
+
+        server_connection.ensure_connection()
+
+        server_connection.check_connection()
+        self.credentials.refresh.assert_not_called()
+
+        self.credentials.expiry = datetime.utcnow() + timedelta(minutes=5)
+        server_connection.check_connection()
+
+        self.credentials.refresh.assert_called_once()
+        self.connect.assert_called_once()
+        self.assertEqual(self.probe.call_count, 2)
+
+    def test_reconnect_on_auth_error(self):
+        """Test that the session is initialized again when the credentials are rejected."""
+
+        server_connection.ensure_connection()
+
+        for error in [
+            RefreshError("invalid_grant: Invalid JWT Signature."),
+            ee.EEException("Request had invalid authentication credentials."),
+        ]:
+            self.probe.side_effect = error
+            server_connection.check_connection()
+
+        self.assertEqual(self.connect.call_count, 3)
+
+    def test_no_reconnect_on_other_errors(self):
+        """Test that the network and server errors keep the session."""
+
+        server_connection.ensure_connection()
+
+        for error in [
+            ConnectionError("Connection reset by peer"),
+            ee.EEException("Too many concurrent aggregations."),
+        ]:
+            self.probe.side_effect = error
+            server_connection.check_connection()
+
+        self.connect.assert_called_once()
+
+
+class TestEarthEngineInitialization(unittest.TestCase):
+    """Test the initialization on the locked earthengine-api, without the network."""
+
+    def setUp(self):
+        """Replace the credentials and the initialization of the client."""
+
+        for patch in [
+            mock.patch(f"{CONNECTION_MODULE}.ee.ServiceAccountCredentials"),
+            mock.patch(f"{CONNECTION_MODULE}.ee.Initialize"),
+            mock.patch(f"{CONNECTION_MODULE}.install_roundtrip_counter"),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_requests_session_of_the_client(self):
+        """Test that the session is found on the client without `_get_state`."""
+
+        # pylint: disable=protected-access
+        session = mock.Mock()
+
+        with mock.patch.object(ee.data, "_requests_session", session, create=True):
+            self.assertIs(server_connection.get_ee_requests_session(), session)
+
+        state = mock.Mock(requests_session=session)
+        with mock.patch.object(
+            ee.data, "_get_state", return_value=state, create=True
+        ):
+            self.assertIs(server_connection.get_ee_requests_session(), session)
+
+    def test_failed_instrumentation_keeps_the_connection(self):
+        """Test that the client is initialized even if its requests cannot be counted."""
+
+        with mock.patch(
+            f"{CONNECTION_MODULE}.instrument_session",
+            side_effect=AttributeError("no session"),
+        ), self.assertLogs(level="WARNING"):
+            credentials = server_connection.initialize_earth_engine(
+                "app@project.iam.gserviceaccount.com", "key.json"
+            )
+
+        self.assertIsNotNone(credentials)
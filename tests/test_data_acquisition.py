@@ -3,8 +3,11 @@ The module tests the data acquisition stage of the app.
 """
 
 #  Python
+import asyncio
 from contextlib import contextmanager
+import threading
 import unittest
+from unittest import mock
 import time
 from typing import List, Tuple
 
@@ -18,6 +21,8 @@ import ee
 import requests
 
 # App
+from app.cache import PersistentCache
+from app.concurrency import TokenBucket
 from app.stages.server_connection import establish_connection
 from app.config import GEE_MAP_COLLECTIONS
 from app.stages.data_acquisition.point import (
@@ -28,6 +33,9 @@ from app.stages.data_acquisition.point import (
     get_slope_point,
     get_world_cover_point,
     get_address_from_point,
+    get_map_point_data,
+    aget_map_point_data,
+    POINT_SAMPLING,
 )
 from app.stages.data_acquisition.region import (
     get_rootzone_soil_moisture_region,
@@ -39,6 +47,7 @@ from app.stages.data_acquisition.region import (
     get_satellite_imagery_region,
 )
 from app.stages.data_acquisition.region import calculate_center
+from app.stages.data_acquisition import geocoding
 from app.config import ROI
 
 
@@ -118,10 +127,20 @@ class TestGetPointData(unittest.TestCase):
         establish_connection()
 
     def setUp(self):
-        """Await connection to Google Earth Engine before each test to not overload the server."""
+        """
+        Await connection to Google Earth Engine before each test to not overload the server,
+        and sample the points without the on-disk cache of the app.
+        """
 
         time.sleep(PAUSE["short"])
 
+        patch = mock.patch(
+            "app.stages.data_acquisition.point.get_point_cache",
+            return_value=PersistentCache(":memory:", max_entries=100),
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+
     @contextmanager
     def _handle_specific_exceptions(self, action_description):
         """Handle specific exceptions that may occur during the test."""
@@ -197,6 +216,21 @@ class TestGetPointData(unittest.TestCase):
             self.assertIsNotNone(world_cover)
             self.assertIsInstance(world_cover, (str, int))
 
+    def test_get_map_point_data(self):
+        """Test that all the layers of the point are fetched successfully at once."""
+
+        coords = self.coords
+
+        with self._handle_specific_exceptions("fetching map point data"):
+            data = get_map_point_data(*coords, self.periods)
+
+            for key in POINT_SAMPLING:
+                self.assertIn(key, data)
+                self.assertIsInstance(data[key], (float, int))
+
+            self.assertIsInstance(data["address"], str)
+            self.assertIsInstance(data["afforestation_validation"], bool)
+
     def test_get_address_from_point(self):
         """
         Test that the address is fetched successfully from the coordinates.
@@ -226,6 +260,176 @@ class TestGetPointData(unittest.TestCase):
             self.fail(f"An unexpected error occurred: {str(e)}")
 
 
+class TestAsyncPointData(unittest.TestCase):
+    """Test the concurrent acquisition of the point data."""
+
+    coords: Tuple[float, float] = calculate_center(ROI["roi_coords"])
+
+    delay = 0.3  # seconds of each simulated server call
+
+    layers = {
+        "elevation": 300,
+        "slope": 2.5,
+        "soil_moisture": 0.25,
+        "precipitation": 450,
+        "soil_organic_carbon": 12,
+        "world_cover_code": 30,
+    }
+
+    def _get_map_point_layers(self, *_):
+        time.sleep(self.delay)
+        return dict(self.layers)
+
+    async def _aget_address_from_point(self, *_):
+        await asyncio.sleep(self.delay)
+        return "Sahel"
+
+    def test_aget_map_point_data_runs_calls_concurrently(self):
+        """Test that the point takes about as long as the slowest call."""
+
+        point_module = "app.stages.data_acquisition.point"
+
+        with mock.patch(
+            f"{point_module}.get_map_point_layers", self._get_map_point_layers
+        ), mock.patch(
+            f"{point_module}.aget_address_from_point", self._aget_address_from_point
+        ):
+            start = time.perf_counter()
+            data = asyncio.run(aget_map_point_data(*self.coords, ROI["periods"]))
+            elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, self.delay * 2)
+        self.assertEqual(data["address"], "Sahel")
+        self.assertEqual(data["world_cover_code"], 30)
+        self.assertTrue(data["afforestation_validation"])
+
+
+class TestGeocodingClient(unittest.TestCase):
+    """Test the shared client of the reverse geocoding API without the network."""
+
+    coords: Tuple[float, float] = (13.5116, 2.1254)
+
+    delay = 0.2  # seconds of each simulated request
+
+    def setUp(self):
+        """Replace the session and the on-disk cache of the client."""
+
+        geocoding.clear_addresses()
+        self.addCleanup(geocoding.clear_addresses)
+
+        self.status_code = 200
+        self.session = mock.Mock()
+        self.session.get.side_effect = self._get
+
+        address_cache = PersistentCache(":memory:", max_entries=100)
+        rate_limiter = TokenBucket(rate=1000, capacity=1000)
+
+        for patch in [
+            mock.patch.object(geocoding, "get_session", return_value=self.session),
+            mock.patch.object(
+                geocoding, "get_address_cache", return_value=address_cache
+            ),
+            mock.patch.object(geocoding, "_RATE_LIMITER", rate_limiter),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def _get(self, *_, **__):
+        time.sleep(self.delay)
+        return mock.Mock(
+            status_code=self.status_code,
+            json=mock.Mock(return_value={"display_name": "Niamey, Niger"}),
+        )
+
+    def test_repeated_click_is_cached(self):
+        """Test that the address of the same point is requested once."""
+
+        first = geocoding.reverse_geocode(*self.coords)
+
+        start = time.perf_counter()
+        second = asyncio.run(geocoding.areverse_geocode(*self.coords))
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(first, "Niamey, Niger")
+        self.assertEqual(second, first)
+        self.assertEqual(self.session.get.call_count, 1)
+        self.assertLess(elapsed, self.delay)
+
+    def test_identical_requests_are_coalesced(self):
+        """Test that the identical requests running at the same time share one request."""
+
+        addresses = []
+        threads = [
+            threading.Thread(
+                target=lambda: addresses.append(geocoding.reverse_geocode(*self.coords))
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(addresses, ["Niamey, Niger"] * 5)
+        self.assertEqual(self.session.get.call_count, 1)
+
+    def test_errors_are_not_cached(self):
+        """Test that a failed request is repeated on the next click."""
+
+        self.status_code = 429
+
+        address = geocoding.reverse_geocode(*self.coords)
+        geocoding.reverse_geocode(*self.coords)
+
+        self.assertIn("429", address)
+        self.assertEqual(self.session.get.call_count, 2)
+
+    def test_rate_limit(self):
+        """Test that the token bucket spaces the requests over the rate."""
+
+        limiter = TokenBucket(rate=20)
+
+        start = time.perf_counter()
+        for _ in range(5):
+            limiter.acquire()
+        elapsed = time.perf_counter() - start
+
+        self.assertGreaterEqual(elapsed, 4 / 20 * 0.9)
+
+    def test_burst_over_the_rate_limit_fails_fast(self):
+        """Test that a request over the longest wait is not sent, nor cached."""
+
+        limiter = TokenBucket(rate=1)
+        self.assertTrue(limiter.acquire(max_wait=0))
+
+        with mock.patch.object(geocoding, "_RATE_LIMITER", limiter), mock.patch.dict(
+            geocoding.GEOCODING, {"max_wait_seconds": 0.1}
+        ):
+            start = time.perf_counter()
+            address = geocoding.reverse_geocode(*self.coords)
+            elapsed = time.perf_counter() - start
+
+        self.assertIn("busy", address)
+        self.assertLess(elapsed, 0.1)
+        self.session.get.assert_not_called()
+        key = geocoding.get_address_key(*self.coords)
+        self.assertIsNone(geocoding.get_cached_address(key))
+
+    def test_async_requests_run_on_the_bounded_pool(self):
+        """Test that the async lookups do not start a thread per click."""
+
+        threads = []
+
+        def reverse_geocode(*_):
+            threads.append(threading.current_thread().name)
+            return "Niamey, Niger"
+
+        with mock.patch.object(geocoding, "reverse_geocode", reverse_geocode):
+            asyncio.run(geocoding.areverse_geocode(*self.coords))
+
+        self.assertTrue(threads[0].startswith("geocoding"))
+
+
 class TestRegionData(unittest.TestCase):
     """Test the region data acquisition from Google Earth Engine."""
 
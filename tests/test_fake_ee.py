@@ -0,0 +1,169 @@
+"""
+The module tests the acquisition and the categorization stages offline, on the fake Earth Engine.
+"""
+
+# Python
+from contextlib import ExitStack
+import time
+import unittest
+from unittest import mock
+
+# Test
+from tests import _fake_ee
+from tests._fake_ee import use_fake_ee
+
+# App
+from app.cache import PersistentCache
+from app.config import ROI
+from app.layers import LAYER_REGISTRY
+from app.roundtrips import assert_max_roundtrips
+from app.stages.data_acquisition import point
+from app.stages.data_acquisition.batch import (
+    get_map_points_data,
+    merge_map_points_data,
+)
+from app.stages.data_acquisition.point import POINT_SAMPLING, get_map_point_data
+from app.stages.data_acquisition.region import (
+    calculate_center,
+    clear_region_data,
+    get_afforestation_candidates_region,
+    get_region_data,
+)
+from app.stages.data_categorization import evaluate_afforestation_candidates
+
+POINT_MODULE = "app.stages.data_acquisition.point"
+BATCH_MODULE = "app.stages.data_acquisition.batch"
+
+
+class TestFakeEarthEngine(unittest.TestCase):
+    """Test the stages of the app on the fake server, without the network."""
+
+    periods = ROI["periods"]
+
+    coords = calculate_center(ROI["roi_coords"])
+
+    # The savanna, the grassland and the desert of the fake rasters
+    savanna, grassland, desert = (9.0, 10.0), (14.0, 10.0), (22.0, 10.0)
+
+    def setUp(self):
+        """Replace the Earth Engine client, the point cache and the geocoding."""
+
+        clear_region_data()
+        self.addCleanup(clear_region_data)
+
+        point_cache = PersistentCache(":memory:", max_entries=100)
+
+        stack = ExitStack()
+        self.addCleanup(stack.close)
+        stack.enter_context(use_fake_ee())
+
+        for patch in [
+            mock.patch(f"{POINT_MODULE}.get_point_cache", return_value=point_cache),
+            mock.patch(f"{POINT_MODULE}.get_address_from_point", return_value="Sahel"),
+            mock.patch(f"{POINT_MODULE}.POINT_DATA_BACKEND", "gee"),
+            mock.patch(f"{BATCH_MODULE}.POINT_DATA_BACKEND", "gee"),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_app_modules_use_the_fake(self):
+        """Test that the loaded modules of the app import the fake."""
+
+        self.assertIs(point.ee, _fake_ee)
+
+    def test_get_map_point_data(self):
+        """Test that the point is sampled in one round-trip, in milliseconds."""
+
+        start = time.perf_counter()
+        with assert_max_roundtrips(1):
+            data = get_map_point_data(*self.coords, self.periods)
+        elapsed = time.perf_counter() - start
+
+        for key in POINT_SAMPLING:
+            self.assertIsInstance(data[key], (float, int))
+
+        self.assertIsInstance(data["world_cover_code"], int)
+        self.assertIsInstance(data["afforestation_validation"], bool)
+        self.assertLess(elapsed, 1)
+
+    def test_point_data_is_deterministic(self):
+        """Test that the same point gives the same values on each run."""
+
+        first = get_map_point_data(*self.savanna, self.periods)
+
+        with mock.patch(
+            f"{POINT_MODULE}.get_point_cache",
+            return_value=PersistentCache(":memory:", max_entries=100),
+        ):
+            second = get_map_point_data(*self.savanna, self.periods)
+
+        self.assertEqual(first, second)
+
+    def test_afforestation_follows_the_gradient(self):
+        """Test that only the grassland with enough rain is a candidate."""
+
+        validations = {
+            name: get_map_point_data(*coords, self.periods)["afforestation_validation"]
+            for name, coords in [
+                ("savanna", self.savanna),
+                ("grassland", self.grassland),
+                ("desert", self.desert),
+            ]
+        }
+
+        self.assertEqual(
+            validations, {"savanna": False, "grassland": True, "desert": False}
+        )
+
+    def test_points_are_sampled_in_one_roundtrip(self):
+        """Test that the batch of the points agrees with the single points."""
+
+        lats, lons = zip(self.savanna, self.grassland, self.desert)
+
+        with assert_max_roundtrips(1):
+            data = merge_map_points_data(
+                get_map_points_data(lats, lons, self.periods, chunk_size=10)
+            )
+
+        single = get_map_point_data(*self.grassland, self.periods)
+
+        self.assertEqual(data["world_cover_code"][1], single["world_cover_code"])
+        self.assertAlmostEqual(data["precipitation"][1], single["precipitation"])
+        self.assertEqual(data["afforestation_validation"], [False, True, False])
+
+    def test_region_data(self):
+        """Test that the layers of the region are built without a round-trip."""
+
+        with assert_max_roundtrips(0):
+            data = get_region_data(ROI, LAYER_REGISTRY)
+
+        self.assertIn("center", data)
+        self.assertIsInstance(data["maps"]["slope"]["data"], _fake_ee.Image)
+
+    def test_candidates_region_matches_the_point(self):
+        """Test that the image of the candidates agrees with the scalar evaluation."""
+
+        candidates = get_afforestation_candidates_region(
+            ROI["roi_coords"], self.periods
+        )
+        lat, lon = self.grassland
+
+        value = (
+            candidates.reduceRegion(
+                reducer=_fake_ee.Reducer.first(),
+                geometry=_fake_ee.Geometry.Point([lon, lat]),
+                scale=100,
+            )
+            .getInfo()
+            .popitem()[1]
+        )
+
+        data = get_map_point_data(lat, lon, self.periods)
+        expected = evaluate_afforestation_candidates(
+            data["slope"],
+            data["precipitation"],
+            data["soil_moisture"],
+            data["world_cover_code"],
+        )
+
+        self.assertEqual(bool(value), expected)
@@ -0,0 +1,228 @@
+"""
+The module tests the registry of the map layers shared by the sessions of the app.
+"""
+
+# Python
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import unittest
+from unittest import mock
+
+# Third party
+import ee
+
+# App
+from app.config import MAP_DATA, ROI
+from app.layers import LAYER_REGISTRY, derive_layers, freeze, thaw
+from app.stages.data_acquisition.region import clear_region_data, get_region_data
+
+REGION_MODULE = "app.stages.data_acquisition.region"
+
+REGION_FETCHERS = {
+    "satellite_imagery": "fetch_satellite_imagery_data",
+    "elevation": "fetch_elevation_data",
+    "slope": "fetch_slope_data",
+    "world_cover": "fetch_world_cover_data",
+    "soc_0_20cm": "fetch_soil_organic_carbon_data",
+    "soil_moisture": "fetch_mean_soil_moisture_data",
+    "precipitation": "fetch_total_precipitation_data",
+}
+
+
+def create_image(layer: str, geometry) -> mock.MagicMock:
+    """Create an image remembering the layer and the region it was fetched for."""
+
+    image = mock.MagicMock(spec=ee.Image)
+    image.source = (layer, geometry)
+    return image
+
+
+def patch_region_requests(test_case: unittest.TestCase) -> dict[str, mock.MagicMock]:
+    """
+    Replace the Earth Engine requests of the region with images tagged with their region.
+
+    Returns:
+        dict: The mocks of the fetchers keyed like the layers.
+    """
+
+    patches = [
+        mock.patch.object(ee.Geometry, "Polygon", side_effect=str),
+        mock.patch(
+            f"{REGION_MODULE}.evaluate_afforestation_candidates",
+            side_effect=lambda slope, *_: create_image(
+                "afforestation_candidates", slope.source[1]
+            ),
+        ),
+    ]
+
+    for layer, fetcher in REGION_FETCHERS.items():
+        patches.append(
+            mock.patch(
+                f"{REGION_MODULE}.{fetcher}",
+                side_effect=lambda *args, layer=layer: create_image(layer, args[-1]),
+            )
+        )
+
+    mocks = {}
+    for layer, patch in zip(["polygon", "candidates", *REGION_FETCHERS], patches):
+        mocks[layer] = patch.start()
+        test_case.addCleanup(patch.stop)
+
+    return mocks
+
+
+class TestLayerRegistry(unittest.TestCase):
+    """Test that the registry is read-only and the views are derived per request."""
+
+    def test_registry_is_read_only(self):
+        """Test that no session can change the settings of the layers."""
+
+        with self.assertRaises(TypeError):
+            LAYER_REGISTRY["elevation"]["data"] = "image"
+
+        with self.assertRaises(TypeError):
+            LAYER_REGISTRY["elevation"]["vis_params"]["min"] = 100
+
+        with self.assertRaises(AttributeError):
+            LAYER_REGISTRY["elevation"]["vis_params"]["palette"].append("FFFFFF")
+
+        self.assertEqual(thaw(LAYER_REGISTRY), MAP_DATA)
+
+    def test_derived_layers(self):
+        """Test that the data is added to the view only."""
+
+        layers = derive_layers(LAYER_REGISTRY, {"slope": "image"})
+
+        self.assertEqual(layers["slope"]["data"], "image")
+        self.assertEqual(layers["slope"]["name"], MAP_DATA["slope"]["name"])
+        self.assertNotIn("data", LAYER_REGISTRY["slope"])
+        self.assertNotIn("data", layers["elevation"])
+
+        with self.assertRaises(KeyError):
+            derive_layers(LAYER_REGISTRY, {"unknown": "image"})
+
+
+class TestConcurrentRegionData(unittest.TestCase):
+    """Test that the sessions of many threads get the layers of their own region."""
+
+    threads = 16
+    rounds = 20
+
+    def setUp(self):
+        patch_region_requests(self)
+        clear_region_data()
+        self.addCleanup(clear_region_data)
+
+    def test_region_data_is_not_shared(self):
+        """Test that the concurrent requests do not see the images of each other."""
+
+        barrier = threading.Barrier(self.threads)
+
+        def request_region(thread: int) -> list[str]:
+            roi = {
+                "roi_coords": [[thread, 0], [thread + 1, 0], [thread + 1, 1]],
+                "periods": ROI["periods"],
+            }
+            errors = []
+            barrier.wait()
+
+            for _ in range(self.rounds):
+                maps = get_region_data(roi, LAYER_REGISTRY)["maps"]
+
+                for key, layer in maps.items():
+                    if layer["data"].source != (key, str(roi["roi_coords"])):
+                        errors.append(f"{key} of another region in thread {thread}")
+
+            return errors
+
+        with ThreadPoolExecutor(max_workers=self.threads) as executor:
+            errors = sum(executor.map(request_region, range(self.threads)), [])
+
+        self.assertEqual(errors, [])
+        self.assertFalse(any("data" in layer for layer in LAYER_REGISTRY.values()))
+
+
+class TestRegionDataCache(unittest.TestCase):
+    """Test that the region layers are built once per process."""
+
+    def setUp(self):
+        self.mocks = patch_region_requests(self)
+        clear_region_data()
+        self.addCleanup(clear_region_data)
+
+    def test_region_is_built_once(self):
+        """Test that the reruns of all the sessions reuse the built layers."""
+
+        first = get_region_data(ROI, LAYER_REGISTRY)
+        second = get_region_data(ROI, LAYER_REGISTRY)
+
+        self.assertIs(first, second)
+        self.assertEqual(self.mocks["elevation"].call_count, 1)
+
+        with self.assertRaises(TypeError):
+            first["maps"] = {}
+
+    def test_changed_settings_are_built_again(self):
+        """Test that the region, the periods and the layer settings are the key."""
+
+        periods = {
+            **ROI["periods"],
+            "precipitation": {"start_date": "2022-01-01", "end_date": "2022-12-31"},
+        }
+        registry = freeze({**thaw(LAYER_REGISTRY), "slope": {**MAP_DATA["slope"]}})
+        registry_with_other_slope = freeze(
+            {
+                **thaw(LAYER_REGISTRY),
+                "slope": {**MAP_DATA["slope"], "vis_params": {"min": 0, "max": 30}},
+            }
+        )
+
+        get_region_data(ROI, LAYER_REGISTRY)
+        get_region_data(ROI, registry)
+        get_region_data({**ROI, "periods": periods}, LAYER_REGISTRY)
+        get_region_data(ROI, registry_with_other_slope)
+
+        self.assertEqual(self.mocks["elevation"].call_count, 3)
+
+    def test_concurrent_sessions_build_once(self):
+        """Test that the sessions starting together wait for a single build."""
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(lambda _: get_region_data(ROI, LAYER_REGISTRY), range(8))
+            )
+
+        self.assertTrue(all(result is results[0] for result in results))
+        self.assertEqual(self.mocks["elevation"].call_count, 1)
+
+    def test_failed_build_is_not_cached(self):
+        """Test that a failed build is retried by the next rerun."""
+
+        self.mocks["elevation"].side_effect = ee.EEException("Server error")
+
+        with self.assertRaises(RuntimeError):
+            get_region_data(ROI, LAYER_REGISTRY)
+
+        self.mocks["elevation"].side_effect = lambda geometry: create_image(
+            "elevation", geometry
+        )
+
+        self.assertIn("data", get_region_data(ROI, LAYER_REGISTRY)["maps"]["elevation"])
+
+    def test_base_images_are_shared(self):
+        """Test that the candidates are derived from the images of the map layers."""
+
+        maps = get_region_data(ROI, LAYER_REGISTRY)["maps"]
+
+        self.assertEqual(self.mocks["polygon"].call_count, 1)
+        for layer in REGION_FETCHERS:
+            self.assertEqual(self.mocks[layer].call_count, 1, layer)
+
+        slope, precipitation, soil_moisture, world_cover = self.mocks[
+            "candidates"
+        ].call_args.args
+
+        self.assertIs(slope, maps["slope"]["data"])
+        self.assertIs(precipitation, maps["precipitation"]["data"])
+        self.assertIs(soil_moisture, maps["soil_moisture"]["data"])
+        self.assertIs(world_cover, maps["world_cover"]["data"])
@@ -0,0 +1,158 @@
+"""
+The module tests the local raster store with synthetic rasters, without the network.
+"""
+
+# Python
+import os
+import unittest
+from unittest import mock
+
+# Third party
+import numpy as np
+
+# Test
+from tests._raster_store import STORE_VALUES, create_raster_store
+from tests._setup import create_temporary_directory
+
+# App
+from app.config import ROI
+from app.stages.data_acquisition.local_raster import (
+    LayerSpec,
+    create_layer,
+    open_layer,
+    write_chunk,
+)
+from app.stages.data_acquisition.point import get_map_point_layers, POINT_SAMPLING
+
+
+class TestLocalRaster(unittest.TestCase):
+    """Test the chunked, memory-mapped rasters of the store."""
+
+    bounds = (0.0, 10.0, 1.0, 11.0)  # 1 degree square
+    resolution = 0.1  # 10 x 10 pixels
+    chunk_size = 4  # 3 x 3 chunks, the last ones partial
+
+    def setUp(self):
+        """Create a layer with a gradient, the pixel value is its row * 10 + column."""
+
+        self.directory = create_temporary_directory(self)
+
+        self.layer = create_layer(
+            self.directory,
+            "elevation",
+            LayerSpec(self.bounds, self.resolution, self.chunk_size, "float32", -9999),
+        )
+
+        raster = np.arange(100, dtype=np.float32).reshape(10, 10)
+        raster[8:, 8:] = -9999  # no data in the bottom-right chunk
+
+        for chunk_row in range(3):
+            for chunk_col in range(3):
+                window = raster[
+                    chunk_row * 4 : (chunk_row + 1) * 4,
+                    chunk_col * 4 : (chunk_col + 1) * 4,
+                ]
+                write_chunk(self.layer, chunk_row, chunk_col, window)
+
+    def test_sample_point(self):
+        """Test that the pixel under the point is read, across the chunks."""
+
+        layer = open_layer(self.directory, "elevation")
+
+        self.assertEqual(layer.sample_point(10.95, 0.05), 0)  # top-left pixel
+        self.assertEqual(layer.sample_point(10.55, 0.45), 44)  # inside the chunk (1, 1)
+        self.assertEqual(
+            layer.sample_point(10.15, 0.75), 87
+        )  # inside the partial chunk
+
+    def test_sample_many_points(self):
+        """Test that many points are read at once."""
+
+        values = self.layer.sample(
+            np.array([10.95, 10.55, 10.15]), np.array([0.05, 0.45, 0.75])
+        )
+
+        np.testing.assert_array_equal(values, [0, 44, 87])
+
+    def test_read_grid(self):
+        """Test that a grid of points across the chunks and the edges is read at once."""
+
+        lats = np.array([11.5, 10.95, 10.55, 10.15, 10.05])
+        lons = np.array([-0.5, 0.05, 0.45, 0.75, 0.95])
+
+        grid = self.layer.read_grid(lats, lons)
+
+        expected = self.layer.sample(
+            np.repeat(lats, len(lons)), np.tile(lons, len(lats))
+        ).reshape(len(lats), len(lons))
+
+        np.testing.assert_array_equal(grid, expected)
+        self.assertEqual(grid[2, 2], 44)
+        self.assertEqual(grid[4, 4], -9999)
+
+    def test_no_data(self):
+        """Test that the points outside the raster or the written chunks have no data."""
+
+        self.assertEqual(self.layer.sample_point(12.0, 0.5), -9999)
+        self.assertEqual(self.layer.sample_point(10.5, -0.5), -9999)
+        self.assertEqual(self.layer.sample_point(10.05, 0.95), -9999)
+
+    def test_empty_chunks_are_not_written(self):
+        """Test that the chunks without any data are skipped."""
+
+        chunk_files = [
+            file for file in os.listdir(self.layer.path) if file.endswith(".npy")
+        ]
+
+        self.assertEqual(len(chunk_files), 8)
+
+
+class TestLocalPointBackend(unittest.TestCase):
+    """Test that the points are sampled from the local store without Earth Engine."""
+
+    periods = ROI["periods"]
+
+    values = STORE_VALUES
+
+    def setUp(self):
+        """Create a store of constant layers over the Sahel, without data at the west edge."""
+
+        path = create_raster_store(self, bounds=[-17.5, 8.0, 43.0, 20.0], chunk_size=256)
+
+        point_module = "app.stages.data_acquisition.point"
+        for patch in [
+            mock.patch(f"{point_module}.POINT_DATA_BACKEND", "local"),
+            mock.patch.dict(f"{point_module}.LOCAL_RASTERS", {"path": path}),
+            mock.patch(f"{point_module}.ee"),
+        ]:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_get_map_point_layers(self):
+        """Test that all the layers are read from the store."""
+
+        values = get_map_point_layers(14.0, 2.0, self.periods)
+
+        self.assertEqual(values, self.values)
+        self.assertIsInstance(values["world_cover_code"], int)
+
+    def test_no_data_sentinels(self):
+        """Test that the pixels without data return the sentinels of the layers."""
+
+        values = get_map_point_layers(14.0, -17.4, self.periods)
+
+        self.assertEqual(
+            values,
+            {key: sampling["no_data"] for key, sampling in POINT_SAMPLING.items()},
+        )
+
+    def test_other_period_is_rejected(self):
+        """Test that a layer exported for another period is not used."""
+
+        periods = {
+            **self.periods,
+            "precipitation": {"start_date": "2022-01-01", "end_date": "2022-12-31"},
+        }
+
+        with self.assertRaises(RuntimeError):
+            get_map_point_layers(14.0, 2.0, periods)
@@ -0,0 +1,235 @@
+"""
+The module tests the timing spans and the metrics export, without the network.
+"""
+
+# Python
+import asyncio
+import io
+import json
+import logging
+import os
+import unittest
+from unittest import mock
+
+# Third party
+import requests
+from requests.adapters import BaseAdapter
+
+# Test
+from tests._setup import create_temporary_directory
+
+# App
+from app import logger
+from app.metrics import (
+    METRICS_LOGGER,
+    REQUESTS,
+    RESPONSE_BYTES,
+    STAGE_DURATION,
+    STAGE_ERRORS,
+    Histogram,
+    Metrics,
+    instrument_session,
+    record_response,
+    span,
+    timed,
+)
+
+METRICS_MODULE = "app.metrics"
+
+
+class FakeAdapter(BaseAdapter):
+    """Responds to every request with the same body, without the network."""
+
+    def __init__(self, body: bytes):
+        super().__init__()
+        self.body = body
+
+    def send(self, request, **_kwargs):  # pylint: disable=arguments-differ
+        response = requests.Response()
+        response.status_code = 200
+        response._content = self.body  # pylint: disable=protected-access
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+class StreamingAdapter(FakeAdapter):
+    """Responds with a body left unread, with its Content-Length header."""
+
+    def send(self, request, **_kwargs):  # pylint: disable=arguments-differ
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Length"] = str(len(self.body))
+        response.raw = io.BytesIO(self.body)
+        response.request = request
+        response.url = request.url
+        return response
+
+    def close(self):
+        pass
+
+
+class TestMetrics(unittest.TestCase):
+    """Test the spans of the stages and the counters of the requests."""
+
+    def setUp(self):
+        """Start each test with empty metrics."""
+
+        self.metrics = Metrics((0.1, 1))
+
+        patch = mock.patch(f"{METRICS_MODULE}._METRICS", self.metrics)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def test_histogram_buckets(self):
+        """Test that the values are counted in the cumulative buckets."""
+
+        histogram = Histogram((0.1, 1))
+
+        for value in [0.05, 0.1, 0.5, 5]:
+            histogram.observe(value)
+
+        self.assertEqual(
+            histogram.get_cumulative_counts(), [("0.1", 2), ("1", 3), ("+Inf", 4)]
+        )
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 5.65)
+
+    def test_nested_spans_count_their_requests(self):
+        """Test that a request is counted in its open spans and the process."""
+
+        with span("get_map_point_data") as outer:
+            record_response("earth_engine", 100)
+
+            with span("reverse_geocode") as inner:
+                record_response("nominatim", 20)
+
+        self.assertEqual((outer["requests"], outer["bytes"]), (2, 120))
+        self.assertEqual((inner["requests"], inner["bytes"]), (1, 20))
+        self.assertEqual(inner["parent"], "get_map_point_data")
+
+        self.assertEqual(self.metrics.get_counter(REQUESTS, "service", "nominatim"), 1)
+        self.assertEqual(
+            self.metrics.get_counter(RESPONSE_BYTES, "service", "earth_engine"), 100
+        )
+        self.assertEqual(
+            self.metrics.get_histogram(
+                STAGE_DURATION, "stage", "reverse_geocode"
+            ).count,
+            1,
+        )
+
+    def test_failed_span(self):
+        """Test that a failed stage is timed and counted as an error."""
+
+        @timed("evaluate")
+        def evaluate():
+            raise ValueError("No data")
+
+        with self.assertRaises(ValueError):
+            evaluate()
+
+        self.assertEqual(self.metrics.get_counter(STAGE_ERRORS, "stage", "evaluate"), 1)
+        self.assertEqual(
+            self.metrics.get_histogram(STAGE_DURATION, "stage", "evaluate").count, 1
+        )
+
+    def test_timed_coroutine(self):
+        """Test that a coroutine function is timed until it completes."""
+
+        @timed()
+        async def areverse_geocode():
+            await asyncio.sleep(0.01)
+            return "Niamey"
+
+        self.assertEqual(asyncio.run(areverse_geocode()), "Niamey")
+        self.assertEqual(areverse_geocode.__name__, "areverse_geocode")
+
+        histogram = self.metrics.get_histogram(
+            STAGE_DURATION, "stage", "areverse_geocode"
+        )
+        self.assertGreaterEqual(histogram.sum, 0.01)
+
+    def test_instrumented_session(self):
+        """Test that the responses of the session are counted once, with their bytes."""
+
+        session = requests.Session()
+        session.mount("https://", FakeAdapter(b"x" * 42))
+
+        instrument_session(session, "nominatim")
+        instrument_session(session, "nominatim")
+
+        session.get("https://nominatim.openstreetmap.org/reverse", timeout=5)
+
+        self.assertEqual(self.metrics.get_counter(REQUESTS, "service", "nominatim"), 1)
+        self.assertEqual(
+            self.metrics.get_counter(RESPONSE_BYTES, "service", "nominatim"), 42
+        )
+
+    def test_streamed_response_is_not_loaded(self):
+        """Test that a streamed response is measured by its Content-Length header."""
+
+        session = requests.Session()
+        session.mount("https://", StreamingAdapter(b"x" * 42))
+        instrument_session(session, "tiles")
+
+        response = session.get("https://tiles.example.com/1/2/3", stream=True, timeout=5)
+
+        self.assertEqual(response.raw.tell(), 0)
+        self.assertEqual(self.metrics.get_counter(RESPONSE_BYTES, "service", "tiles"), 42)
+
+    def test_prometheus_text(self):
+        """Test the text exposition format of the histograms and the counters."""
+
+        with span('display_map "main"'):
+            pass
+        record_response("earth_engine", 512, 0.5)
+
+        lines = self.metrics.get_prometheus_text().splitlines()
+
+        self.assertIn("# TYPE app_stage_duration_seconds histogram", lines)
+        self.assertIn(
+            'app_stage_duration_seconds_bucket{stage="display_map \\"main\\"",le="+Inf"} 1',
+            lines,
+        )
+        self.assertIn(
+            'app_request_duration_seconds_bucket{service="earth_engine",le="0.1"} 0',
+            lines,
+        )
+        self.assertIn('app_response_bytes_total{service="earth_engine"} 512', lines)
+
+    def test_spans_are_written_as_json_lines(self):
+        """Test that each span is a JSON line in the rotating files."""
+
+        directory = create_temporary_directory(self)
+        path = os.path.join(directory, "logs", "metrics.jsonl")
+
+        metrics_logger = logging.getLogger(METRICS_LOGGER)
+        self.addCleanup(setattr, metrics_logger, "handlers", [])
+        self.addCleanup(setattr, metrics_logger, "propagate", True)
+        self.addCleanup(metrics_logger.setLevel, logging.NOTSET)
+
+        with mock.patch.dict(
+            "app.logger.METRICS", {"path": path, "max_bytes": 200, "backup_count": 1}
+        ):
+            logger.set_metrics_logging()
+
+        for handler in metrics_logger.handlers:
+            self.addCleanup(handler.close)
+
+        for stage in ["get_region_data", "display_map", "st_folium"]:
+            with span(stage):
+                record_response("earth_engine", 10)
+
+        for handler in metrics_logger.handlers:
+            handler.flush()
+
+        with open(path, encoding="utf-8") as file:
+            records = [json.loads(line) for line in file]
+
+        self.assertTrue(os.path.exists(f"{path}.1"))
+        self.assertEqual(records[-1]["stage"], "st_folium")
+        self.assertEqual(records[-1]["requests"], 1)
@@ -0,0 +1,120 @@
+"""
+The module tests the counter of the Earth Engine round-trips, without the network.
+"""
+
+# Python
+import threading
+import unittest
+from unittest import mock
+
+# Third party
+from ee import _cloud_api_utils
+
+# App
+from app.concurrency import get_executor
+from app.roundtrips import assert_max_roundtrips, count_roundtrips, record_roundtrip
+
+COMPUTE_URL = (
+    "https://earthengine.googleapis.com/v1/projects/earthengine-legacy/value:compute"
+)
+
+
+def create_transport() -> _cloud_api_utils._Http:
+    """Create the transport of the Earth Engine client over a session without the network."""
+
+    session = mock.Mock()
+    session.request.return_value = mock.Mock(
+        headers={}, status_code=200, content=b'{"result": 1}'
+    )
+    return _cloud_api_utils._Http(session)  # pylint: disable=protected-access
+
+
+def sample_point(transport: _cloud_api_utils._Http):
+    """A blocking call of the app, like `getInfo`."""
+
+    transport.request(f"{COMPUTE_URL}?alt=json", method="POST")
+
+
+class TestRoundTrips(unittest.TestCase):
+    """Test that the blocking requests are counted by their call sites."""
+
+    def setUp(self):
+        """Create the transport of the client."""
+
+        self.transport = create_transport()
+
+    def test_requests_are_counted_by_call_site(self):
+        """Test that each request of the client is a round-trip of its call site."""
+
+        with count_roundtrips() as roundtrips:
+            sample_point(self.transport)
+            sample_point(self.transport)
+
+        call_sites = roundtrips.get_call_sites()
+
+        self.assertEqual(roundtrips.count, 2)
+        self.assertEqual(len(call_sites), 1)
+        self.assertRegex(
+            list(call_sites)[0], r"^tests/test_roundtrips\.py:\d+ sample_point$"
+        )
+        self.assertEqual(roundtrips.roundtrips[0]["uri"], COMPUTE_URL)
+        self.assertEqual(roundtrips.roundtrips[0]["method"], "POST")
+
+    def test_requests_of_the_executor_tasks_are_counted(self):
+        """Test that the requests of the tasks submitted to the executor are counted."""
+
+        with count_roundtrips() as roundtrips:
+            futures = [
+                get_executor().submit(sample_point, self.transport) for _ in range(3)
+            ]
+            for future in futures:
+                future.result()
+
+        self.assertEqual(roundtrips.count, 3)
+
+    def test_requests_of_background_threads_are_not_counted(self):
+        """Test that the requests of the threads out of the context are left out."""
+
+        with count_roundtrips() as roundtrips:
+            sample_point(self.transport)
+            thread = threading.Thread(target=sample_point, args=(self.transport,))
+            thread.start()
+            thread.join()
+
+        self.assertEqual(roundtrips.count, 1)
+
+    def test_nested_recorders(self):
+        """Test that a round-trip is counted by all the open recorders."""
+
+        with count_roundtrips() as outer:
+            sample_point(self.transport)
+            with count_roundtrips() as inner:
+                sample_point(self.transport)
+
+        self.assertEqual(outer.count, 2)
+        self.assertEqual(inner.count, 1)
+
+    def test_requests_after_exit_are_not_counted(self):
+        """Test that the recorder stops at its exit."""
+
+        with count_roundtrips() as roundtrips:
+            pass
+        sample_point(self.transport)
+
+        self.assertEqual(roundtrips.count, 0)
+
+    def test_budget(self):
+        """Test that the budget fails with the call sites over it."""
+
+        with assert_max_roundtrips(1):
+            sample_point(self.transport)
+
+        with self.assertRaises(AssertionError) as context:
+            with assert_max_roundtrips(1):
+                sample_point(self.transport)
+                record_roundtrip("POST", COMPUTE_URL, 0.1, "app/fake.py:1 get_slope")
+
+        message = str(context.exception)
+        self.assertIn("2 Earth Engine round-trips, over the budget of 1", message)
+        self.assertIn("1 x app/fake.py:1 get_slope", message)
+        self.assertIn("sample_point", message)
@@ -0,0 +1,852 @@
+"""
+The module tests the tiles of the map layers.
+"""
+
+# Python
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import math
+import os
+import subprocess
+import sys
+import threading
+import time
+import unittest
+from unittest import mock
+import zlib
+
+# Third party
+import folium
+import numpy as np
+import requests
+
+# Test
+from tests._setup import create_temporary_directory
+
+# App
+from app.config import MAP_DATA, ROI, TILE_PROXY
+from app.stages.data_acquisition.local_raster import (
+    LayerSpec,
+    create_layer,
+    write_chunk,
+)
+from app.stages.tiles.proxy import (
+    TileProxy,
+    get_proxied_tile_url,
+    warn_about_disabled_proxy,
+)
+from app.stages.tiles.renderer import TileRenderer, create_color_table, parse_color
+from app.stages.tiles.roi_quadtree import (
+    INSIDE,
+    INTERSECTS,
+    OUTSIDE,
+    TRANSPARENT_TILE,
+    RoiQuadtree,
+)
+from app.stages.tiles.seeding import TileSeeder, load_manifest
+from app.stages.tiles.tile_cache import TileCache
+from app.stages.tiles import tile_ids
+from app.stages.tiles.tile_ids import (
+    clear_tile_urls,
+    get_deferred_tile_layer,
+    get_layer_id,
+    get_map_vis_params,
+    get_tile_url,
+)
+from app.stages.visualization import (
+    SELECTED_LAYERS_KEY,
+    add_layers_to_map,
+    get_executor,
+)
+
+LAYER_ID = "a" * 64
+
+# The proxy of the tests listens on a free port of the loopback
+PROXY_SETTINGS = {**TILE_PROXY, "host": "127.0.0.1", "port": 0, "public_url": None}
+
+# The west, south, east and north edges of a rectangle, in longitude and latitude
+RECTANGLE = [(-20, 10), (40, 10), (40, 20), (-20, 20)]
+
+
+def get_tile(lon: float, lat: float, z: int) -> tuple[int, int, int]:
+    """Returns the Web Mercator tile of the point at the zoom level."""
+
+    tiles = 2**z
+    x = int((lon + 180) / 360 * tiles)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * tiles)
+    return z, x, y
+
+
+def create_image_mock(expression: str) -> mock.MagicMock:
+    """Create an image serializing to the expression and registering a tile URL."""
+
+    image = mock.MagicMock()
+    image.serialize.return_value = expression
+    image.getMapId.side_effect = lambda _: {
+        "tile_fetcher": mock.Mock(
+            url_format=f"https://earthengine.googleapis.com/{expression}/{{z}}/{{x}}/{{y}}"
+        )
+    }
+    return image
+
+
+class TestTileIds(unittest.TestCase):
+    """Test the cache of the tile URLs of the map layers."""
+
+    vis_params = {**MAP_DATA["elevation"]["vis_params"], "opacity": 0.6}
+
+    def setUp(self):
+        clear_tile_urls()
+        self.addCleanup(clear_tile_urls)
+
+    def test_tile_url_is_registered_once(self):
+        """Test that the reruns reuse the tile URL of the same layer."""
+
+        image = create_image_mock("elevation")
+
+        first = get_tile_url(image, self.vis_params)
+        second = get_tile_url(create_image_mock("elevation"), self.vis_params)
+
+        self.assertEqual(first, second)
+        self.assertIn("{z}/{x}/{y}", first)
+        self.assertEqual(image.getMapId.call_count, 1)
+
+    def test_changed_layer_is_registered_again(self):
+        """Test that the expression and the visualization are part of the key."""
+
+        image = create_image_mock("elevation")
+        other_vis_params = {**self.vis_params, "opacity": 1.0}
+
+        self.assertNotEqual(
+            get_layer_id(image, self.vis_params),
+            get_layer_id(image, other_vis_params),
+        )
+        self.assertNotEqual(
+            get_layer_id(image, self.vis_params),
+            get_layer_id(create_image_mock("slope"), self.vis_params),
+        )
+
+    def test_expired_tile_url_is_registered_again(self):
+        """Test that the tile URL is renewed after its time to live."""
+
+        image = create_image_mock("elevation")
+
+        with mock.patch.dict("app.stages.tiles.tile_ids.TILE_IDS", {"ttl_seconds": 0}):
+            get_tile_url(image, self.vis_params)
+            get_tile_url(image, self.vis_params)
+
+        self.assertEqual(image.getMapId.call_count, 2)
+
+    def test_expired_tile_urls_are_dropped(self):
+        """Test that the URLs of the changed layers do not pile up."""
+
+        with mock.patch.dict("app.stages.tiles.tile_ids.TILE_IDS", {"ttl_seconds": 0}):
+            get_tile_url(create_image_mock("elevation"), self.vis_params)
+            get_tile_url(create_image_mock("slope"), self.vis_params)
+
+        self.assertEqual(
+            list(tile_ids._TILE_URLS),  # pylint: disable=protected-access
+            [get_layer_id(create_image_mock("slope"), self.vis_params)],
+        )
+
+
+class FakeUpstream:
+    """A local tile server counting its requests, in place of Earth Engine."""
+
+    def __init__(self, delay: float = 0, status: int = 200):
+        self.delay = delay
+        self.status = status
+        self.requests = []
+        self._lock = threading.Lock()
+
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            """Returns the path of the tile as its content."""
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                """Serves the tile after the delay of the upstream."""
+
+                upstream.record(self.path)
+
+                time.sleep(upstream.delay)
+
+                body = f"tile {self.path}".encode("utf-8")
+                self.send_response(upstream.status)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/{{z}}/{{x}}/{{y}}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def record(self, path: str):
+        """Counts the request of the tile."""
+
+        with self._lock:
+            self.requests.append(path)
+
+    def stop(self):
+        """Stops the server."""
+
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestMapLayers(unittest.TestCase):
+    """Test the concurrent registration of the map layers."""
+
+    maps = {
+        key: {"name": key, "shown": True}
+        for key in ["elevation", "slope", "world_cover", "precipitation"]
+    }
+
+    def setUp(self):
+        """Count the warnings of the added layers."""
+
+        self.warnings = 0
+
+    def add_layers(self, get_layer_tile_url) -> tuple[list[str], float]:
+        """Add the layers to a map, returning the names of the added layers and the duration."""
+
+        folium_map = folium.Map()
+
+        with mock.patch(
+            "app.stages.visualization.get_layer_tile_url",
+            side_effect=get_layer_tile_url,
+        ), mock.patch("app.stages.visualization.st") as st:
+            start = time.perf_counter()
+            add_layers_to_map(folium_map, self.maps)
+            duration = time.perf_counter() - start
+
+        self.warnings = st.warning.call_count
+
+        names = [
+            child.layer_name
+            for child in folium_map._children.values()  # pylint: disable=protected-access
+            if isinstance(child, folium.TileLayer) and child.layer_name in self.maps
+        ]
+        return names, duration
+
+    def test_layers_are_registered_concurrently_in_order(self):
+        """Test that the layers are registered at once and added in their order."""
+
+        def get_layer_tile_url(_layer, key):
+            # The first layers take the longest
+            time.sleep(0.4 - 0.1 * list(self.maps).index(key))
+            return f"https://tiles/{key}/{{z}}/{{x}}/{{y}}"
+
+        names, duration = self.add_layers(get_layer_tile_url)
+
+        self.assertEqual(names, list(self.maps))
+        self.assertLess(duration, 0.8)
+
+    def test_failed_layer_is_left_out(self):
+        """Test that a failing layer does not prevent the others."""
+
+        def get_layer_tile_url(_layer, key):
+            if key == "slope":
+                raise RuntimeError("Too many requests")
+            return f"https://tiles/{key}/{{z}}/{{x}}/{{y}}"
+
+        names, _ = self.add_layers(get_layer_tile_url)
+
+        self.assertEqual(names, ["elevation", "world_cover", "precipitation"])
+        self.assertEqual(self.warnings, 1)
+
+    def test_late_layer_is_left_out(self):
+        """Test that a layer registered too late does not hold the map."""
+
+        def get_layer_tile_url(_layer, key):
+            if key == "world_cover":
+                time.sleep(1)
+            return f"https://tiles/{key}/{{z}}/{{x}}/{{y}}"
+
+        with mock.patch.dict("app.stages.visualization.TILE_IDS", {"timeout": 0.3}):
+            names, duration = self.add_layers(get_layer_tile_url)
+
+        self.assertEqual(names, ["elevation", "slope", "precipitation"])
+        self.assertLess(duration, 0.9)
+        self.assertEqual(self.warnings, 1)
+
+    def test_layers_do_not_wait_for_the_data_acquisition(self):
+        """Test that the layers are registered while the pool of the sampling is busy."""
+
+        released = threading.Event()
+        self.addCleanup(released.set)
+        for _ in range(get_executor()._max_workers):  # pylint: disable=protected-access
+            get_executor().submit(released.wait, 5)
+
+        names, duration = self.add_layers(
+            lambda layer, key: f"https://tiles/{key}/{{z}}/{{x}}/{{y}}"
+        )
+
+        self.assertEqual(names, list(self.maps))
+        self.assertLess(duration, 1)
+
+    def test_map_modules_are_imported_lazily(self):
+        """Test that the app starts without importing the map libraries."""
+
+        map_modules = ["folium", "geemap", "streamlit_folium"]
+        app_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "app")
+
+        result = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, streamlit_app, warmup; "
+                f"print([m for m in {map_modules} if m in sys.modules])",
+            ],
+            cwd=app_path,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
+class TestHiddenLayers(unittest.TestCase):
+    """Test the hidden layers deferred until selected, with the default configuration."""
+
+    maps = {
+        "elevation": {"name": "elevation", "shown": True},
+        "slope": {"name": "slope", "shown": False},
+        "world_cover": {"name": "world_cover", "shown": False},
+    }
+
+    def add_layers(self, selected_layers: list[str]) -> tuple[list[str], list[str]]:
+        """Add the layers to a map, returning the registered and the shown layers."""
+
+        registered = []
+
+        def get_layer_tile_url(_layer, key):
+            registered.append(key)
+            return f"https://tiles/{key}/{{z}}/{{x}}/{{y}}"
+
+        folium_map = folium.Map()
+
+        with mock.patch(
+            "app.stages.visualization.get_layer_tile_url",
+            side_effect=get_layer_tile_url,
+        ), mock.patch("app.stages.visualization.st") as st:
+            st.session_state = {SELECTED_LAYERS_KEY: selected_layers}
+            add_layers_to_map(folium_map, self.maps)
+
+        shown = [
+            child.layer_name
+            for child in folium_map._children.values()  # pylint: disable=protected-access
+            if isinstance(child, folium.TileLayer)
+            and child.layer_name in self.maps
+            and child.show
+        ]
+        return sorted(registered), shown
+
+    def test_hidden_layers_are_not_registered_without_the_proxy(self):
+        """Test that only the shown layers are registered by the first render."""
+
+        self.assertFalse(TILE_PROXY["enabled"])
+
+        registered, shown = self.add_layers([])
+
+        self.assertEqual(registered, ["elevation"])
+        self.assertEqual(shown, ["elevation"])
+
+    def test_selected_layer_is_registered_and_shown(self):
+        """Test that a hidden layer selected under the map is registered and shown."""
+
+        registered, shown = self.add_layers(["world_cover"])
+
+        self.assertEqual(registered, ["elevation", "world_cover"])
+        self.assertEqual(shown, ["elevation", "world_cover"])
+
+
+class TestTileCache(unittest.TestCase):
+    """Test the size-bounded disk cache of the tiles."""
+
+    def setUp(self):
+        self.directory = create_temporary_directory(self)
+
+    def test_least_recently_used_tiles_are_removed(self):
+        """Test that the cache stays under its size."""
+
+        cache = TileCache(self.directory, max_bytes=30)
+
+        cache.set("layer/1/0/0", b"0" * 10)
+        cache.set("layer/1/0/1", b"1" * 10)
+        cache.set("layer/1/1/0", b"2" * 10)
+        cache.get("layer/1/0/0")
+        cache.set("layer/1/1/1", b"3" * 10)
+
+        self.assertEqual(cache.total_bytes, 30)
+        self.assertIsNone(cache.get("layer/1/0/1"))
+        self.assertEqual(cache.get("layer/1/0/0"), b"0" * 10)
+
+    def test_tiles_survive_restart(self):
+        """Test that the tiles on the disk are found by a new cache."""
+
+        TileCache(self.directory, max_bytes=100).set("layer/1/0/0", b"tile")
+
+        cache = TileCache(self.directory, max_bytes=100)
+
+        self.assertEqual(cache.get("layer/1/0/0"), b"tile")
+        self.assertEqual(cache.total_bytes, 4)
+
+    def test_tiles_of_another_process_are_read(self):
+        """Test that the tiles seeded beside the running cache are found."""
+
+        cache = TileCache(self.directory, max_bytes=100)
+        TileCache(self.directory, max_bytes=100).set("layer/1/0/0", b"tile")
+
+        self.assertEqual(cache.get("layer/1/0/0"), b"tile")
+        self.assertIn("layer/1/0/0", cache)
+        self.assertEqual(cache.total_bytes, 4)
+
+
+class TestTileProxy(unittest.TestCase):
+    """Test the caching tile proxy against a local fake upstream."""
+
+    def setUp(self):
+        """The tile URL of the layer, registered by `start_proxy`."""
+
+        self.tile_url = None
+
+    def start_proxy(self, upstream: FakeUpstream, roi: RoiQuadtree = None) -> TileProxy:
+        """Start a proxy on a free port, with the upstream registered as the layer."""
+
+        self.addCleanup(upstream.stop)
+
+        directory = create_temporary_directory(self)
+
+        proxy = TileProxy(TileCache(directory, 1024**2), roi, PROXY_SETTINGS).start()
+        self.addCleanup(proxy.stop)
+
+        self.tile_url = proxy.register_layer(LAYER_ID, upstream.url)
+        return proxy
+
+    def test_disabled_by_default(self):
+        """Test that the browsers get the tiles of the server unless the proxy is enabled."""
+
+        upstream_url = "https://earthengine.googleapis.com/tiles/{z}/{x}/{y}"
+
+        with mock.patch.dict(
+            "app.stages.tiles.proxy._PROXY", {"proxy": None, "failed": False}
+        ):
+            self.assertEqual(get_proxied_tile_url(LAYER_ID, upstream_url), upstream_url)
+
+    def test_settings_needing_the_disabled_proxy_are_reported(self):
+        """Test that the local rendering without the proxy is reported once at the start."""
+
+        with mock.patch.dict(
+            "app.stages.tiles.proxy._PROXY", {"warned": False}
+        ), mock.patch("app.stages.tiles.proxy.TILE_BACKEND", "local"):
+            with self.assertLogs(level="WARNING") as logs:
+                warn_about_disabled_proxy(serves_readiness=True)
+                warn_about_disabled_proxy()
+
+        self.assertEqual(len(logs.output), 2)
+        self.assertIn('TILE_BACKEND is "local"', logs.output[0])
+        self.assertIn('"/ready"', logs.output[1])
+
+    def test_tile_is_fetched_once(self):
+        """Test that the tile is served from the disk after the first request."""
+
+        upstream = FakeUpstream()
+        self.start_proxy(upstream)
+        url = self.tile_url.format(z=3, x=4, y=5)
+
+        first = requests.get(url, timeout=5)
+        second = requests.get(url, timeout=5)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.content, b"tile /3/4/5")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(upstream.requests, ["/3/4/5"])
+        self.assertIn("max-age", first.headers["Cache-Control"])
+
+    def test_etag(self):
+        """Test that the browser revalidating its tile gets no content."""
+
+        self.start_proxy(FakeUpstream())
+        url = self.tile_url.format(z=3, x=4, y=5)
+
+        etag = requests.get(url, timeout=5).headers["ETag"]
+        response = requests.get(url, headers={"If-None-Match": etag}, timeout=5)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_concurrent_misses_are_coalesced(self):
+        """Test that the concurrent requests of a missing tile share one fetch."""
+
+        upstream = FakeUpstream(delay=0.2)
+        self.start_proxy(upstream)
+        url = self.tile_url.format(z=3, x=4, y=5)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(
+                executor.map(lambda _: requests.get(url, timeout=5), range(8))
+            )
+
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        self.assertEqual(len(upstream.requests), 1)
+
+    def test_cached_tile_without_upstream(self):
+        """Test that the cached tiles are served after the upstream is gone."""
+
+        upstream = FakeUpstream()
+        proxy = self.start_proxy(upstream)
+        url = self.tile_url.format(z=3, x=4, y=5)
+
+        requests.get(url, timeout=5)
+        upstream.stop()
+        proxy.register_layer(LAYER_ID, "http://127.0.0.1:9/{z}/{x}/{y}")
+
+        self.assertEqual(requests.get(url, timeout=5).content, b"tile /3/4/5")
+
+    def test_errors(self):
+        """Test that the unknown layers and the upstream errors are not cached."""
+
+        upstream = FakeUpstream(status=500)
+        proxy = self.start_proxy(upstream)
+
+        unknown_layer = f"{proxy.url}/tiles/{'b' * 64}/3/4/5"
+        self.assertEqual(requests.get(unknown_layer, timeout=5).status_code, 404)
+
+        url = self.tile_url.format(z=3, x=4, y=5)
+        self.assertEqual(requests.get(url, timeout=5).status_code, 502)
+
+        upstream.status = 200
+        self.assertEqual(requests.get(url, timeout=5).status_code, 200)
+        self.assertEqual(len(upstream.requests), 2)
+
+    def test_deferred_layer_is_registered_by_first_tiles(self):
+        """Test that the hidden layer is registered on the server once it is shown."""
+
+        clear_tile_urls()
+        self.addCleanup(clear_tile_urls)
+
+        upstream = FakeUpstream()
+        proxy = self.start_proxy(upstream)
+
+        def get_map_id(_):
+            time.sleep(0.2)
+            return {"tile_fetcher": mock.Mock(url_format=upstream.url)}
+
+        image = mock.MagicMock()
+        image.serialize.return_value = "hidden"
+        image.getMapId.side_effect = get_map_id
+
+        layer_id, register = get_deferred_tile_layer(image, {"opacity": 0.6})
+        tile_url = proxy.register_deferred_layer(layer_id, register)
+
+        self.assertEqual(image.getMapId.call_count, 0)
+
+        # The tiles requested by the map when the user shows the layer
+        urls = [tile_url.format(z=3, x=x, y=y) for x in range(4) for y in range(2)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            responses = list(
+                executor.map(lambda url: requests.get(url, timeout=5), urls)
+            )
+        requests.get(tile_url.format(z=4, x=0, y=0), timeout=5)
+
+        self.assertTrue(all(response.status_code == 200 for response in responses))
+        self.assertEqual(image.getMapId.call_count, 1)
+        self.assertEqual(len(upstream.requests), 9)
+
+    def test_deferred_layer_registration_error(self):
+        """Test that a failed registration is an upstream error, retried by the next tile."""
+
+        clear_tile_urls()
+        self.addCleanup(clear_tile_urls)
+
+        upstream = FakeUpstream()
+        proxy = self.start_proxy(upstream)
+
+        image = mock.MagicMock()
+        image.serialize.return_value = "hidden"
+        image.getMapId.side_effect = [
+            Exception("Too many requests"),
+            {"tile_fetcher": mock.Mock(url_format=upstream.url)},
+        ]
+
+        tile_url = proxy.register_deferred_layer(
+            *get_deferred_tile_layer(image, {"opacity": 0.6})
+        ).format(z=3, x=4, y=5)
+
+        self.assertEqual(requests.get(tile_url, timeout=5).status_code, 502)
+        self.assertEqual(requests.get(tile_url, timeout=5).status_code, 200)
+
+    def test_readiness(self):
+        """Test that the readiness of the app is served for the load balancers."""
+
+        proxy = self.start_proxy(FakeUpstream())
+
+        self.assertEqual(requests.get(f"{proxy.url}/ready", timeout=5).status_code, 200)
+
+        proxy.readiness = lambda: {"state": "running", "steps": {}, "error": None}
+        response = requests.get(f"{proxy.url}/ready", timeout=5)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["state"], "running")
+
+    def test_metrics(self):
+        """Test that the fetches of the tiles are exported in the Prometheus format."""
+
+        proxy = self.start_proxy(FakeUpstream())
+        requests.get(self.tile_url.format(z=3, x=4, y=5), timeout=5)
+
+        response = requests.get(f"{proxy.url}/metrics", timeout=5)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("# TYPE app_requests_total counter", response.text)
+        self.assertRegex(response.text, r'app_requests_total\{service="tiles"\} [1-9]')
+
+    def test_tiles_outside_region_are_not_fetched(self):
+        """Test that the tiles outside the region are transparent without a fetch."""
+
+        upstream = FakeUpstream()
+        self.start_proxy(upstream, RoiQuadtree(RECTANGLE, max_zoom=10))
+
+        outside = requests.get(self.tile_url.format(z=8, x=0, y=0), timeout=5)
+        inside = requests.get(
+            self.tile_url.format(**dict(zip("zxy", get_tile(10, 15, 8)))), timeout=5
+        )
+
+        self.assertEqual(outside.content, TRANSPARENT_TILE)
+        self.assertEqual(inside.content, b"tile /8/135/117")
+        self.assertEqual(upstream.requests, ["/8/135/117"])
+
+
+class TestTileSeeder(unittest.TestCase):
+    """Test the seeding of the tile cache against a local fake upstream."""
+
+    def setUp(self):
+        self.upstream = FakeUpstream()
+        self.addCleanup(self.upstream.stop)
+
+        directory = create_temporary_directory(self)
+
+        self.cache_path = f"{directory}/tiles"
+        self.manifest_path = f"{directory}/tile_seeding.json"
+        self.roi = RoiQuadtree(RECTANGLE, max_zoom=10)
+
+    def create_seeder(self) -> TileSeeder:
+        """Create a seeder like a new run of the script."""
+
+        seeder = TileSeeder(
+            TileCache(self.cache_path, 1024**2),
+            self.roi,
+            {
+                "manifest_path": self.manifest_path,
+                "max_workers": 4,
+                "requests_per_second": 1000,
+            },
+        )
+        self.addCleanup(seeder.close)
+        return seeder
+
+    def seed(self, seeder: TileSeeder) -> list[dict]:
+        """Seed the zoom levels 3 to 5 of the layer."""
+
+        return list(
+            seeder.seed_layer("elevation", lambda: (LAYER_ID, self.upstream.url), 3, 5)
+        )
+
+    def test_tiles_of_region_are_seeded(self):
+        """Test that each tile over the region is fetched once into the cache."""
+
+        seeder = self.create_seeder()
+        stats = self.seed(seeder)
+
+        expected = [
+            f"/{z}/{x}/{y}" for z in range(3, 6) for x, y in self.roi.get_tiles(z)
+        ]
+        self.assertCountEqual(self.upstream.requests, expected)
+        self.assertEqual(sum(zoom["fetched"] for zoom in stats), len(expected))
+        self.assertEqual(sum(zoom["bytes"] for zoom in stats), seeder.cache.total_bytes)
+
+        z, x, y = get_tile(10, 15, 5)
+        self.assertEqual(
+            seeder.cache.get(f"{LAYER_ID}/{z}/{x}/{y}"), f"tile /{z}/{x}/{y}".encode()
+        )
+
+    def test_seeding_resumes_from_manifest(self):
+        """Test that the completed zoom levels are skipped by the next run."""
+
+        self.seed(self.create_seeder())
+        requests_count = len(self.upstream.requests)
+
+        stats = self.seed(self.create_seeder())
+
+        self.assertEqual(len(self.upstream.requests), requests_count)
+        self.assertTrue(all(zoom["resumed"] for zoom in stats))
+        self.assertEqual(
+            load_manifest(self.manifest_path)["layers"][LAYER_ID]["completed_zooms"],
+            [3, 4, 5],
+        )
+
+    def test_failed_tiles_are_retried(self):
+        """Test that a zoom level with failed tiles is seeded again by the next run."""
+
+        self.upstream.status = 500
+        stats = self.seed(self.create_seeder())
+
+        self.assertTrue(all(zoom["failed"] == zoom["tiles"] for zoom in stats))
+        self.assertFalse(load_manifest(self.manifest_path)["layers"])
+
+        self.upstream.status = 200
+        stats = self.seed(self.create_seeder())
+
+        self.assertTrue(all(zoom["fetched"] == zoom["tiles"] for zoom in stats))
+
+
+def decode_png(png: bytes) -> np.ndarray:
+    """Decode the RGBA pixels of a PNG image without filters."""
+
+    width, height = int.from_bytes(png[16:20], "big"), int.from_bytes(png[20:24], "big")
+    rows = zlib.decompress(png[png.index(b"IDAT") + 4 : -16])
+
+    return (
+        np.frombuffer(rows, dtype=np.uint8)
+        .reshape(height, 1 + width * 4)[:, 1:]
+        .reshape(height, width, 4)
+    )
+
+
+class TestTileRenderer(unittest.TestCase):
+    """Test the local rendering of the tiles from the raster store."""
+
+    vis_params = get_map_vis_params(MAP_DATA["elevation"]["vis_params"])
+
+    def setUp(self):
+        """Create the elevation of the west half of the rectangle, 3000 m west of 5° E."""
+
+        directory = create_temporary_directory(self)
+
+        self.layer = create_layer(
+            directory,
+            "elevation",
+            LayerSpec((-20, 10, 40, 20), 0.1, 600, "float32", -9999),
+        )
+
+        raster = np.full((100, 600), -9999, dtype=np.float32)
+        raster[:, :250] = 3000
+        raster[:, 250:300] = 0
+        write_chunk(self.layer, 0, 0, raster)
+
+        self.renderer = TileRenderer(self.layer, self.vis_params)
+
+    def test_color_table(self):
+        """Test that the palette is interpolated like on Earth Engine."""
+
+        table = create_color_table(self.vis_params)
+
+        self.assertEqual(table.shape, (256, 4))
+        self.assertEqual(tuple(table[0]), (0, 0, 255, 153))
+        self.assertEqual(tuple(table[255]), (255, 0, 0, 153))
+        self.assertEqual(tuple(table[128][:3]), (2, 255, 0))
+        self.assertEqual(parse_color("green"), (0, 128, 0))
+        self.assertEqual(parse_color("#FFBB22"), (255, 187, 34))
+        self.assertRaises(ValueError, parse_color, "transparent")
+
+    def test_render(self):
+        """Test that the values are colored and the pixels without data are transparent."""
+
+        # The tile of the zoom level 4 covering the raster from 0° E to 22.5° E
+        pixels = decode_png(self.renderer.render(*get_tile(10, 15, 4)))
+
+        self.assertEqual(pixels.shape, (256, 256, 4))
+
+        row = pixels[:, :, 3].any(axis=1).argmax()
+        self.assertEqual(tuple(pixels[row, 0]), (255, 0, 0, 153))  # 3000 m at 0° E
+        self.assertEqual(tuple(pixels[row, 85]), (0, 0, 255, 153))  # 0 m at 7.5° E
+        self.assertEqual(tuple(pixels[row, 255]), (0, 0, 0, 0))  # no data
+        self.assertEqual(tuple(pixels[0, 0]), (0, 0, 0, 0))  # north of the raster
+
+    def test_tile_without_data(self):
+        """Test that a tile without any data is the transparent tile."""
+
+        self.assertEqual(self.renderer.render(*get_tile(30, 15, 6)), TRANSPARENT_TILE)
+
+    def test_proxy_renders_registered_layer(self):
+        """Test that the rendered layer is served by the proxy without the server."""
+
+        directory = create_temporary_directory(self)
+
+        proxy = TileProxy(
+            TileCache(directory, 1024**2), settings=PROXY_SETTINGS
+        ).start()
+        self.addCleanup(proxy.stop)
+
+        tile_url = proxy.register_renderer(LAYER_ID, self.renderer.render)
+        z, x, y = get_tile(10, 15, 4)
+
+        response = requests.get(tile_url.format(z=z, x=x, y=y), timeout=5)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, self.renderer.render(z, x, y))
+        self.assertEqual(len(proxy.cache), 0)
+
+
+class TestRoiQuadtree(unittest.TestCase):
+    """Test the classification of the tiles against the region of interest."""
+
+    def test_transparent_tile(self):
+        """Test that the transparent tile is a 256 x 256 RGBA PNG without any pixel."""
+
+        self.assertTrue(TRANSPARENT_TILE.startswith(b"\x89PNG\r\n\x1a\n"))
+        self.assertEqual(TRANSPARENT_TILE[16:24], (256).to_bytes(4, "big") * 2)
+
+        compressed = TRANSPARENT_TILE[TRANSPARENT_TILE.index(b"IDAT") + 4 : -16]
+        self.assertEqual(zlib.decompress(compressed), bytes(256 * (1 + 256 * 4)))
+
+    def test_classify(self):
+        """Test the tiles outside, inside and on the edge of the region."""
+
+        quadtree = RoiQuadtree(RECTANGLE, max_zoom=10)
+
+        self.assertEqual(quadtree.classify(*get_tile(10, 15, 8)), INSIDE)
+        self.assertEqual(quadtree.classify(*get_tile(10, 30, 8)), OUTSIDE)
+        self.assertEqual(quadtree.classify(*get_tile(-20, 15, 8)), INTERSECTS)
+        self.assertEqual(quadtree.classify(*get_tile(10, 15, 16)), INSIDE)
+        self.assertEqual(quadtree.classify(0, 0, 0), INTERSECTS)
+
+    def test_geodesic_edges(self):
+        """Test that the edges bulge along the great circles like on Earth Engine."""
+
+        quadtree = RoiQuadtree(RECTANGLE, max_zoom=10)
+
+        # North of the straight edge at 20° N, south of its great circle
+        self.assertNotEqual(quadtree.classify(*get_tile(10, 22, 8)), OUTSIDE)
+        # North of the straight edge at 10° N, south of its great circle
+        self.assertEqual(quadtree.classify(*get_tile(10, 10.5, 10)), OUTSIDE)
+
+    def test_region_vertices_are_never_outside(self):
+        """Test that the tiles of the region corners are requested from the server."""
+
+        quadtree = RoiQuadtree(ROI["roi_coords"], max_zoom=12)
+
+        for lon, lat in ROI["roi_coords"]:
+            for z in range(0, 16):
+                self.assertFalse(
+                    quadtree.is_outside(*get_tile(lon, lat, z)), (lon, lat, z)
+                )
+
+    def test_tiles_of_zoom_level(self):
+        """Test that the listed tiles are all the tiles not outside the region."""
+
+        quadtree = RoiQuadtree(RECTANGLE, max_zoom=4)
+
+        for z in range(0, 7):
+            expected = [
+                (x, y)
+                for x in range(2**z)
+                for y in range(2**z)
+                if not quadtree.is_outside(z, x, y)
+            ]
+            self.assertCountEqual(quadtree.get_tiles(z), expected)
@@ -0,0 +1,109 @@
+"""
+The module tests the warm-up of the app caches at the server start, without the network.
+"""
+
+# Python
+import threading
+import unittest
+from unittest import mock
+
+# App
+from app import warmup
+
+WARMUP_MODULE = "app.warmup"
+
+
+class TestWarmup(unittest.TestCase):
+    """Test the background warm-up and its readiness."""
+
+    def setUp(self):
+        """Start each test from a process without a warm-up."""
+
+        patches = [
+            mock.patch.dict(
+                f"{WARMUP_MODULE}._WARMUP",
+                {"state": warmup.PENDING, "steps": {}, "error": None, "thread": None},
+            ),
+            mock.patch(f"{WARMUP_MODULE}._WARMUP_DONE", threading.Event()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        proxy_patch = mock.patch(f"{WARMUP_MODULE}.get_tile_proxy")
+        self.proxy = proxy_patch.start().return_value
+        self.addCleanup(proxy_patch.stop)
+
+    def patch_steps(self, *steps) -> list[mock.Mock]:
+        """Replace the steps of the warm-up with the functions."""
+
+        patch = mock.patch(
+            f"{WARMUP_MODULE}.WARMUP_STEPS",
+            [(f"step_{index}", step) for index, step in enumerate(steps)],
+        )
+        patch.start()
+        self.addCleanup(patch.stop)
+
+        return list(steps)
+
+    def test_pending_without_warmup(self):
+        """Test that the sessions do not wait without a warm-up."""
+
+        self.assertFalse(warmup.is_warming_up())
+        self.assertEqual(warmup.wait_for_warmup(timeout=0)["state"], warmup.PENDING)
+
+    def test_steps_run_once_in_background(self):
+        """Test that the steps run once, in order, and the app becomes ready."""
+
+        release = threading.Event()
+        calls = []
+
+        self.patch_steps(
+            lambda: calls.append("connection") or release.wait(5),
+            lambda: calls.append("region_layers"),
+        )
+
+        thread = warmup.start_warmup()
+        self.assertIs(warmup.start_warmup(), thread)
+        self.assertTrue(warmup.is_warming_up())
+        self.assertIs(self.proxy.readiness, warmup.get_warmup_status)
+
+        release.set()
+        status = warmup.wait_for_warmup(timeout=5)
+
+        self.assertEqual(status["state"], warmup.READY)
+        self.assertEqual(list(status["steps"]), ["step_0", "step_1"])
+        self.assertEqual(calls, ["connection", "region_layers"])
+
+    def test_failed_warmup(self):
+        """Test that a failed step stops the warm-up, reporting the error."""
+
+        skipped = mock.Mock()
+        self.patch_steps(mock.Mock(side_effect=RuntimeError("No credentials")), skipped)
+
+        warmup.start_warmup()
+        status = warmup.wait_for_warmup(timeout=5)
+
+        self.assertEqual(status["state"], warmup.FAILED)
+        self.assertEqual(status["error"], "No credentials")
+        skipped.assert_not_called()
+
+    def test_failing_tile_layer_is_skipped(self):
+        """Test that a layer failing to register does not fail the warm-up."""
+
+        maps = {"elevation": {"shown": True}, "slope": {"shown": True}}
+        registered = []
+
+        def get_layer_tile_url(_layer, key):
+            if key == "elevation":
+                raise RuntimeError("Too many requests")
+            registered.append(key)
+
+        with mock.patch(
+            f"{WARMUP_MODULE}.get_region_data", return_value={"maps": maps}
+        ), mock.patch(
+            f"{WARMUP_MODULE}.get_layer_tile_url", side_effect=get_layer_tile_url
+        ):
+            warmup.register_tile_layers()
+
+        self.assertEqual(registered, ["slope"])